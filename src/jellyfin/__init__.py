@@ -7,6 +7,14 @@ from jellyfin.items import Items
 from jellyfin.image import Image
 from jellyfin.system import System
 from jellyfin.users import Users
+from jellyfin.cluster import Cluster
+from jellyfin.events import Events
+from jellyfin.hls import Hls
+from jellyfin.bandwidth import Bandwidth
+from jellyfin.urls import Urls
+from jellyfin.trickplay import Trickplay
+from jellyfin.subtitles import Subtitles, Lyrics
+from jellyfin.playstate import Playstate
 from jellyfin.generated import Version, Proxy
 
 def api(url: str, api_key: str, version: Version = Version.V10_10) -> Api:
@@ -23,16 +31,39 @@ def api(url: str, api_key: str, version: Version = Version.V10_10) -> Api:
     """
     return Api(url, api_key, version)
 
+def cluster(apis: list[Api], timeout: float = None) -> Cluster:
+    """
+    Create a cluster to query multiple Jellyfin servers at once.
+
+    Args:
+        apis (list[Api]): The Api instances of each server.
+        timeout (float, optional): Timeout in seconds for each request of each server.
+
+    Returns:
+        Cluster: An instance of the Cluster class.
+    """
+    return Cluster(apis, timeout)
+
 version = Version
 
 __all__ = [
     'api',
+    'cluster',
     'version', 
     'Api', 
     'Items', 
     'Image', 
     'System', 
     'Users', 
+    'Cluster', 
+    'Events', 
+    'Hls', 
+    'Bandwidth', 
+    'Urls', 
+    'Trickplay', 
+    'Subtitles', 
+    'Lyrics', 
+    'Playstate', 
     'Version', 
     'Proxy'
 ]
\ No newline at end of file
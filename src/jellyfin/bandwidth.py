@@ -0,0 +1,192 @@
+"""
+Module `bandwidth` - Bandwidth estimation to pick the streaming bitrate.
+"""
+from __future__ import annotations
+
+import socket, threading, time, uuid
+
+from typing import Any, Dict, Tuple
+from urllib.parse import urlparse
+from pydantic import BaseModel
+
+from jellyfin.items import Item, _item_id
+from jellyfin.generated import ApiException
+
+# estimates by server URL and local address, shared by all Api instances
+_ESTIMATES: Dict[Tuple[str, str], 'Estimate'] = {}
+_LOCK = threading.Lock()
+
+# local address by server URL and when it was resolved, checked again after _ADDRESS_TTL seconds
+_ADDRESSES: Dict[str, Tuple[str, float]] = {}
+_ADDRESS_TTL = 60
+
+def _local_address(url: str) -> str:
+    """ The local address used to reach the server, it changes with the network. """
+    cached = _ADDRESSES.get(url)
+    if cached is not None and time.monotonic() - cached[1] < _ADDRESS_TTL:
+        return cached[0]
+    address = _resolve(url)
+    _ADDRESSES[url] = address, time.monotonic()
+    return address
+
+def _resolve(url: str) -> str:
+    parsed = urlparse(url)
+    port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+    try:
+        family, _, _, _, address = socket.getaddrinfo(parsed.hostname, port, proto=socket.IPPROTO_UDP)[0]
+        with socket.socket(family, socket.SOCK_DGRAM) as sock:
+            sock.connect(address)
+            return sock.getsockname()[0]
+    except OSError:
+        return ''
+
+class Estimate():
+    """ Smoothed throughput and round trip time to a server. """
+
+    def __init__(self, bitrate: float, rtt: float):
+        self.bitrate = bitrate
+        self.rtt = rtt
+        self.measured = time.monotonic()
+
+    def __repr__(self) -> str:
+        return f"<Estimate bitrate={self.bitrate / 1e6:.2f} Mbit/s, rtt={self.rtt * 1000:.1f} ms>"
+
+class Bandwidth():
+    """ Estimates the bandwidth to the server with MediaInfoApi.get_bitrate_test_bytes
+    and passes the sustainable bitrate as `max_streaming_bitrate` to playback requests.
+
+    Usage:
+        api.bandwidth.max_streaming_bitrate
+        api.bandwidth.playback_info(item)
+        api.bandwidth.universal_audio_url(item, container=['mp3', 'flac'])
+    """
+
+    def __init__(
+            self,
+            api: Api,
+            alpha: float = 0.5,
+            ttl: float = 600,
+            headroom: float = 0.8,
+            min_size: int = 64 * 1024,
+            max_size: int = 16 * 1024 * 1024,
+            target_seconds: float = 1.0
+        ):
+        """
+        Initializes the bandwidth estimator, nothing is measured until needed.
+
+        Args:
+            api (Api): An instance of the Api class.
+            alpha (float): Weight of a new sample in the exponential smoothing. Defaults to 0.5.
+            ttl (float): Seconds before the estimate is measured again. Defaults to 10 minutes.
+            headroom (float): Fraction of the estimate used for streaming. Defaults to 0.8.
+            min_size (int): Size of the first test transfer. Defaults to 64 KiB.
+            max_size (int): Size of the largest test transfer. Defaults to 16 MiB.
+            target_seconds (float): Sizes grow until a transfer lasts this long. Defaults to 1 second.
+        """
+        self.api = api
+        self.alpha = alpha
+        self.ttl = ttl
+        self.headroom = headroom
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_seconds = target_seconds
+        self.media_info = api.generated.MediaInfoApi(api.client)
+
+    def __repr__(self) -> str:
+        return f"<Bandwidth url='{self.api.url}', estimate={_ESTIMATES.get(self._key())}>"
+
+    def _key(self) -> Tuple[str, str]:
+        return self.api.url, _local_address(self.api.url)
+
+    def _transfer(self, size: int) -> Tuple[float, float]:
+        """ Seconds to the first byte and to the last byte of a test transfer. """
+        started = time.monotonic()
+        response = self.media_info.get_bitrate_test_bytes_without_preload_content(size=size)
+        try:
+            if not 200 <= response.status <= 299:
+                raise ApiException(status=response.status, reason=response.reason)
+            first = None
+            for _ in response.stream(64 * 1024):
+                if first is None:
+                    first = time.monotonic() - started
+            return first or 0.0, time.monotonic() - started
+        finally:
+            response.release_conn()
+
+    def measure(self) -> Estimate:
+        """
+        Measures the round trip time with tiny transfers and the throughput with
+        growing ones, until a transfer lasts `target_seconds` or reaches `max_size`.
+        The samples, and the previous estimate of the same network, are smoothed.
+
+        Raises:
+            ApiException: If the server rejects the test.
+
+        Returns:
+            Estimate: The new estimate, cached for this server and network.
+        """
+        key = self._key()
+        rtt = min(self._transfer(1)[1] for _ in range(3))
+
+        bitrate, size = None, self.min_size
+        while True:
+            _, seconds = self._transfer(size)
+            sample = size * 8 / max(seconds - rtt, 1e-6)
+            bitrate = sample if bitrate is None else self.alpha * sample + (1 - self.alpha) * bitrate
+            if seconds >= self.target_seconds or size >= self.max_size:
+                break
+            size = min(size * 4, self.max_size)
+
+        with _LOCK:
+            previous = _ESTIMATES.get(key)
+            if previous is not None:
+                bitrate = self.alpha * bitrate + (1 - self.alpha) * previous.bitrate
+                rtt = self.alpha * rtt + (1 - self.alpha) * previous.rtt
+            estimate = _ESTIMATES[key] = Estimate(bitrate, rtt)
+        return estimate
+
+    @property
+    def estimate(self) -> Estimate:
+        """ Returns the cached estimate of this server and network, measured if missing or older than the ttl. """
+        estimate = _ESTIMATES.get(self._key())
+        if estimate is None or time.monotonic() - estimate.measured > self.ttl:
+            estimate = self.measure()
+        return estimate
+
+    @property
+    def max_streaming_bitrate(self) -> int:
+        """ Returns the bitrate to request, the estimate less the headroom, in bits per second. """
+        return int(self.estimate.bitrate * self.headroom)
+
+    def playback_info(self, item: Item | str | uuid.UUID, **params: Any) -> BaseModel:
+        """
+        Requests the playback info of an item with the estimated bitrate.
+
+        Args:
+            item (Item | str | uuid.UUID): The item.
+            **params: Any other argument of MediaInfoApi.get_posted_playback_info, an explicit
+                max_streaming_bitrate is kept.
+
+        Returns:
+            PlaybackInfoResponse: The media sources with the play method decided by the server.
+        """
+        item_id = uuid.UUID(_item_id(item.id if isinstance(item, Item) else item))
+        params.setdefault('max_streaming_bitrate', self.max_streaming_bitrate)
+        return self.media_info.get_posted_playback_info(item_id, **params)
+
+    def universal_audio_url(self, item: Item | str | uuid.UUID, **params: Any) -> str:
+        """
+        Returns the URL of the universal audio stream of an item with the estimated bitrate,
+        authenticated in the query for players that can not send headers.
+
+        Args:
+            item (Item | str | uuid.UUID): The item.
+            **params: Any other argument of UniversalAudioApi.get_universal_audio_stream, an explicit
+                max_streaming_bitrate is kept.
+
+        Returns:
+            str: The URL of the stream.
+        """
+        item_id = uuid.UUID(_item_id(item.id if isinstance(item, Item) else item))
+        params.setdefault('max_streaming_bitrate', self.max_streaming_bitrate)
+        return self.api.urls.url('UniversalAudioApi', 'get_universal_audio_stream', item_id=item_id, **params)
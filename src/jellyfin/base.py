@@ -1,10 +1,21 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from copy import deepcopy
+from datetime import date
 from itertools import islice
+from collections import OrderedDict
+from enum import Enum
+from uuid import UUID
 import rich
 
+from jellyfin import jsonpath
 from rich.repr import Result
 from typing_extensions import Self
 from typing import (
     Any, 
+    Dict,
+    Iterator,
     List, 
     Protocol, 
     Callable
@@ -15,13 +26,212 @@ from pydantic import BaseModel
 
 class Pagination(Protocol):
     """ Protocol for paginated responses. """
+    @property
+    def page_size(self) -> int: ...
     def next_page(self) -> BaseModel: ...
+    def page(self, start: int, limit: int) -> Collection: ...
+    def raw_pages(self, start: int = None) -> Iterator[List[dict]]: ...
+
+def _normalize(value: Any) -> Any:
+    """ Makes enums, UUIDs and their string forms comparable. """
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, UUID):
+        return value.hex
+    if isinstance(value, str) and len(value) in (32, 36):
+        try:
+            return UUID(value).hex
+        except ValueError:
+            pass
+    return value
+
+def _dump(model: BaseModel) -> dict:
+    """ Dumps a model as the server sends it: field aliases, IDs in hex and dates in ISO 8601. """
+    def convert(value: Any) -> Any:
+        if isinstance(value, dict):
+            return {key: convert(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [convert(item) for item in value]
+        if isinstance(value, UUID):
+            return value.hex
+        if isinstance(value, Enum):
+            return value.value
+        if isinstance(value, date):
+            return value.isoformat()
+        return value
+    return convert(model.model_dump(by_alias=True, exclude_none=True))
+
+def _matches(item: Any, fields: Dict[str, Any]) -> bool:
+    """ True if every attribute is equal to the value, or in it for lists, tuples and sets. """
+    for name, expected in fields.items():
+        value = _normalize(getattr(item, name, None))
+        if isinstance(expected, (list, tuple, set)):
+            if value not in {_normalize(option) for option in expected}:
+                return False
+        elif value != _normalize(expected):
+            return False
+    return True
+
+def _key(key: str | Callable) -> Callable:
+    """ Accepts an attribute name where a key function is expected. """
+    if callable(key):
+        return key
+    return lambda item: getattr(item, key)
+
+class Stream():
+    """ Lazy chain of operations, nothing is fetched until iterated.
+
+    Pages are requested only when the previous one was consumed, so `take`
+    stops the pagination as soon as enough items were produced.
+
+    Usage:
+        collection.where(lambda item: item.community_rating > 8).map(lambda item: item.name).take(10).list()
+    """
+
+    def __init__(self, source: Callable[[], Iterator]):
+        """
+        Args:
+            source (Callable): Returns a new iterator each time the stream is iterated.
+        """
+        self._source = source
+
+    def __iter__(self) -> Iterator:
+        return iter(self._source())
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} (lazy)>"
+
+    def _chain(self, operation: Callable[[Iterator], Iterator]) -> Stream:
+        return Stream(lambda: operation(iter(self)))
+
+    def where(self, predicate: Callable[[Any], bool] = None, **fields: Any) -> Stream:
+        """
+        Keep the items matching the predicate and attribute values.
+
+        Args:
+            predicate (Callable, optional): Returns True for the items to keep.
+            **fields: Attribute values to match, a list matches any of its values.
+
+        Returns:
+            Stream: A new lazy stream.
+        """
+        def operation(items: Iterator) -> Iterator:
+            for item in items:
+                if (not fields or _matches(item, fields)) and (predicate is None or predicate(item)):
+                    yield item
+        return self._chain(operation)
+
+    def map(self, fn: Callable[[Any], Any]) -> Stream:
+        """ Transform each item with the function. """
+        return self._chain(lambda items: map(fn, items))
+
+    def select(self, *fields: str) -> Stream:
+        """ Produce a dict with only the given attributes of each item. """
+        return self.map(lambda item: {name: getattr(item, name, None) for name in fields})
+
+    def chunk(self, size: int) -> Stream:
+        """
+        Group consecutive items in lists of up to size items.
+
+        Raises:
+            ValueError: If size is not positive.
+        """
+        if size <= 0:
+            raise ValueError("Chunk size must be a positive integer.")
+
+        def operation(items: Iterator) -> Iterator:
+            while True:
+                chunk = list(islice(items, size))
+                if not chunk:
+                    return
+                yield chunk
+        return self._chain(operation)
+
+    def take(self, n: int) -> Stream:
+        """ Stop after n items, no more pages are fetched. """
+        return self._chain(lambda items: islice(items, n))
+
+    def distinct_by(self, key: str | Callable) -> Stream:
+        """ Keep only the first item of each key, an attribute name or function. """
+        key = _key(key)
+
+        def operation(items: Iterator) -> Iterator:
+            seen = set()
+            for item in items:
+                value = _normalize(key(item))
+                if value not in seen:
+                    seen.add(value)
+                    yield item
+        return self._chain(operation)
+
+    def group_by(self, key: str | Callable) -> Dict[Any, List]:
+        """
+        Group all items by key, an attribute name or function. Consumes the stream.
+
+        Returns:
+            Dict[Any, List]: The items of each key, in the order found.
+        """
+        key = _key(key)
+        groups = {}
+        for item in self:
+            groups.setdefault(key(item), []).append(item)
+        return groups
+
+    def list(self) -> List:
+        """ Consume the stream in a list. """
+        return list(self)
+
+    @property
+    def first(self) -> Any | None:
+        return next(iter(self), None)
+
+class Operators(ABC):
+    """ Lazy operators delegated to `stream`, see Stream. """
+
+    @property
+    @abstractmethod
+    def stream(self) -> Stream:
+        """ Returns a lazy stream over the items. """
+
+    def where(self, predicate: Callable[[Any], bool] = None, **fields: Any) -> Stream:
+        """ Keep the items matching the predicate and attribute values, see Stream.where. """
+        return self.stream.where(predicate, **fields)
+
+    def map(self, fn: Callable[[Any], Any]) -> Stream:
+        """ Transform each item with the function, see Stream.map. """
+        return self.stream.map(fn)
+
+    def select(self, *fields: str) -> Stream:
+        """ Produce a dict with only the given attributes of each item, see Stream.select. """
+        return self.stream.select(*fields)
+
+    def chunk(self, size: int) -> Stream:
+        """ Group consecutive items in lists, see Stream.chunk. """
+        return self.stream.chunk(size)
+
+    def take(self, n: int) -> Stream:
+        """ Stop after n items, see Stream.take. """
+        return self.stream.take(n)
+
+    def distinct_by(self, key: str | Callable) -> Stream:
+        """ Keep only the first item of each key, see Stream.distinct_by. """
+        return self.stream.distinct_by(key)
+
+    def group_by(self, key: str | Callable) -> Dict[Any, List]:
+        """ Group all items by key, see Stream.group_by. """
+        return self.stream.group_by(key)
 
 class Model():
     _model: BaseModel
+    _dirty: set
+    _watched: dict | None
+    # fields never compared by track, e.g. not editable
+    _readonly: tuple = ()
     
     def __init__(self, model: BaseModel):
         self._model = model
+        self._dirty = set()
+        self._watched = None
 
     @property
     def model(self) -> BaseModel:
@@ -29,10 +239,11 @@ class Model():
         return self._model
     
     def __setattr__(self, name, value):
-        if name in ("_model", "model"):
+        if name in ("_model", "model", "_dirty", "_watched"):
             super().__setattr__(name, value)
         elif hasattr(self.model, name):
             setattr(self.model, name, value)
+            self._dirty.add(name)
         else:
             raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{name}'")
     
@@ -41,6 +252,41 @@ class Model():
             return getattr(self.model, name)
         raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{name}'")
 
+    def track(self) -> Self:
+        """
+        Snapshot the list, dict and model fields, so in-place changes like
+        item.tags.append() or item.people[0].role = 'Narrator' are dirty too.
+
+        Fields assigned are always dirty, the snapshot is only needed for
+        in-place changes, and costs a deep copy of those fields once.
+
+        Returns:
+            Model: The current instance (for chaining).
+        """
+        self._watched = {
+            name: deepcopy(value) for name, value in self.model
+            if isinstance(value, (list, dict, BaseModel)) and name not in self._readonly
+        }
+        return self
+
+    @property
+    def dirty(self) -> set:
+        """Returns the name of the fields assigned, or changed in place if tracked, since loaded or last saved."""
+        if not self._watched:
+            return set(self._dirty)
+        changed = {
+            name for name, value in self._watched.items()
+            if getattr(self.model, name) != value
+        }
+        return self._dirty | changed
+
+    def clean(self) -> Self:
+        """Forget the changes made, usually after they are saved."""
+        self._dirty.clear()
+        if self._watched is not None:
+            self.track()
+        return self
+
     def __str__(self) -> str:
         """Returns the string representation of the model."""
         return self._model.__str__()
@@ -57,11 +303,16 @@ class Model():
         """Prints a pretty representation of the model using rich."""
         rich.print(self)
 
-class Collection(Sequence):
+class Collection(Sequence, Operators):
     _factory: Callable = Model
     _model: Model = None
     _data: List[BaseModel]
     _pagination: Pagination
+    _cache: dict
+    _pending: List[Model]
+    _pages: OrderedDict
+    # pages kept in memory for random access, besides the loaded one
+    max_pages: int = 8
 
     def __init__(self, data: List[BaseModel] | Model, pagination: Pagination = None):
         if not isinstance(data, (list, Model)):
@@ -69,10 +320,16 @@ class Collection(Sequence):
         
         self._data = data
         self._pagination = pagination
+        self._cache = {}
+        self._pending = []
+        self._pages = OrderedDict()
 
         if isinstance(data, Model):
             self._model = data
             self._data = data.items
+
+        # the requested limit, the first page may be shorter than the others
+        self._page_size = pagination.page_size if pagination is not None else len(self._data)
             
     def __iter__(self):
         """
@@ -85,7 +342,7 @@ class Collection(Sequence):
         """        
         while True:
             for item in self.data:
-                yield self._factory(item)
+                yield self._wrap(item)
 
             if self._pagination is None:
                 break
@@ -94,9 +351,24 @@ class Collection(Sequence):
             if len(collection.data) == 0:
                 break
 
+            self._pending = self.modified
+            self._cache = {}
             self._model = collection.model
             self._data = collection.data
 
+    def _wrap(self, item: BaseModel) -> Model:
+        """Returns the same wrapper for the same item of the loaded page."""
+        key = id(item)
+        if key not in self._cache:
+            self._cache[key] = self._factory(item)
+        return self._cache[key]
+
+    @property
+    def modified(self) -> List[Model]:
+        """Returns the items with changes not saved, including from pages already iterated."""
+        self._pending = [model for model in self._pending if model.dirty]
+        return self._pending + [model for model in self._cache.values() if model.dirty]
+
     @property
     def model(self) -> Model | None:
         """Returns the reference model."""
@@ -107,8 +379,64 @@ class Collection(Sequence):
         """Returns the reference list of items inside model."""
         return self._data
 
+    @property
+    def _start(self) -> int:
+        """Returns the position of the loaded page in the whole result."""
+        if self._model is None or self._pagination is None:
+            return 0
+        return self._model.start_index or 0
+
+    def _page(self, start: int) -> List[BaseModel]:
+        """Returns the page starting at the position, fetching it if not in memory."""
+        if start == self._start:
+            return self.data
+        if start in self._pages:
+            self._pages.move_to_end(start)
+            return self._pages[start]
+
+        page = self._pagination.page(start, self._page_size).data
+        self._pages[start] = page
+        while len(self._pages) > self.max_pages:
+            _, evicted = self._pages.popitem(last=False)
+            for item in evicted:
+                model = self._cache.pop(id(item), None)
+                if model is not None and model.dirty:
+                    self._pending.append(model)
+        return page
+
+    def _item(self, idx: int) -> Model:
+        """Returns the item at a position of the whole result, loading its page when needed."""
+        if self._pagination is None or self._page_size == 0:
+            return self._wrap(self.data[idx])
+
+        size = len(self)
+        if idx < 0:
+            idx += size
+        if not 0 <= idx < size:
+            raise IndexError("collection index out of range")
+
+        start = idx - idx % self._page_size
+        page = self._page(start)
+        if idx - start >= len(page):
+            raise IndexError("collection index out of range")
+        return self._wrap(page[idx - start])
+
     def __getitem__(self, idx) -> Any:
-        return self._factory(self.data[idx])
+        """
+        Returns the item at a position of the whole result, not only of the loaded page.
+
+        Pages are fetched on demand and the last `max_pages` kept in memory.
+        Slices return a lazy view, fetching only the pages of the items read.
+
+        Usage:
+            collection = api.items.search.recursive().paginate(100).all
+            collection[5000]
+            for item in collection[1000:1050]:
+                print(item.name)
+        """
+        if isinstance(idx, slice):
+            return CollectionView(self, range(len(self))[idx])
+        return self._item(idx)
     
     def __len__(self) -> int:
         """
@@ -122,6 +450,34 @@ class Collection(Sequence):
 
         return self._model.total_record_count
 
+    @property
+    def stream(self) -> Stream:
+        """Returns a lazy stream over all items, fetching the pages while consumed."""
+        return Stream(lambda: iter(self))
+
+    def jsonpath(self, expression: str) -> Stream:
+        """
+        Evaluate a JSONPath expression over each item, with the server field names.
+
+        Paginated collections decode the pages again without building the
+        models, one page at a time from the first item.
+
+        Args:
+            expression (str): The JSONPath expression, compiled once.
+
+        Returns:
+            Stream: A lazy stream of the matching values.
+
+        Usage:
+            collection.jsonpath('$.MediaStreams[?(@.Type=="Subtitle")].Language')
+        """
+        path = jsonpath.compile_path(expression)
+        if self._pagination is not None:
+            documents = lambda: (item for page in self._pagination.raw_pages(0) for item in page)
+        else:
+            documents = lambda: (_dump(item) for item in self.data)
+        return Stream(lambda: path.findall(documents()))
+
     @property
     def first(self) -> Model | None:
         if len(self) == 0:
@@ -137,4 +493,32 @@ class Collection(Sequence):
     @property
     def pretty(self):
         """Prints a pretty representation of the model using rich."""
-        rich.print(self)
\ No newline at end of file
+        rich.print(self)
+
+
+class CollectionView(Sequence):
+    """ Lazy slice of a Collection, items are read from the collection when accessed. """
+
+    def __init__(self, collection: Collection, positions: range):
+        self._collection = collection
+        self._positions = positions
+
+    def __getitem__(self, idx) -> Any:
+        if isinstance(idx, slice):
+            return CollectionView(self._collection, self._positions[idx])
+        return self._collection._item(self._positions[idx])
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __iter__(self):
+        for position in self._positions:
+            yield self._collection._item(position)
+
+    def __repr__(self) -> str:
+        positions = self._positions
+        return f"<{self.__class__.__name__} of {self._collection.__class__.__name__}[{positions.start}:{positions.stop}:{positions.step}]>"
+
+    def __rich_repr__(self) -> Result:
+        yield 'data', list(self)
+        yield 'count', len(self)
@@ -0,0 +1,121 @@
+"""
+Module `blurhash` - Batch decoding of BlurHash placeholders with NumPy.
+
+Requires the optional dependency: pip install jellyfin-sdk[blurhash]
+"""
+from __future__ import annotations
+
+import numpy as np
+
+from typing import Dict, Iterable, List, Tuple
+
+_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
+_DIGITS = {char: index for index, char in enumerate(_ALPHABET)}
+
+def _decode83(text: str) -> int:
+    value = 0
+    for char in text:
+        try:
+            value = value * 83 + _DIGITS[char]
+        except KeyError:
+            raise ValueError(f"Invalid blurhash character: {char!r}")
+    return value
+
+def _srgb_to_linear(values: np.ndarray) -> np.ndarray:
+    values = values / 255.0
+    return np.where(values <= 0.04045, values / 12.92, ((values + 0.055) / 1.055) ** 2.4)
+
+def _linear_to_srgb(values: np.ndarray) -> np.ndarray:
+    values = np.clip(values, 0.0, 1.0)
+    values = np.where(values <= 0.0031308, values * 12.92, 1.055 * values ** (1 / 2.4) - 0.055)
+    return (values * 255 + 0.5).astype(np.uint8)
+
+def components(blurhash: str, punch: float = 1.0) -> np.ndarray:
+    """
+    Returns the DCT components of a blurhash in linear RGB.
+
+    Args:
+        blurhash (str): The blurhash.
+        punch (float): Contrast of the colors. Defaults to 1.
+
+    Raises:
+        ValueError: If the blurhash is not valid.
+
+    Returns:
+        np.ndarray: Array of shape (components y, components x, 3).
+    """
+    if len(blurhash) < 6:
+        raise ValueError(f"Invalid blurhash, too short: {blurhash!r}")
+
+    size = _decode83(blurhash[0])
+    count_y, count_x = size // 9 + 1, size % 9 + 1
+    if len(blurhash) != 4 + 2 * count_x * count_y:
+        raise ValueError(f"Invalid blurhash length {len(blurhash)}, expected {4 + 2 * count_x * count_y}: {blurhash!r}")
+
+    maximum = (_decode83(blurhash[1]) + 1) / 166 * punch
+    colors = np.empty((count_x * count_y, 3))
+
+    dc = _decode83(blurhash[2:6])
+    colors[0] = _srgb_to_linear(np.array([dc >> 16, (dc >> 8) & 255, dc & 255], dtype=float))
+
+    ac = np.array([_decode83(blurhash[4 + i * 2:6 + i * 2]) for i in range(1, count_x * count_y)], dtype=float)
+    if len(ac):
+        quantized = np.stack([ac // (19 * 19), (ac // 19) % 19, ac % 19], axis=1)
+        normalized = (quantized - 9) / 9
+        colors[1:] = np.sign(normalized) * normalized ** 2 * maximum
+
+    return colors.reshape(count_y, count_x, 3)
+
+def decode_many(blurhashes: Iterable[str], width: int = 32, height: int = 32, punch: float = 1.0) -> List[np.ndarray]:
+    """
+    Decodes many blurhashes to RGB images at once.
+
+    Hashes with the same number of components are evaluated together in a
+    single vectorized product with the cosine bases, computed once per shape.
+
+    Args:
+        blurhashes (Iterable[str]): The blurhashes.
+        width (int): Width of the images. Defaults to 32.
+        height (int): Height of the images. Defaults to 32.
+        punch (float): Contrast of the colors. Defaults to 1.
+
+    Raises:
+        ValueError: If a blurhash is not valid.
+
+    Returns:
+        List[np.ndarray]: Arrays of shape (height, width, 3) of uint8, in the same order.
+    """
+    groups: Dict[Tuple[int, int], List[Tuple[int, np.ndarray]]] = {}
+    count = 0
+    for index, blurhash in enumerate(blurhashes):
+        colors = components(blurhash, punch)
+        groups.setdefault(colors.shape[:2], []).append((index, colors))
+        count += 1
+
+    images: List[np.ndarray] = [None] * count
+    for (count_y, count_x), entries in groups.items():
+        basis_x = np.cos(np.pi * np.outer(np.arange(width), np.arange(count_x)) / width)
+        basis_y = np.cos(np.pi * np.outer(np.arange(height), np.arange(count_y)) / height)
+        colors = np.stack([colors for _, colors in entries])
+        pixels = _linear_to_srgb(np.einsum('yj,xi,bjic->byxc', basis_y, basis_x, colors, optimize=True))
+        for (index, _), image in zip(entries, pixels):
+            images[index] = image
+    return images
+
+def decode(blurhash: str, width: int = 32, height: int = 32, punch: float = 1.0) -> np.ndarray:
+    """
+    Decodes a blurhash to a RGB image.
+
+    Args:
+        blurhash (str): The blurhash.
+        width (int): Width of the image. Defaults to 32.
+        height (int): Height of the image. Defaults to 32.
+        punch (float): Contrast of the colors. Defaults to 1.
+
+    Raises:
+        ValueError: If the blurhash is not valid.
+
+    Returns:
+        np.ndarray: Array of shape (height, width, 3) of uint8.
+    """
+    return decode_many([blurhash], width, height, punch)[0]
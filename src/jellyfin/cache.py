@@ -0,0 +1,214 @@
+"""
+Module `cache` - In-process item cache kept fresh by the server websocket.
+"""
+from __future__ import annotations
+
+import threading
+
+from typing import Dict, Iterable, List, Set, Tuple
+from uuid import UUID
+from pydantic import BaseModel
+
+from jellyfin.events import Events
+from jellyfin.items import Item, _item_id
+from jellyfin.generated import ItemFields, SessionMessageType
+
+class ItemCache():
+    """ Items and user data kept in memory and updated from LibraryChanged
+    and UserDataChanged messages, only the changed items are fetched again.
+
+    Usage:
+        cache = ItemCache(api).start()
+        cache.load(api.items.search.recursive().paginate(1000).all)
+        cache.get('f674245b84ea4d3ea9cf11')
+        cache.user_data(user_id, item_id)
+    """
+
+    def __init__(
+            self,
+            api: Api,
+            events: Events = None,
+            fields: List[ItemFields] = None,
+            delay: float = 1.0,
+            workers: int = 4
+        ):
+        """
+        Initializes the item cache.
+
+        Args:
+            api (Api): An instance of the Api class.
+            events (Events, optional): The websocket client to subscribe. Defaults to `api.events`.
+            fields (List[ItemFields], optional): Extra fields requested when fetching items.
+            delay (float): Seconds to wait collecting changes before fetching them in a batch. Defaults to 1.
+            workers (int): Number of concurrent requests of a batch. Defaults to 4.
+        """
+        self.api = api
+        self.events = events if events is not None else api.events
+        self.fields = fields or []
+        self.delay = delay
+        self.workers = workers
+
+        self._items: Dict[str, BaseModel] = {}
+        self._user_data: Dict[Tuple[str, str], BaseModel] = {}
+        self._pending: Set[str] = set()
+        self._lock = threading.Lock()
+        self._changed = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __repr__(self) -> str:
+        return f"<ItemCache items={len(self._items)}, user_data={len(self._user_data)}, pending={len(self._pending)}>"
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, item_id: str | UUID) -> bool:
+        return _item_id(item_id) in self._items
+
+    def get(self, item_id: str | UUID, fetch: bool = True) -> Item | None:
+        """
+        Returns a cached item.
+
+        Args:
+            item_id (str | UUID): The ID of the item.
+            fetch (bool): Fetch the item from the server when not cached. Defaults to True.
+
+        Returns:
+            Item | None: The item, None if not cached (or not found).
+        """
+        item_id = _item_id(item_id)
+        model = self._items.get(item_id)
+        if model is None and fetch:
+            self.refresh([item_id])
+            model = self._items.get(item_id)
+        return Item(model) if model is not None else None
+
+    def user_data(self, user_id: str | UUID, item_id: str | UUID) -> BaseModel | None:
+        """
+        Returns the cached user data of an item.
+
+        Args:
+            user_id (str | UUID): The ID of the user.
+            item_id (str | UUID): The ID of the item.
+
+        Returns:
+            UserItemDataDto | None: The user data if received or loaded with the item.
+        """
+        return self._user_data.get((_item_id(user_id), _item_id(item_id)))
+
+    def load(self, items: Iterable[Item | BaseModel]) -> ItemCache:
+        """
+        Add items to the cache, like the result of a search.
+
+        Args:
+            items (Iterable[Item | BaseModel]): The items to cache.
+
+        Returns:
+            ItemCache: The current ItemCache instance (for chaining).
+        """
+        user_id = self.api.user.id.hex if self.api.user is not None else None
+        for item in items:
+            model = item.model if isinstance(item, Item) else item
+            self._items[model.id.hex] = model
+            if user_id is not None and model.user_data is not None:
+                self._user_data[(user_id, model.id.hex)] = model.user_data
+        return self
+
+    def refresh(self, ids: Iterable[str | UUID]) -> None:
+        """
+        Fetch items from the server in batch, removing the ones not found.
+
+        Args:
+            ids (Iterable[str | UUID]): The IDs of the items.
+        """
+        ids = [_item_id(item_id) for item_id in ids]
+        if not ids:
+            return
+
+        params = {'fields': self.fields} if self.fields else {}
+        if self.api.user is not None:
+            params['user_id'] = self.api.user.id
+        found = self.api.items.by_ids(ids, workers=self.workers, **params)
+
+        with self._lock:
+            for item_id in found.keys():
+                self._items[item_id] = found.get(item_id).model
+            for item_id in found.missing:
+                self._items.pop(item_id, None)
+
+    def on_library_changed(self, message: BaseModel) -> None:
+        """ Drop removed items and schedule added or updated ones to be fetched. """
+        info = message.data
+        if info is None:
+            return
+
+        with self._lock:
+            for item_id in info.items_removed or []:
+                item_id = _item_id(item_id)
+                self._items.pop(item_id, None)
+                self._pending.discard(item_id)
+            changed = [_item_id(item_id) for item_id in info.items_updated or []]
+            # updated items are fetched only if already cached
+            self._pending.update(item_id for item_id in changed if item_id in self._items)
+            self._pending.update(_item_id(item_id) for item_id in info.items_added or [])
+            if self._pending:
+                self._changed.set()
+
+    def on_user_data_changed(self, message: BaseModel) -> None:
+        """ Store the user data received, no request is needed. """
+        info = message.data
+        if info is None or info.user_id is None:
+            return
+
+        user_id = info.user_id.hex
+        with self._lock:
+            for user_data in info.user_data_list or []:
+                if user_data.item_id is None:
+                    continue
+                item_id = user_data.item_id.hex
+                self._user_data[(user_id, item_id)] = user_data
+                model = self._items.get(item_id)
+                if model is not None and self.api.user is not None and self.api.user.id.hex == user_id:
+                    model.user_data = user_data
+
+    def _flush(self) -> None:
+        while not self._stop.is_set():
+            self._changed.wait()
+            if self._stop.wait(self.delay):
+                break
+            with self._lock:
+                ids, self._pending = self._pending, set()
+                self._changed.clear()
+            try:
+                self.refresh(ids)
+            except Exception:
+                # try again on the next change
+                with self._lock:
+                    self._pending |= ids
+
+    def start(self) -> ItemCache:
+        """
+        Subscribe the websocket messages and start fetching the changes.
+
+        Returns:
+            ItemCache: The current ItemCache instance (for chaining).
+        """
+        if self._thread is not None:
+            return self
+        self.events.on(SessionMessageType.LIBRARYCHANGED, self.on_library_changed)
+        self.events.on(SessionMessageType.USERDATACHANGED, self.on_user_data_changed)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._flush, name='jellyfin-cache', daemon=True)
+        self._thread.start()
+        self.events.start()
+        return self
+
+    def stop(self) -> None:
+        """ Unsubscribe the websocket messages, the websocket client keeps running. """
+        self.events.off(SessionMessageType.LIBRARYCHANGED, self.on_library_changed)
+        self.events.off(SessionMessageType.USERDATACHANGED, self.on_user_data_changed)
+        self._stop.set()
+        self._changed.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._thread = None
@@ -0,0 +1,328 @@
+"""
+Module `cluster` - Federated queries over multiple Jellyfin servers.
+"""
+from __future__ import annotations
+
+import heapq, queue, threading
+
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, List
+from typing_extensions import Self
+
+from jellyfin.base import _dump
+from jellyfin.items import Item, ItemCollection, ItemSearch
+from jellyfin.generated import ItemFields, ItemSortBy, SortOrder
+
+_DONE = object()
+
+# sort fields merged locally: the item attribute, the optional field it needs
+# and whether it compares case-insensitively like the server
+_SORT_KEYS = {
+    ItemSortBy.NAME: ('name', None, True),
+    ItemSortBy.SORTNAME: ('sort_name', ItemFields.SORTNAME, True),
+    ItemSortBy.DATECREATED: ('date_created', ItemFields.DATECREATED, False),
+    ItemSortBy.PREMIEREDATE: ('premiere_date', None, False),
+    ItemSortBy.STARTDATE: ('start_date', None, False),
+    ItemSortBy.PRODUCTIONYEAR: ('production_year', None, False),
+    ItemSortBy.COMMUNITYRATING: ('community_rating', None, False),
+    ItemSortBy.CRITICRATING: ('critic_rating', None, False),
+    ItemSortBy.OFFICIALRATING: ('official_rating', None, False),
+    ItemSortBy.RUNTIME: ('run_time_ticks', None, False),
+    ItemSortBy.INDEXNUMBER: ('index_number', None, False),
+    ItemSortBy.PARENTINDEXNUMBER: ('parent_index_number', None, False),
+}
+
+class ClusterCollection():
+    """ Streaming result of a search executed on every server of a cluster.
+
+    Items are produced while the servers are still paginating, the
+    `errors` attribute is filled with the Api of the servers that failed
+    or timed out, many Api can share a URL with other users or keys.
+
+    Usage:
+        result = cluster.search.recursive().paginate(500).all
+        for item in result:
+            print(item.server_id, item.name)
+        for api, error in result.errors.items():
+            print(api.url, error)
+    """
+
+    def __init__(self, search: ClusterSearch):
+        self._search = search
+        self.errors: Dict[Api, Exception] = {}
+
+    def _put(self, out: queue.Queue, item: Any, stop: threading.Event) -> bool:
+        while not stop.is_set():
+            try:
+                out.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self, api: Api, out: queue.Queue, stop: threading.Event):
+        """ Paginate a single server pushing the items in a bounded queue. """
+        try:
+            search = api.items.search
+            search._params = dict(self._search._params)
+            search._page_size = self._search._page_size
+            for item in search.all:
+                if not self._put(out, item, stop):
+                    return
+        except Exception as e:
+            self.errors[api] = e
+        finally:
+            self._put(out, _DONE, stop)
+
+    def _consume(self, out: queue.Queue) -> Iterator[Item]:
+        while True:
+            item = out.get()
+            if item is _DONE:
+                return
+            yield item
+
+    def _streams(self, stop: threading.Event, threads: List[threading.Thread]) -> List[Iterator[Item]]:
+        streams = []
+        for api in self._search.cluster.apis:
+            out = queue.Queue(maxsize=self._search.cluster.buffer)
+            # daemon, a consumer never closing the iteration must not keep the process alive
+            thread = threading.Thread(target=self._produce, args=(api, out, stop), daemon=True)
+            thread.start()
+            threads.append(thread)
+            streams.append(self._consume(out))
+        return streams
+
+    def _merge(self, streams: List[Iterator[Item]]) -> Iterator[Item]:
+        key = self._search._key
+        if key is None:
+            return self._interleave(streams)
+
+        def nullable(item: Item):
+            value = key(item)
+            return (value is None, value) if not self._search._reverse else (value is not None, value)
+
+        return heapq.merge(*streams, key=nullable, reverse=self._search._reverse)
+
+    def _interleave(self, streams: List[Iterator[Item]]) -> Iterator[Item]:
+        """ Round-robin over the servers when no sort key was set. """
+        while streams:
+            for stream in list(streams):
+                try:
+                    yield next(stream)
+                except StopIteration:
+                    streams.remove(stream)
+
+    def __iter__(self) -> Iterator[Item]:
+        self.errors.clear()
+        seen = set()
+        stop = threading.Event()
+        threads = []
+        try:
+            for item in self._merge(self._streams(stop, threads)):
+                if self._search._dedupe:
+                    ids = {
+                        (provider.lower(), value)
+                        for provider, value in (item.provider_ids or {}).items() if value
+                    }
+                    if ids & seen:
+                        continue
+                    seen |= ids
+                yield item
+        finally:
+            # the producers end after their current request when the iteration is closed
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+    @property
+    def first(self) -> Item | None:
+        return next(iter(self), None)
+
+    def __repr__(self) -> str:
+        return f"<ClusterCollection servers={len(self._search.cluster.apis)}, errors={len(self.errors)}>"
+
+class ClusterSearch(ItemSearch):
+    """ Same builder as ItemSearch, but executed on every server of the cluster.
+
+    Usage:
+        cluster = jellyfin.cluster([api1, api2, api3], timeout=5)
+        cluster.search.recursive().paginate(200).sort(ItemSortBy.SORTNAME).dedupe().all
+    """
+    _attributes = ItemSearch._attributes + ("cluster", "_key", "_reverse", "_dedupe", "_position")
+
+    def __init__(self, cluster: Cluster):
+        self.cluster = cluster
+        self._params = {}
+        self._page_size = 0
+        self._key = None
+        self._reverse = False
+        self._dedupe = False
+        self._position = 0
+
+        if cluster.timeout is not None:
+            self._params['_request_timeout'] = float(cluster.timeout)
+
+    def __repr__(self) -> str:
+        return super().__repr__().replace("<ItemSearch", "<ClusterSearch", 1)
+
+    def sort(
+            self,
+            by: ItemSortBy | str,
+            order: SortOrder = SortOrder.ASCENDING,
+            key: Callable[[Item], Any] = None
+        ) -> Self:
+        """ Sort every server by the same field and k-way merge the results.
+
+        Without a key, only the fields the items carry can be merged locally:
+        Name and SortName (case-insensitive), DateCreated, PremiereDate, StartDate,
+        ProductionYear, CommunityRating, CriticRating, OfficialRating, Runtime,
+        IndexNumber and ParentIndexNumber.
+
+        Args:
+            by (ItemSortBy | str): The server side sort field.
+            order (SortOrder): The sort order. Defaults to ascending.
+            key (Callable, optional): The local merge key. Defaults to the item attribute matching `by`.
+
+        Raises:
+            ValueError: If no key is given and the field cannot be merged locally, e.g. Random.
+
+        Returns:
+            ClusterSearch: The current ClusterSearch instance (for chaining).
+        """
+        by = ItemSortBy(by)
+        if key is None:
+            if by not in _SORT_KEYS:
+                raise ValueError(f"Sorting by {by.value} cannot be merged across servers without a key.")
+            attribute, field, casefold = _SORT_KEYS[by]
+            def key(item: Item) -> Any:
+                value = getattr(item, attribute)
+                return value.casefold() if casefold and value is not None else value
+            if field is not None:
+                self._fields(field)
+
+        self._params['sort_by'] = [by]
+        self._params['sort_order'] = [SortOrder(order)]
+        self._reverse = SortOrder(order) == SortOrder.DESCENDING
+        self._key = key
+        return self
+
+    def dedupe(self, flag: bool = True) -> Self:
+        """ Drop items already returned by another server with any matching ProviderIds """
+        self._dedupe = flag
+        if flag:
+            self._fields(ItemFields.PROVIDERIDS)
+        return self
+
+    @property
+    def raw(self) -> dict:
+        """
+        Not available on a cluster, a raw response comes from a single server.
+
+        Raises:
+            ValueError: Always, see raw_pages for the merged items as JSON.
+        """
+        raise ValueError("A cluster search has no raw response, use raw_pages for the merged items as JSON.")
+
+    def page(self, start: int, limit: int) -> ItemCollection:
+        """
+        Fetch a single page of the merged results, without moving the pagination.
+
+        Every server is read from its first item until the page is complete,
+        so deep pages cost as much as iterating up to them.
+
+        Args:
+            start (int): The index of the first item in the merged results.
+            limit (int): The maximum number of items.
+
+        Returns:
+            ItemCollection: A collection of items of the page.
+        """
+        search = self._paginated()
+        search._params['start_index'] = 0
+        items = iter(search.all)
+        try:
+            return ItemCollection([item.model for item in islice(items, start, start + limit)])
+        finally:
+            items.close()
+
+    def next_page(self) -> ItemCollection:
+        """
+        Move to the next page of the merged results, see page.
+
+        Returns:
+            ItemCollection: A collection of items for the next page.
+        """
+        size = self._page_size or self._params.get('limit') or 100
+        self._position += size
+        return self.page(self._position, size)
+
+    def raw_pages(self, start: int = None) -> Iterator[List[dict]]:
+        """
+        Execute the search yielding the items of each page of the merged results as JSON.
+
+        The items are built to be merged and deduplicated, then dumped with the
+        server field names, so JSONPath expressions match as on a single server.
+
+        Args:
+            start (int, optional): The index of the first item. Defaults to the current position.
+
+        Returns:
+            Iterator[List[dict]]: The items of each page.
+        """
+        size = self._page_size or self._params.get('limit') or 100
+        search = self._paginated()
+        search._params['start_index'] = 0
+        items = iter(search.all)
+        try:
+            dumped = (_dump(item.model) for item in islice(items, self._position if start is None else start, None))
+            while True:
+                page = list(islice(dumped, size))
+                if not page:
+                    return
+                yield page
+        finally:
+            items.close()
+
+    @property
+    def all(self) -> ClusterCollection:
+        """
+        Execute the search on all servers concurrently.
+
+        Returns:
+            ClusterCollection: A streaming collection merged from all servers.
+        """
+        return ClusterCollection(self)
+
+class Cluster():
+    def __init__(self, apis: List[Api], timeout: float = None, buffer: int = 1000):
+        """
+        Initializes a cluster of Jellyfin servers.
+
+        Args:
+            apis (List[Api]): The Api instances of each server.
+            timeout (float, optional): Timeout in seconds for each request of each server.
+            buffer (int): Maximum of items kept in memory per server while merging. Defaults to 1000.
+
+        Raises:
+            ValueError: If no Api is provided.
+        """
+        if not apis:
+            raise ValueError("At least one Api is required to build a cluster.")
+
+        self.apis = list(apis)
+        self.timeout = timeout
+        self.buffer = buffer
+
+    def __repr__(self) -> str:
+        urls = ",\n ".join(f"'{api.url}'" for api in self.apis)
+        return f"<Cluster\n {urls}\n>"
+
+    @property
+    def search(self) -> ClusterSearch:
+        """
+        Returns a ClusterSearch instance for building search queries.
+
+        Returns:
+            ClusterSearch: An instance of ClusterSearch for building search queries.
+        """
+        return ClusterSearch(self)
@@ -0,0 +1,324 @@
+"""
+Module `decision` - Local playback decisions of a DeviceProfile over media sources.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, FrozenSet, Iterable, List, Tuple
+from pydantic import BaseModel
+
+from jellyfin.items import Item
+from jellyfin.generated import (
+    CodecType,
+    DlnaProfileType,
+    MediaStreamType,
+    PlayMethod,
+    ProfileConditionType,
+    ProfileConditionValue,
+    TranscodeReason
+)
+
+# reason of a failed condition by property, the ones without reason are ignored
+_REASONS: Dict[ProfileConditionValue, TranscodeReason] = {
+    ProfileConditionValue.AUDIOCHANNELS: TranscodeReason.AUDIOCHANNELSNOTSUPPORTED,
+    ProfileConditionValue.AUDIOBITRATE: TranscodeReason.AUDIOBITRATENOTSUPPORTED,
+    ProfileConditionValue.AUDIOPROFILE: TranscodeReason.AUDIOPROFILENOTSUPPORTED,
+    ProfileConditionValue.AUDIOSAMPLERATE: TranscodeReason.AUDIOSAMPLERATENOTSUPPORTED,
+    ProfileConditionValue.AUDIOBITDEPTH: TranscodeReason.AUDIOBITDEPTHNOTSUPPORTED,
+    ProfileConditionValue.WIDTH: TranscodeReason.VIDEORESOLUTIONNOTSUPPORTED,
+    ProfileConditionValue.HEIGHT: TranscodeReason.VIDEORESOLUTIONNOTSUPPORTED,
+    ProfileConditionValue.VIDEOBITDEPTH: TranscodeReason.VIDEOBITDEPTHNOTSUPPORTED,
+    ProfileConditionValue.VIDEOBITRATE: TranscodeReason.VIDEOBITRATENOTSUPPORTED,
+    ProfileConditionValue.VIDEOFRAMERATE: TranscodeReason.VIDEOFRAMERATENOTSUPPORTED,
+    ProfileConditionValue.VIDEOLEVEL: TranscodeReason.VIDEOLEVELNOTSUPPORTED,
+    ProfileConditionValue.VIDEOPROFILE: TranscodeReason.VIDEOPROFILENOTSUPPORTED,
+    ProfileConditionValue.VIDEORANGETYPE: TranscodeReason.VIDEORANGETYPENOTSUPPORTED,
+    ProfileConditionValue.VIDEOCODECTAG: TranscodeReason.VIDEOCODECTAGNOTSUPPORTED,
+    ProfileConditionValue.ISANAMORPHIC: TranscodeReason.ANAMORPHICVIDEONOTSUPPORTED,
+    ProfileConditionValue.ISINTERLACED: TranscodeReason.INTERLACEDVIDEONOTSUPPORTED,
+    ProfileConditionValue.ISAVC: TranscodeReason.VIDEOCODECNOTSUPPORTED,
+    ProfileConditionValue.REFFRAMES: TranscodeReason.REFFRAMESNOTSUPPORTED,
+    ProfileConditionValue.ISSECONDARYAUDIO: TranscodeReason.SECONDARYAUDIONOTSUPPORTED,
+    ProfileConditionValue.NUMAUDIOSTREAMS: TranscodeReason.CONTAINERNOTSUPPORTED,
+    ProfileConditionValue.NUMVIDEOSTREAMS: TranscodeReason.CONTAINERNOTSUPPORTED,
+    ProfileConditionValue.PACKETLENGTH: TranscodeReason.CONTAINERNOTSUPPORTED,
+    ProfileConditionValue.VIDEOTIMESTAMP: TranscodeReason.CONTAINERNOTSUPPORTED,
+}
+
+# reasons that a remux into the container of the transcoding profile solves
+_CONTAINER_REASONS = {TranscodeReason.CONTAINERNOTSUPPORTED}
+
+Condition = Tuple[ProfileConditionValue, ProfileConditionType, Tuple[str, ...], bool]
+
+def _split(value: str | None) -> FrozenSet[str]:
+    """ Lowercase values of a comma separated list, empty means any. """
+    return frozenset(part.strip().lower() for part in (value or '').split(',') if part.strip())
+
+def _any(allowed: FrozenSet[str], values: FrozenSet[str]) -> bool:
+    return not allowed or not allowed.isdisjoint(values)
+
+def _conditions(conditions: Iterable[BaseModel] | None) -> List[Condition]:
+    compiled = []
+    for condition in conditions or []:
+        if condition.condition is None or condition.var_property is None:
+            continue
+        values = tuple(part.strip().lower() for part in (condition.value or '').split('|'))
+        compiled.append((condition.var_property, condition.condition, values, bool(condition.is_required)))
+    return compiled
+
+def _number(value: Any) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _check(condition: Condition, actual: Any) -> bool:
+    """ Same semantics as the server: an unknown value passes unless the condition is required. """
+    _, operator, expected, required = condition
+    if actual is None:
+        return not required
+
+    if isinstance(actual, bool):
+        actual = 'true' if actual else 'false'
+    if operator in (ProfileConditionType.LESSTHANEQUAL, ProfileConditionType.GREATERTHANEQUAL):
+        left, right = _number(actual), _number(expected[0])
+        if left is None or right is None:
+            return not required
+        return left <= right if operator == ProfileConditionType.LESSTHANEQUAL else left >= right
+
+    text = str(actual).lower()
+    number = _number(actual)
+    matches = [text == value or (number is not None and number == _number(value)) for value in expected]
+    if operator == ProfileConditionType.NOTEQUALS:
+        return not matches[0]
+    if operator == ProfileConditionType.EQUALSANY:
+        return any(matches)
+    return matches[0]
+
+def _value(value: Any) -> Any:
+    return getattr(value, 'value', value)
+
+class Decision():
+    """ How an item plays on a device, with the reasons when it can not play directly. """
+
+    def __init__(self, item_id: str, media_source_id: str | None, play_method: PlayMethod | None, reasons: List[TranscodeReason]):
+        self.item_id = item_id
+        self.media_source_id = media_source_id
+        self.play_method = play_method
+        self.reasons = reasons
+
+    @property
+    def direct_play(self) -> bool:
+        return self.play_method == PlayMethod.DIRECTPLAY
+
+    @property
+    def direct_stream(self) -> bool:
+        return self.play_method == PlayMethod.DIRECTSTREAM
+
+    @property
+    def transcode(self) -> bool:
+        return self.play_method == PlayMethod.TRANSCODE
+
+    def __repr__(self) -> str:
+        method = self.play_method.value if self.play_method else None
+        reasons = [reason.value for reason in self.reasons]
+        return f"<Decision item='{self.item_id}', method={method}, reasons={reasons}>"
+
+class DecisionEngine():
+    """ Evaluates a DeviceProfile against MediaSourceInfo without asking the
+    server, like MediaInfoApi.get_posted_playback_info would decide.
+
+    The profile is compiled once and the decision of every distinct encoding
+    (container, codecs and the stream properties the conditions look at) is
+    computed once and reused, so a whole library is audited in a few passes.
+
+    Direct play needs a DirectPlayProfile for the container and codecs, all
+    ContainerProfile and CodecProfile conditions and the bitrate limit.
+    Direct stream is a remux when only the container is not supported and
+    the codecs fit the TranscodingProfile. Anything else transcodes.
+    Subtitle delivery is not evaluated.
+
+    Usage:
+        engine = DecisionEngine(profile, max_bitrate=8_000_000)
+        decisions = engine.decide_many(api.items.search.recursive().paginate(500).all)
+    """
+
+    def __init__(self, profile: BaseModel, max_bitrate: int = None):
+        """
+        Compiles the profile.
+
+        Args:
+            profile (DeviceProfile): The profile of the device.
+            max_bitrate (int, optional): The bitrate limit, MaxStreamingBitrate of the profile by default.
+        """
+        self.profile = profile
+        self.max_bitrate = max_bitrate or profile.max_streaming_bitrate
+
+        self._direct = [
+            (_value(p.type), _split(p.container), _split(p.video_codec), _split(p.audio_codec))
+            for p in profile.direct_play_profiles or []
+        ]
+        self._containers = [
+            (_value(p.type), _split(p.container), _conditions(p.conditions))
+            for p in profile.container_profiles or []
+        ]
+        self._codecs = [
+            (_value(p.type), _split(p.codec), _split(p.container), _conditions(p.apply_conditions), _conditions(p.conditions))
+            for p in profile.codec_profiles or []
+        ]
+        self._transcoding = {}
+        for p in profile.transcoding_profiles or []:
+            self._transcoding.setdefault(_value(p.type), (_split(p.container), _split(p.video_codec), _split(p.audio_codec)))
+        self._decisions: Dict[tuple, Tuple[PlayMethod | None, List[TranscodeReason]]] = {}
+
+    def __repr__(self) -> str:
+        return f"<DecisionEngine profile='{self.profile.name}', max_bitrate={self.max_bitrate}, encodings={len(self._decisions)}>"
+
+    def _values(self, source: BaseModel) -> Dict[str, Any]:
+        """ The values of the source the decision depends on. """
+        streams = source.media_streams or []
+        videos = [stream for stream in streams if stream.type == MediaStreamType.VIDEO]
+        audios = [stream for stream in streams if stream.type == MediaStreamType.AUDIO]
+        video = videos[0] if videos else None
+        default = source.default_audio_stream_index
+        audio = next((stream for stream in audios if stream.index == default), audios[0] if audios else None)
+
+        v = lambda name: getattr(video, name, None) if video is not None else None
+        a = lambda name: getattr(audio, name, None) if audio is not None else None
+        return {
+            'type': DlnaProfileType.VIDEO.value if video is not None else DlnaProfileType.AUDIO.value,
+            'container': source.container,
+            'bitrate': source.bitrate,
+            'video_codec': v('codec'),
+            'audio_codec': a('codec'),
+            ProfileConditionValue.AUDIOCHANNELS: a('channels'),
+            ProfileConditionValue.AUDIOBITRATE: a('bit_rate'),
+            ProfileConditionValue.AUDIOPROFILE: a('profile'),
+            ProfileConditionValue.AUDIOSAMPLERATE: a('sample_rate'),
+            ProfileConditionValue.AUDIOBITDEPTH: a('bit_depth'),
+            ProfileConditionValue.ISSECONDARYAUDIO: audio is not None and audios.index(audio) > 0,
+            ProfileConditionValue.WIDTH: v('width'),
+            ProfileConditionValue.HEIGHT: v('height'),
+            ProfileConditionValue.VIDEOBITDEPTH: v('bit_depth'),
+            ProfileConditionValue.VIDEOBITRATE: v('bit_rate'),
+            ProfileConditionValue.VIDEOFRAMERATE: v('real_frame_rate') or v('average_frame_rate'),
+            ProfileConditionValue.VIDEOLEVEL: v('level'),
+            ProfileConditionValue.VIDEOPROFILE: v('profile'),
+            ProfileConditionValue.VIDEORANGETYPE: _value(v('video_range_type')),
+            ProfileConditionValue.VIDEOCODECTAG: v('codec_tag'),
+            ProfileConditionValue.ISANAMORPHIC: v('is_anamorphic'),
+            ProfileConditionValue.ISINTERLACED: v('is_interlaced'),
+            ProfileConditionValue.ISAVC: v('is_avc'),
+            ProfileConditionValue.REFFRAMES: v('ref_frames'),
+            ProfileConditionValue.PACKETLENGTH: v('packet_length'),
+            ProfileConditionValue.VIDEOTIMESTAMP: _value(source.timestamp),
+            ProfileConditionValue.NUMAUDIOSTREAMS: len(audios),
+            ProfileConditionValue.NUMVIDEOSTREAMS: len(videos),
+        }
+
+    def _failed(self, conditions: List[Condition], values: Dict[str, Any]) -> List[TranscodeReason]:
+        return [
+            _REASONS[condition[0]]
+            for condition in conditions
+            if condition[0] in _REASONS and not _check(condition, values[condition[0]])
+        ]
+
+    def _codec_reasons(self, codec_type: CodecType, codec: str | None, containers: FrozenSet[str], values: Dict[str, Any]) -> List[TranscodeReason]:
+        """ Reasons of the CodecProfiles that apply to a codec in the container. """
+        reasons = []
+        codecs = _split(codec)
+        for kind, allowed, allowed_containers, apply, conditions in self._codecs:
+            if kind != codec_type.value or not _any(allowed, codecs) or not _any(allowed_containers, containers):
+                continue
+            if all(_check(condition, values[condition[0]]) for condition in apply):
+                reasons += self._failed(conditions, values)
+        return reasons
+
+    def _decide(self, values: Dict[str, Any]) -> Tuple[PlayMethod | None, List[TranscodeReason]]:
+        kind = values['type']
+        video = kind == DlnaProfileType.VIDEO.value
+        containers = _split(values['container'])
+        video_codecs, audio_codecs = _split(values['video_codec']), _split(values['audio_codec'])
+
+        # the DirectPlayProfile closest to the source gives the reasons
+        closest: List[TranscodeReason] | None = None
+        for profile_kind, allowed, allowed_video, allowed_audio in self._direct:
+            if profile_kind != kind:
+                continue
+            failed = []
+            if not _any(allowed, containers):
+                failed.append(TranscodeReason.CONTAINERNOTSUPPORTED)
+            if video and not _any(allowed_video, video_codecs):
+                failed.append(TranscodeReason.VIDEOCODECNOTSUPPORTED)
+            if audio_codecs and not _any(allowed_audio, audio_codecs):
+                failed.append(TranscodeReason.AUDIOCODECNOTSUPPORTED)
+            if closest is None or len(failed) < len(closest):
+                closest = failed
+        reasons = closest if closest is not None else [TranscodeReason.CONTAINERNOTSUPPORTED]
+
+        for container_kind, allowed, conditions in self._containers:
+            if container_kind == kind and _any(allowed, containers):
+                reasons += self._failed(conditions, values)
+
+        stream_reasons = []
+        if video:
+            stream_reasons += self._codec_reasons(CodecType.VIDEO, values['video_codec'], containers, values)
+        if audio_codecs:
+            audio_type = CodecType.VIDEOAUDIO if video else CodecType.AUDIO
+            stream_reasons += self._codec_reasons(audio_type, values['audio_codec'], containers, values)
+        reasons += stream_reasons
+
+        bitrate = values['bitrate']
+        if self.max_bitrate and bitrate and bitrate > self.max_bitrate:
+            reasons.append(TranscodeReason.CONTAINERBITRATEEXCEEDSLIMIT)
+
+        reasons = list(dict.fromkeys(reasons))
+        if not reasons:
+            return PlayMethod.DIRECTPLAY, []
+
+        transcoding = self._transcoding.get(kind)
+        if transcoding is None:
+            return None, reasons
+
+        _, transcode_video, transcode_audio = transcoding
+        remux = (
+            set(reasons) <= _CONTAINER_REASONS
+            and (not video or _any(transcode_video, video_codecs))
+            and (not audio_codecs or _any(transcode_audio, audio_codecs))
+        )
+        return (PlayMethod.DIRECTSTREAM if remux else PlayMethod.TRANSCODE), reasons
+
+    def decide(self, source: BaseModel, item_id: str = None) -> Decision:
+        """
+        Decides how a media source plays on the device.
+
+        Args:
+            source (MediaSourceInfo): The media source, with its MediaStreams.
+            item_id (str, optional): The ID of the item, reported in the decision.
+
+        Returns:
+            Decision: The play method, None if it can not play at all, and the transcode reasons.
+        """
+        values = self._values(source)
+        key = tuple(values.values())
+        if key not in self._decisions:
+            self._decisions[key] = self._decide(values)
+        method, reasons = self._decisions[key]
+        return Decision(item_id or source.id, source.id, method, list(reasons))
+
+    def decide_many(self, items: Iterable[Item | BaseModel]) -> Dict[str, Decision]:
+        """
+        Decides how each item plays on the device, from its first media source.
+
+        Args:
+            items (Iterable[Item | BaseItemDto]): The items, with the MediaSources field.
+
+        Returns:
+            Dict[str, Decision]: The decision by item ID (hex), items without media source are left out.
+        """
+        decisions = {}
+        for item in items:
+            model = item.model if isinstance(item, Item) else item
+            sources = model.media_sources or []
+            if sources:
+                decisions[model.id.hex] = self.decide(sources[0], model.id.hex)
+        return decisions
@@ -0,0 +1,349 @@
+"""
+Module `download` - Streaming and resumable downloads of media files.
+"""
+from __future__ import annotations
+
+import os, re, tempfile, threading, time, urllib3
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Callable, Dict, Iterable
+from pydantic import BaseModel
+
+from jellyfin.generated import ApiException
+
+Request = Callable[[Dict[str, str]], urllib3.BaseHTTPResponse]
+Progress = Callable[[int, int], None]
+
+_CONTENT_RANGE = re.compile(r'bytes\s+(\d+)-(\d+)/(\d+|\*)')
+
+def _media_size(model: BaseModel) -> int | None:
+    """ Size of the file of the item from its MediaSourceInfo, the one of the item itself first. """
+    sources = getattr(model, 'media_sources', None) or []
+    for source in sorted(sources, key=lambda source: source.id != model.id.hex):
+        if source.size:
+            return source.size
+    return None
+
+def _total(response: urllib3.BaseHTTPResponse, offset: int) -> int | None:
+    """ Size of the whole file from Content-Range or Content-Length of the response. """
+    match = _CONTENT_RANGE.match(response.headers.get('Content-Range') or '')
+    if match is not None and match.group(3) != '*':
+        return int(match.group(3))
+    length = response.headers.get('Content-Length')
+    if length is not None and length.isdigit():
+        return int(length) + (offset if response.status == 206 else 0)
+    return None
+
+class MediaDownload():
+    """ Result of a download, with its throughput. """
+
+    def __init__(self, path: str | None, size: int | None):
+        self.path = path
+        self.size = size
+        self.bytes = 0
+        self.resumed = 0
+        self.retries = 0
+        self.seconds = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """ Returns the bytes downloaded per second. """
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+    def __repr__(self) -> str:
+        return (
+            f"<MediaDownload path={self.path!r}, size={self.size}, bytes={self.bytes}, "
+            f"resumed={self.resumed}, retries={self.retries}, {self.throughput / 1024 ** 2:.2f} MiB/s>"
+        )
+
+def fetch(
+        request: Request,
+        dest: str | BinaryIO,
+        size: int = None,
+        chunk_size: int = 1024 * 1024,
+        resume: bool = True,
+        retries: int = 5,
+        progress: Progress = None
+    ) -> MediaDownload:
+    """
+    Streams a response to a file or a writable buffer, chunk by chunk.
+
+    After an interruption the request is sent again with a `Range` header
+    starting at the bytes already written. When the destination is a path
+    the data goes to `<dest>.part`, renamed once complete, and a previous
+    partial file is resumed.
+
+    Args:
+        request (Callable): Sends the request with the given extra headers, returns the response without preloaded content.
+        dest (str | BinaryIO): The path of the file or a writable binary buffer.
+        size (int, optional): The expected size, usually MediaSourceInfo.Size.
+        chunk_size (int): Size of the chunks read and written. Defaults to 1 MiB.
+        resume (bool): Resume a previous partial file of the path. Defaults to True.
+        retries (int): Number of times the download is resumed after errors. Defaults to 5.
+        progress (Callable, optional): Called with the bytes written and the total, if known, after each chunk.
+
+    Raises:
+        ApiException: If the server rejects the request.
+        ValueError: If the downloaded size is not the expected one.
+
+    Returns:
+        MediaDownload: The path, the size and the throughput of the download.
+
+    Usage:
+        videos = api.generated.VideosApi(api.client)
+        fetch(lambda headers: videos.get_video_stream_without_preload_content(item_id, static=True, _headers=headers), 'movie.mkv')
+    """
+    path = dest if isinstance(dest, str) else None
+    result = MediaDownload(path, size)
+    started = time.monotonic()
+
+    if path is not None:
+        part = f"{path}.part"
+        offset = os.path.getsize(part) if resume and os.path.exists(part) else 0
+        if size is not None and offset > size:
+            offset = 0
+        file = open(part, 'ab' if offset else 'wb')
+    else:
+        offset, file = 0, dest
+    result.resumed = offset
+
+    try:
+        while True:
+            response = None
+            try:
+                response = request({'Range': f"bytes={offset}-"} if offset else {})
+                if response.status == 416 and offset:
+                    # nothing left after what we already have
+                    break
+                if not 200 <= response.status <= 299:
+                    raise ApiException(status=response.status, reason=response.reason)
+
+                total = _total(response, offset)
+                if total is not None:
+                    result.size = result.size or total
+                skip = offset if response.status != 206 else 0
+
+                for chunk in response.stream(chunk_size):
+                    if skip:
+                        # the server ignored the range, drop what we already have
+                        dropped = min(skip, len(chunk))
+                        chunk, skip = chunk[dropped:], skip - dropped
+                        if not chunk:
+                            continue
+                    file.write(chunk)
+                    offset += len(chunk)
+                    result.bytes += len(chunk)
+                    if progress is not None:
+                        progress(offset, result.size)
+
+                if total is None or offset >= total:
+                    break
+                raise urllib3.exceptions.ProtocolError(f"Connection closed at {offset} of {total} bytes")
+            except urllib3.exceptions.HTTPError:
+                if result.retries >= retries:
+                    raise
+                result.retries += 1
+                time.sleep(min(0.5 * 2 ** result.retries, 10))
+            finally:
+                if response is not None:
+                    response.release_conn()
+    finally:
+        if path is not None:
+            file.close()
+        result.seconds = time.monotonic() - started
+
+    if size is not None and offset != size:
+        if path is not None:
+            os.remove(part)
+        raise ValueError(f"Downloaded {offset} bytes but the media source has {size} bytes.")
+
+    if path is not None:
+        os.replace(part, path)
+    return result
+
+def _probe(request: Request) -> int | None:
+    """ Size of the file if the server accepts ranges, None otherwise. """
+    response = request({'Range': 'bytes=0-0'})
+    if response.status != 206:
+        # the whole file may follow, close instead of reading it
+        response.close()
+        if not 200 <= response.status <= 299:
+            raise ApiException(status=response.status, reason=response.reason)
+        return None
+    try:
+        return _total(response, 0)
+    finally:
+        # read the single byte so the connection is reused
+        response.drain_conn()
+        response.release_conn()
+
+def fetch_segmented(
+        request: Request,
+        path: str,
+        size: int = None,
+        connections: int = 4,
+        min_segment_size: int = 1024 * 1024,
+        max_segment_size: int = 64 * 1024 * 1024,
+        segment_seconds: float = 2.0,
+        chunk_size: int = 256 * 1024,
+        retries: int = 5,
+        progress: Progress = None
+    ) -> MediaDownload:
+    """
+    Downloads a file in byte ranges fetched concurrently on several connections.
+
+    The partial file is preallocated and each range is written at its offset.
+    Segments are sized per connection from its measured speed, to last about
+    `segment_seconds` between `min_segment_size` and `max_segment_size`, and
+    never more than a share of what is left so the last ones finish together.
+    A failed segment is resumed from its last byte up to `retries` times.
+
+    Falls back to a single stream (`fetch`) if the server does not accept ranges.
+
+    Args:
+        request (Callable): Sends the request with the given extra headers, returns the response without preloaded content.
+        path (str): The path of the file, written to `<path>.part` until complete.
+        size (int, optional): The size of the file, asked to the server if not given.
+        connections (int): Number of concurrent connections. Defaults to 4.
+        min_segment_size (int): Smallest segment. Defaults to 1 MiB.
+        max_segment_size (int): Largest segment. Defaults to 64 MiB.
+        segment_seconds (float): Target duration of a segment. Defaults to 2 seconds.
+        chunk_size (int): Size of the chunks read and written. Defaults to 256 KiB.
+        retries (int): Number of times each segment is resumed after errors. Defaults to 5.
+        progress (Callable, optional): Called with the bytes written and the total after each chunk.
+
+    Raises:
+        ApiException: If the server rejects a request.
+        ValueError: If the server returns a range other than the requested one.
+
+    Returns:
+        MediaDownload: The path, the size and the throughput of the download.
+    """
+    started = time.monotonic()
+    total = _probe(request)
+    if total is not None and size is not None and total != size:
+        raise ValueError(f"The server has {total} bytes but the media source has {size} bytes.")
+    if not total:
+        return fetch(request, path, size, chunk_size, False, retries, progress)
+
+    part = f"{path}.part"
+    with open(part, 'wb') as file:
+        file.truncate(total)
+
+    result = MediaDownload(path, total)
+    lock = threading.Lock()
+    state = {'next': 0}
+
+    def take(segment_size: int) -> tuple | None:
+        with lock:
+            start = state['next']
+            if start >= total:
+                return None
+            share = max(min_segment_size, (total - start) // connections)
+            end = min(total, start + min(segment_size, share))
+            state['next'] = end
+            return start, end
+
+    def download(start: int, end: int, file: BinaryIO) -> None:
+        offset, attempts = start, 0
+        while offset < end:
+            response = None
+            try:
+                response = request({'Range': f"bytes={offset}-{end - 1}"})
+                if not 200 <= response.status <= 299:
+                    raise ApiException(status=response.status, reason=response.reason)
+                match = _CONTENT_RANGE.match(response.headers.get('Content-Range') or '')
+                if response.status != 206 or match is None or int(match.group(1)) != offset:
+                    raise ValueError(f"Expected the bytes {offset}-{end - 1}, the server returned {response.status} "
+                                     f"{response.headers.get('Content-Range')}")
+
+                file.seek(offset)
+                for chunk in response.stream(chunk_size):
+                    chunk = chunk[:end - offset]
+                    file.write(chunk)
+                    offset += len(chunk)
+                    with lock:
+                        result.bytes += len(chunk)
+                        if progress is not None:
+                            progress(result.bytes, total)
+                    if offset >= end:
+                        break
+                if offset < end:
+                    raise urllib3.exceptions.ProtocolError(f"Connection closed at {offset} of {end} bytes")
+            except urllib3.exceptions.HTTPError:
+                if attempts >= retries:
+                    raise
+                attempts += 1
+                with lock:
+                    result.retries += 1
+                time.sleep(min(0.5 * 2 ** attempts, 10))
+            finally:
+                if response is not None:
+                    response.release_conn()
+
+    def worker() -> None:
+        segment_size = min_segment_size
+        with open(part, 'r+b') as file:
+            try:
+                while (segment := take(segment_size)) is not None:
+                    began = time.monotonic()
+                    download(*segment, file)
+                    speed = (segment[1] - segment[0]) / max(time.monotonic() - began, 1e-6)
+                    segment_size = int(min(max(speed * segment_seconds, min_segment_size), max_segment_size))
+            except BaseException:
+                # no new segments for the other connections
+                with lock:
+                    state['next'] = total
+                raise
+
+    try:
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            futures = [executor.submit(worker) for _ in range(connections)]
+        for future in futures:
+            future.result()
+    except BaseException:
+        os.remove(part)
+        raise
+    finally:
+        result.seconds = time.monotonic() - started
+
+    os.replace(part, path)
+    return result
+
+def benchmark(
+        request: Request,
+        connections: Iterable[int] = (1, 2, 4, 8),
+        dest: str = None
+    ) -> Dict[int, float]:
+    """
+    Measures the throughput of the single stream against segmented downloads.
+
+    Each download goes to a temporary file removed afterwards.
+
+    Args:
+        request (Callable): Sends the request with the given extra headers, returns the response without preloaded content.
+        connections (Iterable[int]): Numbers of connections to measure, 1 is the single stream. Defaults to 1, 2, 4 and 8.
+        dest (str, optional): Directory of the temporary files. Defaults to the system one.
+
+    Returns:
+        Dict[int, float]: The bytes per second by number of connections.
+
+    Usage:
+        library = api.generated.LibraryApi(api.client)
+        benchmark(lambda headers: library.get_download_without_preload_content(item.id, _headers=headers))
+    """
+    results = {}
+    for count in connections:
+        handle, path = tempfile.mkstemp(dir=dest)
+        os.close(handle)
+        try:
+            if count == 1:
+                result = fetch(request, path, resume=False)
+            else:
+                result = fetch_segmented(request, path, connections=count)
+            results[count] = result.throughput
+        finally:
+            for name in (path, f"{path}.part"):
+                if os.path.exists(name):
+                    os.remove(name)
+    return results
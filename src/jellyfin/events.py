@@ -0,0 +1,447 @@
+"""
+Module `events` - Client for the server websocket.
+"""
+from __future__ import annotations
+
+import json, logging, queue, random, threading, time
+
+from typing import Callable, Dict, Generic, Iterator, List, Type, TypeVar
+from urllib.parse import urlencode, urlsplit, urlunsplit
+from pydantic import BaseModel
+from websockets.sync.client import connect
+
+from jellyfin.generated import SessionMessageType
+
+T = TypeVar('T', bound=BaseModel)
+
+_logger = logging.getLogger(__name__)
+
+# discriminator of OutboundWebSocketMessage in the OpenAPI spec, the generated
+# oneOf validates the message against every schema instead
+_MESSAGES: Dict[str, tuple] = {
+    'ActivityLogEntry': ('ActivityLogEntryMessage',),
+    'ForceKeepAlive': ('ForceKeepAliveMessage',),
+    'GeneralCommand': ('GeneralCommandMessage',),
+    'LibraryChanged': ('LibraryChangedMessage',),
+    'KeepAlive': ('OutboundKeepAliveMessage',),
+    'Play': ('PlayMessage',),
+    'Playstate': ('PlaystateMessage',),
+    'PackageInstallationCancelled': ('PluginInstallationCancelledMessage',),
+    'PackageInstallationCompleted': ('PluginInstallationCompletedMessage',),
+    'PackageInstallationFailed': ('PluginInstallationFailedMessage',),
+    'PackageInstalling': ('PluginInstallingMessage',),
+    'PackageUninstalled': ('PluginUninstalledMessage',),
+    'RefreshProgress': ('RefreshProgressMessage',),
+    'RestartRequired': ('RestartRequiredMessage',),
+    'ScheduledTaskEnded': ('ScheduledTaskEndedMessage',),
+    'ScheduledTasksInfo': ('ScheduledTasksInfoMessage',),
+    'SeriesTimerCancelled': ('SeriesTimerCancelledMessage',),
+    'SeriesTimerCreated': ('SeriesTimerCreatedMessage',),
+    'ServerRestarting': ('ServerRestartingMessage',),
+    'ServerShuttingDown': ('ServerShuttingDownMessage',),
+    'Sessions': ('SessionsMessage',),
+    'SyncPlayCommand': ('SyncPlayCommandMessage',),
+    'SyncPlayGroupUpdate': ('SyncPlayGroupUpdateCommandMessage', 'SyncPlayGroupUpdateMessage'),
+    'TimerCancelled': ('TimerCancelledMessage',),
+    'TimerCreated': ('TimerCreatedMessage',),
+    'UserDataChanged': ('UserDataChangedMessage',),
+    'UserDeleted': ('UserDeletedMessage',),
+    'UserUpdated': ('UserUpdatedMessage',),
+}
+
+class Subscription(Generic[T]):
+    """ Bounded queue of messages of one or more types.
+
+    When the consumer is slower than the server the oldest (or the newest)
+    messages are dropped instead of blocking the websocket.
+
+    Usage:
+        with api.events.subscribe(SessionsMessage, maxsize=10) as sessions:
+            for message in sessions:
+                print(message.data)
+    """
+    _CLOSED = object()
+
+    def __init__(self, events: Events, types: List[str], maxsize: int, drop: str):
+        if drop not in ('oldest', 'newest'):
+            raise ValueError(f"Invalid drop policy: {drop}. Use 'oldest' or 'newest'.")
+        self.events = events
+        self.types = types
+        self.drop = drop
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._closed = False
+
+    def __repr__(self) -> str:
+        return f"<Subscription types={self.types}, pending={self._queue.qsize()}, dropped={self.dropped}>"
+
+    def put(self, message: T) -> None:
+        """ Add a message, dropping one if full. Called from the listening thread. """
+        while True:
+            try:
+                self._queue.put_nowait(message)
+                return
+            except queue.Full:
+                self.dropped += 1
+                if self.drop == 'newest':
+                    return
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout: float = None) -> T | None:
+        """
+        Wait the next message.
+
+        Args:
+            timeout (float, optional): Maximum seconds to wait, forever by default.
+
+        Returns:
+            T | None: The message, None on timeout or when closed.
+        """
+        try:
+            message = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        return None if message is self._CLOSED else message
+
+    def __iter__(self) -> Iterator[T]:
+        while not self._closed:
+            message = self.get()
+            if message is None:
+                break
+            yield message
+
+    def close(self) -> None:
+        """ Stop receiving messages, ending the iteration. """
+        if self._closed:
+            return
+        self._closed = True
+        self.events._unsubscribe(self)
+        try:
+            self._queue.put_nowait(self._CLOSED)
+        except queue.Full:
+            self._queue.get_nowait()
+            self._queue.put_nowait(self._CLOSED)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class Events():
+    """ Receive the messages sent by the server through the websocket.
+
+    Messages are parsed straight to the model of their `MessageType` and only
+    when someone is listening that type. Keep alive is automatic and the
+    connection is opened again with exponential backoff when lost.
+
+    Usage:
+        events = api.events
+        events.on(SessionMessageType.LIBRARYCHANGED, lambda message: print(message.data))
+        events.start()
+
+        with events.subscribe(SessionsMessage, maxsize=10) as sessions:
+            for message in sessions:
+                ...
+
+        events.stop()
+    """
+
+    def __init__(self, api: Api, backoff: float = 1.0, max_backoff: float = 60.0):
+        """
+        Initializes the websocket client.
+
+        Args:
+            api (Api): An instance of the Api class.
+            backoff (float): Seconds to wait before the first reconnection, doubled on each failure. Defaults to 1.
+            max_backoff (float): Maximum seconds between reconnections. Defaults to 60.
+        """
+        self.api = api
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.last_error: Exception | None = None
+        self._handlers: Dict[str, List[Callable]] = {}
+        self._subscriptions: Dict[str, List[Subscription]] = {}
+        self._models: Dict[str, Type[BaseModel]] = {}
+        self._starts: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._connected = threading.Event()
+        self._thread = None
+        self._socket = None
+
+    def __repr__(self) -> str:
+        state = 'connected' if self.connected else 'running' if self.running else 'stopped'
+        return f"<Events url='{self.url}' ({state})>"
+
+    @property
+    def url(self) -> str:
+        """ Returns the websocket URL of the server. """
+        scheme, netloc, path, _, _ = urlsplit(self.api.url)
+        scheme = 'wss' if scheme == 'https' else 'ws'
+        query = urlencode({'api_key': self.api.api_key})
+        return urlunsplit((scheme, netloc, path.rstrip('/') + '/socket', query, ''))
+
+    @property
+    def running(self) -> bool:
+        """ Returns True while listening the server, even when reconnecting. """
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def connected(self) -> bool:
+        """ Returns True when the websocket is open. """
+        return self._connected.is_set()
+
+    def model(self, message_type: SessionMessageType | str) -> Type[BaseModel] | None:
+        """
+        Returns the model class of a message type for the version of the Api.
+
+        Args:
+            message_type (SessionMessageType | str): The type of the message.
+
+        Returns:
+            Type[BaseModel] | None: The model class, None if the server never sends this type.
+        """
+        message_type = SessionMessageType(message_type).value
+        if message_type not in self._models:
+            names = _MESSAGES.get(message_type, ())
+            classes = [getattr(self.api.generated, name, None) for name in names]
+            self._models[message_type] = next((cls for cls in classes if cls is not None), None)
+        return self._models[message_type]
+
+    def _type(self, message_type: SessionMessageType | str | Type[BaseModel]) -> str:
+        """ Returns the MessageType value of a type or model class. """
+        if isinstance(message_type, type) and issubclass(message_type, BaseModel):
+            for value, names in _MESSAGES.items():
+                if message_type.__name__ in names:
+                    return value
+            raise ValueError(f"{message_type.__name__} is not a message sent by the server.")
+        return SessionMessageType(message_type).value
+
+    def on(self, message_type: SessionMessageType | str | Type[BaseModel], handler: Callable[[BaseModel], None]) -> Callable:
+        """
+        Register a handler for a message type.
+
+        Args:
+            message_type (SessionMessageType | str | Type[BaseModel]): The type or model class of the message.
+            handler (Callable): Called with the message model from the listening thread, must be fast.
+
+        Returns:
+            Callable: The handler, to be used with `off`.
+        """
+        with self._lock:
+            self._handlers.setdefault(self._type(message_type), []).append(handler)
+        return handler
+
+    def off(self, message_type: SessionMessageType | str | Type[BaseModel], handler: Callable) -> None:
+        """ Remove a handler registered with `on`. """
+        with self._lock:
+            handlers = self._handlers.get(self._type(message_type), [])
+            if handler in handlers:
+                handlers.remove(handler)
+
+    def subscribe(
+            self,
+            *message_types: SessionMessageType | str | Type[T],
+            maxsize: int = 100,
+            drop: str = 'oldest'
+        ) -> Subscription[T]:
+        """
+        Subscribe message types in a bounded queue, to be consumed from another thread.
+
+        Args:
+            *message_types (SessionMessageType | str | Type[BaseModel]): The types or model classes of the messages.
+            maxsize (int): Maximum of messages waiting to be consumed. Defaults to 100.
+            drop (str): Which message to drop when full: 'oldest' or 'newest'. Defaults to 'oldest'.
+
+        Returns:
+            Subscription: An iterable of the messages received.
+        """
+        types = [self._type(message_type) for message_type in message_types]
+        subscription = Subscription(self, types, maxsize, drop)
+        with self._lock:
+            for message_type in types:
+                self._subscriptions.setdefault(message_type, []).append(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            for message_type in subscription.types:
+                subscriptions = self._subscriptions.get(message_type, [])
+                if subscription in subscriptions:
+                    subscriptions.remove(subscription)
+
+    def send(self, message_type: SessionMessageType | str, data: object = None) -> None:
+        """
+        Send a message to the server.
+
+        Messages like SessionsStart are sent again after a reconnection,
+        until the matching Stop message is sent.
+
+        Args:
+            message_type (SessionMessageType | str): The type of the message.
+            data (object, optional): The data of the message.
+
+        Raises:
+            RuntimeError: If not connected.
+        """
+        message_type = SessionMessageType(message_type).value
+        if message_type.endswith('Start'):
+            self._starts[message_type] = data
+        elif message_type.endswith('Stop'):
+            self._starts.pop(message_type[:-len('Stop')] + 'Start', None)
+
+        socket = self._socket
+        if socket is None:
+            raise RuntimeError("Not connected. Use 'start()' before sending messages.")
+        message = {'MessageType': message_type}
+        if data is not None:
+            message['Data'] = data
+        socket.send(json.dumps(message))
+
+    def parse(self, raw: str | dict) -> BaseModel | None:
+        """
+        Parse a message received from the server.
+
+        Args:
+            raw (str | dict): The JSON message, or the already decoded one.
+
+        Returns:
+            BaseModel | None: The message model, None if not a known message.
+        """
+        message = json.loads(raw) if isinstance(raw, str) else raw
+        model = self.model(message.get('MessageType')) if message.get('MessageType') in _MESSAGES else None
+        if model is None:
+            return None
+        return model.from_dict(message)
+
+    def dispatch(self, message: dict) -> None:
+        """ Parse the decoded message and deliver it, only if someone is listening its type.
+
+        An exception raised by a handler is logged and does not stop the others.
+        """
+        message_type = message.get('MessageType')
+        with self._lock:
+            handlers = list(self._handlers.get(message_type, []))
+            subscriptions = list(self._subscriptions.get(message_type, []))
+        if not handlers and not subscriptions:
+            return
+
+        model = self.parse(message)
+        if model is None:
+            return
+        for handler in handlers:
+            try:
+                handler(model)
+            except Exception:
+                _logger.exception("Handler %r failed on a %s message", handler, message_type)
+        for subscription in subscriptions:
+            subscription.put(model)
+
+    def start(self) -> Events:
+        """
+        Connect and listen the server in a background thread.
+
+        Returns:
+            Events: The current Events instance.
+        """
+        if self.running:
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='jellyfin-events', daemon=True)
+        self._thread.start()
+        return self
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        Wait until connected.
+
+        Args:
+            timeout (float, optional): Maximum seconds to wait, forever by default.
+
+        Returns:
+            bool: True if connected.
+        """
+        return self._connected.wait(timeout)
+
+    def stop(self) -> None:
+        """ Close the connection and wait the listening thread. """
+        self._stop.set()
+        socket = self._socket
+        if socket is not None:
+            socket.close()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+        with self._lock:
+            subscriptions = {id(s): s for items in self._subscriptions.values() for s in items}
+        for subscription in subscriptions.values():
+            subscription.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _run(self) -> None:
+        """ Keep connected until stopped, waiting longer after each connection failure. """
+        failures = 0
+        while not self._stop.is_set():
+            try:
+                self._listen()
+                failures = 0
+            except Exception as e:
+                self.last_error = e
+                failures += 1
+            if self._stop.is_set():
+                break
+            delay = min(self.backoff * 2 ** max(failures - 1, 0), self.max_backoff)
+            self._stop.wait(delay * random.uniform(0.5, 1.0))
+
+    def _listen(self) -> None:
+        keep_alive = None
+        deadline = None
+
+        with connect(self.url, additional_headers={'Authorization': f'MediaBrowser {self.api._auth}'}) as socket:
+            self._socket = socket
+            self._connected.set()
+            try:
+                for message_type, data in list(self._starts.items()):
+                    self.send(message_type, data)
+
+                while not self._stop.is_set():
+                    timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+                    try:
+                        raw = socket.recv(timeout=timeout)
+                    except TimeoutError:
+                        self.send(SessionMessageType.KEEPALIVE)
+                        deadline = time.monotonic() + keep_alive
+                        continue
+
+                    try:
+                        message = json.loads(raw)
+                    except ValueError:
+                        _logger.warning("Ignored a message that is not JSON: %.100r", raw)
+                        continue
+                    if not isinstance(message, dict):
+                        continue
+                    if message.get('MessageType') == SessionMessageType.FORCEKEEPALIVE.value:
+                        # the server closes the connection without a keep alive every `Data` seconds
+                        keep_alive = max((message.get('Data') or 60) / 2, 1)
+                        deadline = time.monotonic()
+
+                    try:
+                        self.dispatch(message)
+                    except Exception:
+                        # a message that cannot be parsed is not a lost connection, keep listening
+                        _logger.exception("Could not dispatch a %s message", message.get('MessageType'))
+            except Exception:
+                if not self._stop.is_set():
+                    raise
+            finally:
+                self._connected.clear()
+                self._socket = None
@@ -0,0 +1,374 @@
+"""
+Module `hls` - HLS playlists parsing and sessions with concurrent segment prefetch.
+"""
+from __future__ import annotations
+
+import re, threading, time, uuid
+
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List
+from urllib.parse import urljoin
+from typing_extensions import Self
+
+from jellyfin.items import Item, _item_id
+from jellyfin.generated import ApiException
+
+_ATTRIBUTES = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
+def _attributes(text: str) -> Dict[str, str]:
+    """ Attributes of a tag like `BANDWIDTH=1280000,CODECS="avc1.640028,mp4a.40.2"` """
+    return {key: value.strip('"') for key, value in _ATTRIBUTES.findall(text)}
+
+class Variant():
+    """ A stream of the master playlist. """
+
+    def __init__(self, uri: str, attributes: Dict[str, str]):
+        self.uri = uri
+        self.attributes = attributes
+        self.bandwidth = int(attributes.get('BANDWIDTH', 0))
+        self.average_bandwidth = int(attributes['AVERAGE-BANDWIDTH']) if 'AVERAGE-BANDWIDTH' in attributes else None
+        self.codecs = [codec.strip() for codec in attributes.get('CODECS', '').split(',') if codec.strip()]
+        width, _, height = attributes.get('RESOLUTION', '').partition('x')
+        self.resolution = (int(width), int(height)) if width.isdigit() and height.isdigit() else None
+
+    def __repr__(self) -> str:
+        return f"<Variant bandwidth={self.bandwidth}, resolution={self.resolution}, codecs={self.codecs}>"
+
+class Segment():
+    """ A segment of a media playlist, with its timings once downloaded. """
+
+    def __init__(self, index: int, uri: str, duration: float, start: float):
+        self.index = index
+        self.uri = uri
+        self.duration = duration
+        self.start = start
+        self.size: int | None = None
+        self.latency: float | None = None
+        self.seconds: float | None = None
+
+    def __repr__(self) -> str:
+        return f"<Segment index={self.index}, start={self.start:.2f}, duration={self.duration:.2f}, latency={self.latency}>"
+
+class MediaPlaylist():
+    """ The segments of a variant. """
+
+    def __init__(self, segments: List[Segment], target_duration: float, media_sequence: int, init: str | None, ended: bool):
+        self.segments = segments
+        self.target_duration = target_duration
+        self.media_sequence = media_sequence
+        self.init = init
+        self.ended = ended
+
+    @property
+    def duration(self) -> float:
+        """ Returns the sum of the duration of the segments, in seconds. """
+        return sum(segment.duration for segment in self.segments)
+
+    def __repr__(self) -> str:
+        return f"<MediaPlaylist segments={len(self.segments)}, duration={self.duration:.2f}, ended={self.ended}>"
+
+def parse_master(text: str, base_url: str = '') -> List[Variant]:
+    """
+    Parses a master playlist.
+
+    Args:
+        text (str): The M3U8 playlist.
+        base_url (str): URL of the playlist, to resolve the relative URIs.
+
+    Raises:
+        ValueError: If it is not a M3U8 playlist.
+
+    Returns:
+        List[Variant]: The variants in the order of the playlist.
+    """
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if not lines or lines[0] != '#EXTM3U':
+        raise ValueError("Not a M3U8 playlist, missing #EXTM3U.")
+
+    variants, attributes = [], None
+    for line in lines[1:]:
+        if line.startswith('#EXT-X-STREAM-INF:'):
+            attributes = _attributes(line.split(':', 1)[1])
+        elif not line.startswith('#') and attributes is not None:
+            variants.append(Variant(urljoin(base_url, line), attributes))
+            attributes = None
+    return variants
+
+def parse_media(text: str, base_url: str = '') -> MediaPlaylist:
+    """
+    Parses a media (variant) playlist.
+
+    Args:
+        text (str): The M3U8 playlist.
+        base_url (str): URL of the playlist, to resolve the relative URIs.
+
+    Raises:
+        ValueError: If it is not a M3U8 playlist.
+
+    Returns:
+        MediaPlaylist: The segments with their duration and start time.
+    """
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if not lines or lines[0] != '#EXTM3U':
+        raise ValueError("Not a M3U8 playlist, missing #EXTM3U.")
+
+    segments, duration, start = [], None, 0.0
+    target_duration, media_sequence, init, ended = 0.0, 0, None, False
+    for line in lines[1:]:
+        if line.startswith('#EXTINF:'):
+            duration = float(line.split(':', 1)[1].split(',', 1)[0])
+        elif line.startswith('#EXT-X-TARGETDURATION:'):
+            target_duration = float(line.split(':', 1)[1])
+        elif line.startswith('#EXT-X-MEDIA-SEQUENCE:'):
+            media_sequence = int(line.split(':', 1)[1])
+        elif line.startswith('#EXT-X-MAP:'):
+            init = urljoin(base_url, _attributes(line.split(':', 1)[1])['URI'])
+        elif line == '#EXT-X-ENDLIST':
+            ended = True
+        elif not line.startswith('#') and duration is not None:
+            segments.append(Segment(len(segments), urljoin(base_url, line), duration, start))
+            start += duration
+            duration = None
+    return MediaPlaylist(segments, target_duration, media_sequence, init, ended)
+
+class Session():
+    """ HLS transcoding session of an item, with concurrent prefetch of the
+    next segments and a cache of the last ones.
+
+    Usage:
+        with jellyfin.hls.Session(api, item, {'video_codec': 'h264', 'max_width': 1280}) as session:
+            for data in session:
+                ...
+            print([segment.latency for segment in session.segments])
+    """
+
+    def __init__(
+            self,
+            api: Api,
+            item: Item | str | uuid.UUID,
+            profile: Dict[str, Any] = None,
+            media_source_id: str = None,
+            variant: Callable[[List[Variant]], Variant] = None,
+            window: int = 4,
+            cache_size: int = 16,
+            device_id: str = None
+        ):
+        """
+        Prepares the session, nothing is requested until it is opened.
+
+        Args:
+            api (Api): An instance of the Api class.
+            item (Item | str | uuid.UUID): The video item.
+            profile (Dict[str, Any], optional): Arguments of DynamicHlsApi.get_master_hls_video_playlist,
+                e.g. video_codec, audio_codec, max_width or video_bit_rate.
+            media_source_id (str, optional): The media source, the one of the item by default.
+            variant (Callable, optional): Picks the variant from the master playlist. Defaults to the highest bandwidth.
+            window (int): Number of segments downloaded ahead and concurrently. Defaults to 4.
+            cache_size (int): Number of segments kept in memory. Defaults to 16.
+            device_id (str, optional): The device of the transcoding job. Defaults to a random one.
+
+        Raises:
+            ValueError: If the cache is smaller than the window.
+        """
+        if cache_size < window:
+            raise ValueError(f"cache_size ({cache_size}) must be at least the window ({window}).")
+
+        self.api = api
+        self.item_id = uuid.UUID(_item_id(item.id if isinstance(item, Item) else item))
+        self.profile = dict(profile or {})
+        self.media_source_id = media_source_id or self.item_id.hex
+        self.window = window
+        self.cache_size = cache_size
+        self.device_id = device_id or uuid.uuid4().hex
+        self.play_session_id = uuid.uuid4().hex
+        self._pick = variant or (lambda variants: max(variants, key=lambda variant: variant.bandwidth))
+
+        self.variants: List[Variant] = []
+        self.variant: Variant | None = None
+        self.playlist: MediaPlaylist | None = None
+        self._cache: OrderedDict[int, bytes] = OrderedDict()
+        self._pending: Dict[int, Future] = {}
+        self._lock = threading.RLock()
+        self._executor: ThreadPoolExecutor | None = None
+        self._headers: Dict[str, str] = {}
+
+    def __repr__(self) -> str:
+        segments = len(self.playlist.segments) if self.playlist else None
+        return f"<Session item='{self.item_id.hex}', variant={self.variant}, segments={segments}, cached={len(self._cache)}>"
+
+    @property
+    def segments(self) -> List[Segment]:
+        """ Returns the segments of the variant, opening the session if needed. """
+        if self.playlist is None:
+            self.open()
+        return self.playlist.segments
+
+    @property
+    def latencies(self) -> List[float]:
+        """ Returns the time to the first byte of each downloaded segment, the transcoding latency. """
+        return [segment.latency for segment in self.segments if segment.latency is not None]
+
+    def open(self) -> Self:
+        """
+        Requests the master playlist, picks the variant and requests its playlist.
+
+        Raises:
+            ApiException: If the server rejects a request.
+            ValueError: If the master playlist has no variant.
+
+        Returns:
+            Session: The opened session.
+        """
+        client = self.api.client
+        self._headers = dict(client.default_headers)
+        client.update_params_for_auth(self._headers, [], ['CustomAuthentication'], '', 'GET', None)
+
+        hls = self.api.generated.DynamicHlsApi(client)
+        response = hls.get_master_hls_video_playlist_without_preload_content(
+            self.item_id,
+            self.media_source_id,
+            device_id=self.device_id,
+            play_session_id=self.play_session_id,
+            **self.profile
+        )
+        try:
+            if not 200 <= response.status <= 299:
+                raise ApiException(status=response.status, reason=response.reason)
+            master = response.read().decode('utf-8')
+        finally:
+            response.release_conn()
+
+        self.variants = parse_master(master, f"{self.api.url}/Videos/{self.item_id}/master.m3u8")
+        if not self.variants:
+            raise ValueError("The master playlist has no variant.")
+        self.variant = self._pick(self.variants)
+        self.playlist = parse_media(self._get(self.variant.uri).decode('utf-8'), self.variant.uri)
+        self._executor = ThreadPoolExecutor(max_workers=self.window)
+        return self
+
+    def _get(self, url: str, segment: Segment = None) -> bytes:
+        """ Requests a playlist or a segment, recording the latency and duration of segments. """
+        started = time.monotonic()
+        response = self.api.client.rest_client.pool_manager.request(
+            'GET', url, headers=self._headers, preload_content=False
+        )
+        try:
+            if not 200 <= response.status <= 299:
+                body = response.read().decode('utf-8', 'replace')
+                raise ApiException(status=response.status, reason=response.reason, body=body)
+            latency = time.monotonic() - started
+            data = response.read()
+        finally:
+            response.release_conn()
+        if segment is not None:
+            segment.latency = latency
+            segment.seconds = time.monotonic() - started
+            segment.size = len(data)
+        return data
+
+    def _prefetch(self, index: int) -> bytes | Future:
+        """
+        Schedules the download of the segments of the window starting at index.
+
+        Returns the data of the segment at index if cached, its download otherwise,
+        taken under the same lock so a download ending meanwhile is not lost.
+        """
+        segments = self.playlist.segments
+        with self._lock:
+            current = self._cache.get(index)
+            if current is not None:
+                self._cache.move_to_end(index)
+            else:
+                current = self._pending.get(index)
+            for ahead in range(index, min(index + self.window, len(segments))):
+                if ahead not in self._cache and ahead not in self._pending:
+                    future = self._executor.submit(self._get, segments[ahead].uri, segments[ahead])
+                    self._pending[ahead] = future
+                    if ahead == index:
+                        current = future
+                    future.add_done_callback(lambda future, ahead=ahead: self._done(ahead, future))
+            return current
+
+    def _done(self, index: int, future: Future) -> None:
+        """ Moves a downloaded segment to the cache, dropping the least recently used. """
+        with self._lock:
+            self._pending.pop(index, None)
+            if future.cancelled() or future.exception() is not None:
+                return
+            self._cache[index] = future.result()
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def segment(self, index: int) -> bytes:
+        """
+        Returns the data of a segment, from the cache or waiting for its download,
+        and prefetches the next ones.
+
+        Args:
+            index (int): The index of the segment.
+
+        Raises:
+            IndexError: If there is no such segment.
+            ApiException: If the server rejects the request.
+
+        Returns:
+            bytes: The data of the segment.
+        """
+        segments = self.segments
+        if not 0 <= index < len(segments):
+            raise IndexError(f"Segment {index} out of range, the playlist has {len(segments)} segments.")
+
+        current = self._prefetch(index)
+        return current.result() if isinstance(current, Future) else current
+
+    @property
+    def init(self) -> bytes | None:
+        """ Returns the initialization segment of fMP4 variants, None for MPEG-TS. """
+        if self.playlist is None:
+            self.open()
+        return self._get(self.playlist.init) if self.playlist.init else None
+
+    def __iter__(self) -> Iterator[bytes]:
+        """ The data of every segment in order, the next ones downloaded meanwhile. """
+        for index in range(len(self.segments)):
+            yield self.segment(index)
+
+    def close(self) -> None:
+        """ Cancels the pending downloads and stops the transcoding on the server. """
+        if self._executor is None:
+            return
+        for future in list(self._pending.values()):
+            future.cancel()
+        self._executor.shutdown(wait=True)
+        self._executor = None
+        self._pending.clear()
+        self.api.generated.HlsSegmentApi(self.api.client).stop_encoding_process(self.device_id, self.play_session_id)
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class Hls():
+
+    def __init__(self, api: Api):
+        """
+        Initializes the HLS wrapper.
+
+        Args:
+            api (Api): An instance of the Api class.
+        """
+        self.api = api
+
+    def session(self, item: Item | str | uuid.UUID, profile: Dict[str, Any] = None, **options: Any) -> Session:
+        """
+        Returns a HLS session of an item, see Session for the options.
+
+        Usage:
+            with api.hls.session(item, {'video_codec': 'h264'}, window=8) as session:
+                for data in session:
+                    ...
+        """
+        return Session(self.api, item, profile, **options)
@@ -3,10 +3,84 @@ Module `image` - High-level interface for ImageApi.
 """
 from __future__ import annotations
 
-import os, requests, mimetypes, tempfile, uuid
+import base64, itertools, os, requests, mimetypes, tempfile, threading, time, urllib3, uuid
 
-from jellyfin.items import Item
-from jellyfin.generated import ImageType, ImageApi
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Tuple
+from pydantic import BaseModel
+
+from jellyfin.items import Item, _image_tag, _item_id
+from jellyfin.generated import ApiException, ImageFormat, ImageType, ImageApi
+
+_SIGNATURES = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF8', 'image/gif'),
+    (b'BM', 'image/bmp'),
+)
+
+def _sniff(head: bytes) -> str | None:
+    """ Guess the content type from the first bytes of the image. """
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    for signature, content_type in _SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    return None
+
+def _base64(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """ Encodes the chunks to base64 as they are read, keeping at most 2 bytes between them. """
+    rest = b''
+    for chunk in chunks:
+        data = rest + chunk if rest else chunk
+        cut = len(data) - len(data) % 3
+        if cut:
+            yield base64.b64encode(data[:cut])
+        rest = data[cut:]
+    if rest:
+        yield base64.b64encode(rest)
+
+def _run_bounded(fn: Callable, entries: Iterable, workers: int) -> None:
+    """ Runs fn over the entries on a pool, submitting at most twice as many as the workers at once. """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for entry in entries:
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+            pending.add(executor.submit(fn, entry))
+        for future in pending:
+            future.result()
+
+class ImageDownloads():
+    """ Result of Image.download_many, with the throughput of the downloads. """
+
+    def __init__(self):
+        self.paths: Dict[str, str] = {}
+        self.downloaded = 0
+        self.skipped = 0
+        self.missing: List[str] = []
+        self.errors: Dict[str, Exception] = {}
+        self.bytes = 0
+        self.seconds = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """ Returns the bytes downloaded per second. """
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+    @property
+    def rate(self) -> float:
+        """ Returns the images downloaded per second. """
+        return self.downloaded / self.seconds if self.seconds else 0.0
+
+    def __repr__(self) -> str:
+        return (
+            f"<ImageDownloads downloaded={self.downloaded}, skipped={self.skipped}, "
+            f"missing={len(self.missing)}, errors={len(self.errors)}, "
+            f"{self.throughput / 1024 ** 2:.2f} MiB/s, {self.rate:.1f} images/s>"
+        )
 
 class Image():
 
@@ -19,6 +93,275 @@ class Image():
         self.api = api
         self.image_api = api.generated.ImageApi(api.client)
 
+    def download_many(
+            self,
+            items: Iterable[Item | BaseModel],
+            image_type: ImageType = ImageType.PRIMARY,
+            dest: str = '.',
+            max_width: int = None,
+            max_height: int = None,
+            quality: int = None,
+            format: ImageFormat = None,
+            workers: int = 8,
+            chunk_size: int = 64 * 1024,
+            progress: Callable[[ImageDownloads], None] = None
+        ) -> ImageDownloads:
+        """
+        Downloads the image of many items concurrently, streaming each one to disk.
+
+        Files are named by the image tag (and size options), which changes
+        when the image changes, so images already downloaded are skipped
+        without any request.
+
+        Args:
+            items (Iterable[Item | BaseItemDto]): The items, with their ImageTags.
+            image_type (ImageType): The type of the image. Defaults to Primary.
+            dest (str): The directory of the files, created if not exists. Defaults to the current one.
+            max_width (int, optional): The maximum width of the image.
+            max_height (int, optional): The maximum height of the image.
+            quality (int, optional): The quality of the image, between 0 and 100.
+            format (ImageFormat, optional): The format of the image, the original one by default.
+            workers (int): Number of concurrent requests. Defaults to 8.
+            chunk_size (int): Size of the chunks written to disk. Defaults to 64 KiB.
+            progress (Callable, optional): Called with the partial result after each image.
+
+        Returns:
+            ImageDownloads: The path of each image by item ID (hex), errors and throughput,
+                errors of items without an ID are keyed by their position.
+
+        Usage:
+            api.image.download_many(api.items.search.recursive().paginate(1000).all, dest='posters', max_width=300)
+        """
+        image_type = ImageType(image_type)
+        os.makedirs(dest, exist_ok=True)
+        existing = {name.rsplit('.', 1)[0]: name for name in os.listdir(dest) if not name.endswith('.part')}
+
+        options = {'maxWidth': max_width, 'maxHeight': max_height, 'quality': quality}
+        variant = ''.join(f"-{key}{value}" for key, value in options.items() if value is not None)
+        if format is not None:
+            format = ImageFormat(format)
+            variant += f"-{format.value.lower()}"
+
+        result = ImageDownloads()
+        lock = threading.Lock()
+        started = time.monotonic()
+
+        def download(entry: Tuple[int, Item | BaseModel]) -> None:
+            position, item = entry
+            # the position stands for items without an ID
+            item_id = str(position)
+            try:
+                model = item.model if isinstance(item, Item) else item
+                item_id = model.id.hex
+                tag = _image_tag(model, image_type)
+                if tag is None:
+                    with lock:
+                        result.missing.append(item_id)
+                    return
+
+                stem = f"{tag}{variant}"
+                if stem in existing:
+                    with lock:
+                        result.paths[item_id] = os.path.join(dest, existing[stem])
+                        result.skipped += 1
+                    return
+
+                path, size = self._stream(model.id, image_type, stem, dest, chunk_size, tag=tag, format=format,
+                                          max_width=max_width, max_height=max_height, quality=quality)
+                with lock:
+                    existing[stem] = os.path.basename(path)
+                    result.paths[item_id] = path
+                    result.downloaded += 1
+                    result.bytes += size
+            except Exception as e:
+                with lock:
+                    result.errors[item_id] = e
+            finally:
+                result.seconds = time.monotonic() - started
+                if progress is not None:
+                    progress(result)
+
+        _run_bounded(download, enumerate(items), workers)
+
+        result.seconds = time.monotonic() - started
+        return result
+
+    def _stream(self, item_id: uuid.UUID, image_type: ImageType, stem: str, dest: str, chunk_size: int, **params) -> tuple:
+        """ Writes the image to a partial file renamed when complete, returns the path and size. """
+        params = {key: value for key, value in params.items() if value is not None}
+        response = self.image_api.get_item_image_without_preload_content(item_id, image_type, **params)
+        read = False
+        try:
+            if not 200 <= response.status <= 299:
+                body = response.read().decode('utf-8', 'replace')
+                read = True
+                raise ApiException(status=response.status, reason=response.reason, body=body)
+
+            content_type = (response.headers.get('Content-Type') or '').split(';')[0]
+            extension = mimetypes.guess_extension(content_type) or ''
+            path = os.path.join(dest, f"{stem}{extension}")
+
+            size = 0
+            with open(f"{path}.part", 'wb') as file:
+                for chunk in response.stream(chunk_size):
+                    file.write(chunk)
+                    size += len(chunk)
+            read = True
+            os.replace(f"{path}.part", path)
+            return path, size
+        finally:
+            # a connection with unread data can not be reused
+            if read:
+                response.release_conn()
+            else:
+                response.close()
+
+    def upload(
+            self,
+            item: Item | str | uuid.UUID,
+            image_type: ImageType,
+            source: str | bytes | BinaryIO,
+            content_type: str = None,
+            chunk_size: int = 48 * 1024,
+            timeout: float = None
+        ) -> None:
+        """
+        Uploads an image streaming it from the source straight into the request.
+
+        The image is never fully loaded in memory nor written to a temporary
+        file, it is read in chunks and encoded to base64 as the server expects.
+
+        Args:
+            item (Item | str | uuid.UUID): The item to upload the image for, an ID is used as is.
+            image_type (ImageType): The type of the image (e.g., "Primary", "Backdrop").
+            source (str | bytes | BinaryIO): An http(s) URL, a file path, the bytes or a file object like an mmap.
+            content_type (str, optional): The type of the image, guessed from the source by default.
+            chunk_size (int): Size of the chunks read from the source. Defaults to 48 KiB.
+            timeout (float, optional): Seconds to wait for the server. Defaults to no limit.
+
+        Raises:
+            ValueError: If the content type can not be guessed.
+            ApiException: If the server rejects the upload.
+        """
+        item_id = item.id if isinstance(item, Item) else uuid.UUID(str(item))
+        chunks, size, guessed, close = self._open(source, chunk_size - chunk_size % 3 or 3)
+        try:
+            content_type = content_type or guessed
+            if not content_type:
+                raise ValueError("Unknown content type, use the 'content_type' argument.")
+
+            method, url, headers, _, _ = self.image_api._set_item_image_serialize(
+                item_id, ImageType(image_type), None, None, content_type, None, 0
+            )
+            if size is not None:
+                headers['Content-Length'] = str(4 * ((size + 2) // 3))
+
+            response = self._send(method, url, headers, _base64(chunks), size is None, timeout)
+            body = response.read()
+            response.release_conn()
+            if not 200 <= response.status <= 299:
+                raise ApiException(status=response.status, reason=response.reason, body=body.decode('utf-8', 'replace'))
+        finally:
+            close()
+
+    def _send(self, method: str, url: str, headers: dict, body: Iterator[bytes], chunked: bool, timeout: float = None):
+        """
+        Sends a streamed body the way ApiClient.call_api sends the others.
+
+        The generated REST client only accepts str or bytes bodies, so the
+        request is made on its pool manager (proxy and TLS settings) with the
+        serialized URL and headers (default headers and authentication), its
+        timeout and its handling of TLS errors.
+        """
+        try:
+            return self.image_api.api_client.rest_client.pool_manager.request(
+                method,
+                url,
+                body=body,
+                headers=headers,
+                chunked=chunked,
+                timeout=urllib3.Timeout(total=timeout) if timeout else None,
+                preload_content=False
+            )
+        except urllib3.exceptions.SSLError as e:
+            raise ApiException(status=0, reason="\n".join([type(e).__name__, str(e)]))
+
+    def _open(self, source: str | bytes | BinaryIO, chunk_size: int) -> tuple:
+        """ Returns the chunks of the source, its size if known, the guessed content type and how to close it. """
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            view = memoryview(source)
+            chunks = (bytes(view[i:i + chunk_size]) for i in range(0, len(view), chunk_size))
+            return chunks, len(view), _sniff(bytes(view[:12])), lambda: None
+
+        if isinstance(source, str) and source.startswith(('http://', 'https://')):
+            response = requests.get(source, stream=True)
+            response.raise_for_status()
+            size = response.headers.get('Content-Length')
+            if size is None or response.headers.get('Content-Encoding'):
+                size = None
+            content_type = (response.headers.get('Content-Type') or '').split(';')[0]
+            if not content_type.startswith('image/'):
+                content_type, _ = mimetypes.guess_type(source.split('?')[0])
+            chunks = response.raw.stream(chunk_size, decode_content=True)
+            return chunks, int(size) if size is not None else None, content_type, response.close
+
+        if isinstance(source, str):
+            file = open(source, 'rb')
+            content_type, _ = mimetypes.guess_type(source)
+            return iter(lambda: file.read(chunk_size), b''), os.fstat(file.fileno()).st_size, content_type, file.close
+
+        size = None
+        try:
+            size = len(source) - source.tell()
+        except TypeError:
+            try:
+                size = os.fstat(source.fileno()).st_size - source.tell()
+            except (AttributeError, OSError, ValueError):
+                pass
+        content_type, _ = mimetypes.guess_type(getattr(source, 'name', '') or '')
+        head = source.read(chunk_size)
+        chunks = itertools.chain([head], iter(lambda: source.read(chunk_size), b''))
+        return chunks, size, content_type or _sniff(head), lambda: None
+
+    def upload_many(
+            self,
+            uploads: Iterable[Tuple[Item | str | uuid.UUID, ImageType, str | bytes | BinaryIO]],
+            workers: int = 4
+        ) -> Dict[str, Exception]:
+        """
+        Uploads many images concurrently, streaming each one.
+
+        Args:
+            uploads (Iterable[Tuple]): The item, image type and source of each image, see `upload`.
+            workers (int): Number of concurrent uploads. Defaults to 4.
+
+        Returns:
+            Dict[str, Exception]: The errors by item ID (hex), empty when all images were uploaded.
+
+        Usage:
+            api.image.upload_many([
+                (item, ImageType.PRIMARY, 'https://example.com/poster.jpg'),
+                ('f674245b84ea4d3ea9cf11', ImageType.BACKDROP, '/data/backdrop.png'),
+            ], workers=8)
+        """
+        errors = {}
+
+        def upload(entry: tuple) -> None:
+            item, image_type, source = entry
+            try:
+                self.upload(item, image_type, source)
+            except Exception as e:
+                item_id = item.id if isinstance(item, Item) else item
+                # an invalid ID is likely the error itself, keyed as given
+                try:
+                    key = _item_id(item_id)
+                except ValueError:
+                    key = str(item_id)
+                errors[key] = e
+
+        _run_bounded(upload, uploads, workers)
+        return errors
+
     def upload_from_url(self, item: Item | str | uuid.UUID, image_type: ImageType, uri: str) -> bool:
         """
         Uploads an image for a given item.
@@ -32,9 +375,7 @@ class Image():
             bool: True if the upload was successful, False otherwise.
         """
         try:
-            tmp = self.get_image_tmp(uri)
-            self.upload_from_file(item, image_type, tmp)
-            os.remove(tmp)
+            self.upload(item, image_type, uri)
         except Exception as e:
             print(f"Failed to upload image: {e}")
             return False
@@ -52,23 +393,14 @@ class Image():
         Returns:
             bool: True if the upload was successful, False otherwise.
         """
-        if isinstance(item, (str, uuid.UUID)):
-            item = self.api.items.by_id(item)
-
         if item is None:
             raise ValueError("Item not found")
-        
-        if not isinstance(item, Item):
+
+        if not isinstance(item, (Item, str, uuid.UUID)):
             raise ValueError(f"Invalid item type: {type(item)}")
 
-        content_type, _ = mimetypes.guess_type(file_path)
         try:
-            self.image_api.set_item_image(
-                item.id,
-                image_type,
-                file_path,
-                _content_type=content_type
-            )
+            self.upload(item, image_type, file_path)
         except Exception as e:
             print(f"Failed to upload image: {e}")
             return False
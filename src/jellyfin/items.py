@@ -3,34 +3,237 @@ Module `items` - High-level interface for ItemsApi.
 """
 from __future__ import annotations
 
+import json, re
+
 from uuid import UUID
+from inspect import signature
+from itertools import chain
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
 from pydantic import BaseModel
 from typing_extensions import Self
-from typing import Any, Callable
-from jellyfin.base import Model, Collection, Pagination
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List
+from jellyfin.base import Model, Collection, Operators, Pagination, Stream
+from jellyfin import jsonpath
 from jellyfin.generated import BaseItemKind
 from jellyfin.generated import (
+    ApiException,
     BaseItemKind,
+    ImageType,
+    ItemFields,
+    ItemSortBy,
     ItemsApi,
+    SortOrder,
     UserLibraryApi,
     ItemUpdateApi
 )
 
 class Item(Model):
-    def save(self) -> Item:
+    # never read by the server when updating an item
+    _readonly = (
+        'media_sources', 'media_streams', 'chapters', 'trickplay', 'user_data',
+        'image_tags', 'backdrop_image_tags', 'screenshot_image_tags',
+        'parent_backdrop_image_tags', 'image_blur_hashes', 'external_urls',
+        'current_program'
+    )
+    # kept as is by the server when missing
+    _optional = ('people',)
+
+    def save(self, force: bool = False) -> Item:
         """
         Save changes made to the item.
 
+        Nothing is sent when no field was changed, unless forced. The server
+        replaces the item with the payload, so every editable field is sent as
+        loaded, not only the changed ones: dirty tracking skips unchanged items.
+        Read-only fields like MediaSources and Chapters are never sent, and
+        People only when changed. Changes in place, like item.tags.append(),
+        are only seen on tracked items, see track.
+
+        Args:
+            force (bool): Save even if no change was made. Defaults to False.
+
         Returns:
             Item: The updated item.
         """
-        ItemUpdateApi().update_item(self.id.hex, self.model)
+        dirty = self.dirty
+        if not dirty and not force:
+            return self
+
+        excluded = set(self._readonly) | (set(self._optional) - dirty)
+        values = {
+            name: getattr(self.model, name)
+            for name in type(self.model).model_fields if name not in excluded
+        }
+        payload = type(self.model).model_construct(
+            _fields_set={name for name, value in values.items() if value is not None or name in dirty},
+            **values
+        )
+        ItemUpdateApi().update_item(self.id.hex, payload)
+        self.clean()
         return self
 
 class ItemCollection(Collection):
     _factory: Callable = Item
 
-class ItemSearch():
+    def save_all(self, workers: int = 4) -> Dict[str, Exception]:
+        """
+        Save concurrently all items changed in this collection.
+
+        Args:
+            workers (int): Number of concurrent requests. Defaults to 4.
+
+        Returns:
+            Dict[str, Exception]: The errors by item ID (hex), empty when all items were saved.
+        """
+        errors = {}
+
+        def save(item: Item):
+            try:
+                item.save()
+            except Exception as e:
+                errors[item.id.hex] = e
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(save, self.modified))
+
+        return errors
+
+    def placeholders(
+            self,
+            image_type: ImageType = ImageType.PRIMARY,
+            width: int = 32,
+            height: int = 32,
+            punch: float = 1.0
+        ) -> Dict[str, Any]:
+        """
+        Decodes the blurhash of an image of every item, without requesting any image.
+
+        Requires NumPy: pip install jellyfin-sdk[blurhash]
+
+        Args:
+            image_type (ImageType): The type of the image. Defaults to Primary.
+            width (int): Width of the placeholders. Defaults to 32.
+            height (int): Height of the placeholders. Defaults to 32.
+            punch (float): Contrast of the colors. Defaults to 1.
+
+        Returns:
+            Dict[str, numpy.ndarray]: RGB arrays of shape (height, width, 3) by item ID (hex), items without blurhash are left out.
+
+        Usage:
+            placeholders = api.items.search.paginate(500).all.placeholders(ImageType.PRIMARY, 32, 32)
+        """
+        from jellyfin import blurhash
+
+        image_type = ImageType(image_type)
+        attribute = re.sub(r'(?<!^)(?=[A-Z])', '_', image_type.value).lower()
+        ids, hashes = [], []
+        for item in self:
+            hashes_by_tag = getattr(item.image_blur_hashes, attribute, None) or {}
+            tag = _image_tag(item.model, image_type)
+            value = hashes_by_tag.get(tag) if tag is not None else None
+            if value is None and hashes_by_tag:
+                value = next(iter(hashes_by_tag.values()))
+            if value is not None:
+                ids.append(item.id.hex)
+                hashes.append(value)
+
+        return dict(zip(ids, blurhash.decode_many(hashes, width, height, punch)))
+
+    def decisions(self, profile: BaseModel, max_bitrate: int = None) -> Dict[str, Decision]:
+        """
+        Decides locally how every item plays on a device, without a playback info request per item.
+
+        Args:
+            profile (DeviceProfile): The profile of the device.
+            max_bitrate (int, optional): The bitrate limit, MaxStreamingBitrate of the profile by default.
+
+        Returns:
+            Dict[str, Decision]: The play method and transcode reasons by item ID (hex).
+
+        Usage:
+            search = api.items.search.recursive().paginate(500).add('fields', [ItemFields.MEDIASOURCES])
+            decisions = search.all.decisions(profile)
+        """
+        from jellyfin.decision import DecisionEngine
+
+        return DecisionEngine(profile, max_bitrate).decide_many(self)
+
+class ItemLookup(ItemCollection):
+    """ Items in the requested order, also accessible by ID.
+
+    Usage:
+        items = api.items.by_ids(ids, workers=8)
+        items['f674245b84ea4d3ea9cf11']
+        items[0]
+        items.missing
+    """
+
+    def __init__(self, data: List[BaseModel], missing: List[str] = None):
+        super().__init__(data)
+        self._index = {item.id.hex: item for item in data}
+        self.missing = missing or []
+
+    def __getitem__(self, key) -> Any:
+        if isinstance(key, (str, UUID)):
+            if key not in self:
+                raise KeyError(key)
+            return self._wrap(self._index[_item_id(key)])
+        return super().__getitem__(key)
+
+    def __contains__(self, key) -> bool:
+        if isinstance(key, (str, UUID)):
+            try:
+                return _item_id(key) in self._index
+            except ValueError:
+                return False
+        return super().__contains__(key)
+
+    def get(self, key: str | UUID, default: Any = None) -> Item | Any:
+        """ Returns the item with the given ID or default if it was not found. """
+        if key in self:
+            return self[key]
+        return default
+
+    def keys(self) -> List[str]:
+        """ Returns the IDs (hex) of the items found. """
+        return list(self._index.keys())
+
+def _image_tag(model: BaseModel, image_type: ImageType) -> str | None:
+    """ Returns the tag of the image, it changes when the image changes. """
+    if image_type == ImageType.BACKDROP:
+        tags = model.backdrop_image_tags or []
+    elif image_type == ImageType.SCREENSHOT:
+        tags = model.screenshot_image_tags or []
+    else:
+        tags = [(model.image_tags or {}).get(image_type.value)]
+    return tags[0] if tags else None
+
+def _item_id(item_id: str | UUID) -> str:
+    """ Normalizes an item ID to the hex form used by the server. """
+    if isinstance(item_id, UUID):
+        return item_id.hex
+    return UUID(str(item_id)).hex
+
+# item attribute -> (query parameter, accepts a list)
+_PUSHDOWN = {
+    'id': ('ids', True),
+    'type': ('include_item_types', True),
+    'media_type': ('media_types', True),
+    'location_type': ('location_types', True),
+    'video_type': ('video_types', True),
+    'official_rating': ('official_ratings', True),
+    'production_year': ('years', True),
+    'album_id': ('album_ids', True),
+    'parent_id': ('parent_id', False),
+    'index_number': ('index_number', False),
+    'parent_index_number': ('parent_index_number', False),
+    'is_hd': ('is_hd', False),
+    'is_favorite': ('is_favorite', False),
+    'is_played': ('is_played', False),
+}
+
+class ItemSearch(Operators):
     """ Based on DataFrame Builder pattern
     
     Usage:
@@ -45,6 +248,7 @@ class ItemSearch():
             "user_id": "abc"
         }).all()
     """
+    _attributes = ("items_api", "_params", "_page_size")
 
     def __init__(self, api: Api):
         self.items_api = api.generated.ItemsApi(api.client)
@@ -58,7 +262,7 @@ class ItemSearch():
             name (str): The name of the attribute to set.
             value (Any): The value to set the attribute to.
         """
-        if name in ("items_api", "_params", "_page_size"):
+        if name in self._attributes:
             super().__setattr__(name, value)
         else:
             self._params[name] = value
@@ -116,6 +320,11 @@ class ItemSearch():
             del self._params[key]
         return self
     
+    @property
+    def page_size(self) -> int:
+        """ Returns the number of items requested per page, zero when not paginated. """
+        return self._page_size
+
     def next_page(self) -> ItemCollection:
         """
         Move to the next page of results based on the current pagination settings.
@@ -128,6 +337,235 @@ class ItemSearch():
 
         return self.all
 
+    def _clone(self) -> ItemSearch:
+        """ Returns a copy with its own filters. """
+        search = object.__new__(type(self))
+        search.__dict__.update(self.__dict__)
+        search._params = dict(self._params)
+        return search
+
+    def _fields(self, *fields: ItemFields) -> None:
+        """ Make sure the server returns the fields needed locally. """
+        current = list(self._params.get('fields') or [])
+        for field in fields:
+            if field not in current:
+                current.append(field)
+        self._params['fields'] = current
+
+    def _paginated(self) -> ItemSearch:
+        """ Returns a copy paginated by 100 items, unless pagination or a limit was set. """
+        search = self._clone()
+        if search._page_size == 0 and 'limit' not in search._params:
+            search.paginate()
+        return search
+
+    @property
+    def stream(self) -> Stream:
+        """
+        Returns a lazy stream over the results, executing the search when consumed.
+
+        Pages of 100 items are used when pagination was not enabled.
+
+        Returns:
+            Stream: A lazy stream of items.
+        """
+        search = self._paginated()
+        return Stream(lambda: iter(search._clone().all))
+
+    def raw_pages(self, start: int = None) -> Iterator[List[dict]]:
+        """
+        Execute the search yielding the decoded items of each page, following the pagination.
+
+        Args:
+            start (int, optional): The index of the first item. Defaults to the current start index.
+
+        Returns:
+            Iterator[List[dict]]: The items of each page as returned by the server.
+        """
+        search = self._clone()
+        if start is not None:
+            search._params['start_index'] = start
+        while True:
+            page = search.raw
+            items = page.get('Items') or []
+            if items:
+                yield items
+
+            position = (search._params.get('start_index') or 0) + len(items)
+            total = page.get('TotalRecordCount')
+            if search._page_size == 0 or not items or (total and position >= total):
+                break
+            if not total and len(items) < search._page_size:
+                break
+            search._params['start_index'] = position
+
+    def jsonpath(self, expression: str) -> Stream:
+        """
+        Evaluate a JSONPath expression over each item as returned by the server,
+        page after page and without building the models.
+
+        `$` is each item, with the server field names (PascalCase). Remember to
+        request the optional fields used, like MediaStreams.
+
+        Args:
+            expression (str): The JSONPath expression, compiled once.
+
+        Returns:
+            Stream: A lazy stream of the matching values.
+
+        Usage:
+            search = api.items.search.recursive().add('fields', [ItemFields.MEDIASTREAMS])
+            search.jsonpath('$.MediaStreams[?(@.Type=="Subtitle")].Language')
+        """
+        path = jsonpath.compile_path(expression)
+        search = self._paginated()
+        return Stream(lambda: path.findall(item for page in search.raw_pages() for item in page))
+
+    def where(self, predicate: Callable[[Item], bool] = None, **fields: Any) -> Stream:
+        """
+        Filter the results, attribute values supported by the server are sent as query parameters.
+
+        Supported by the server: id, type, media_type, location_type, video_type, official_rating,
+        production_year, album_id, parent_id, index_number, parent_index_number, is_hd, is_favorite
+        and is_played. The predicate and other attributes are evaluated locally, like the values
+        conflicting with a parameter already set: lists are narrowed to the common values.
+
+        Args:
+            predicate (Callable, optional): Returns True for the items to keep.
+            **fields: Attribute values to match, a list matches any of its values.
+
+        Returns:
+            Stream: A lazy stream of items.
+
+        Usage:
+            api.items.search.recursive().where(type=BaseItemKind.MOVIE, production_year=[1999, 2000]).take(10)
+        """
+        search, local = self._clone(), {}
+        for name, value in fields.items():
+            param, multiple = _PUSHDOWN.get(name, (None, False))
+            is_list = isinstance(value, (list, tuple, set))
+            if param is None or (is_list and not multiple):
+                local[name] = value
+                continue
+
+            pushed = list(value) if is_list else [value] if multiple else value
+            current = search._params.get(param)
+            if current is not None and multiple:
+                # narrow the values already requested, never widen them
+                pushed = [item for item in current if item in pushed]
+                if not pushed:
+                    local[name] = value
+                    continue
+            elif current is not None and current != pushed:
+                local[name] = value
+                continue
+            search._params[param] = pushed
+        return search.stream.where(predicate, **local)
+
+    def select(self, *fields: str) -> Stream:
+        """ Produce a dict with only the given attributes of each item, requesting the optional fields needed. """
+        search = self._clone()
+        names = {field.value.lower(): field for field in ItemFields}
+        search._fields(*(names[name.replace('_', '')] for name in fields if name.replace('_', '') in names))
+        return search.stream.select(*fields)
+
+    def take(self, n: int) -> Stream:
+        """ Stop after n items, requesting no more than n items per page. """
+        search = self._clone()
+        if n > 0 and search._page_size == 0 and 'limit' not in search._params:
+            search.paginate(min(n, 100))
+        elif 0 < n < (search._page_size or search._params.get('limit') or 0):
+            search._page_size = n if search._page_size else 0
+            search._params['limit'] = n
+        return search.stream.take(n)
+
+    def snapshot(self, overlap: int = 50, skew: timedelta = timedelta(minutes=5)) -> Stream:
+        """
+        Walk all results once, correctly even if the library changes during the walk.
+
+        Offset pagination skips items when others are removed before the
+        current position and repeats items when others are added. Here the
+        results are sorted by DateCreated and SortName, each page is fetched
+        with `overlap` items of the previous one to find where it ended, and
+        every item not yet produced is produced, deduplicated by Id, so items
+        of equal dates and names swapping places between two requests are
+        not skipped (the server can not sort by Id to break those ties).
+        At the end, the items saved since the walk started are fetched to
+        include the ones added or moved during the walk.
+
+        Args:
+            overlap (int): Items of the previous page fetched again to align the next one. Defaults to 50.
+            skew (timedelta): Margin before the start of the walk for the items saved meanwhile,
+                to absorb the clock skew with the server. Defaults to 5 minutes.
+
+        Returns:
+            Stream: A lazy stream of items, each one produced once.
+
+        Usage:
+            for item in api.items.search.recursive().paginate(1000).snapshot():
+                ...
+        """
+        if overlap < 1:
+            raise ValueError("Overlap must be a positive integer.")
+
+        search = self._paginated()
+        search._params['sort_by'] = [ItemSortBy.DATECREATED, ItemSortBy.SORTNAME]
+        search._params['sort_order'] = [SortOrder.ASCENDING, SortOrder.ASCENDING]
+        return Stream(lambda: search._snapshot(overlap, skew))
+
+    def _snapshot(self, overlap: int, skew: timedelta) -> Iterator[Item]:
+        started = datetime.now(timezone.utc) - skew
+        size = self._page_size or self._params.get('limit') or 100
+        position = self._params.get('start_index') or 0
+        seen, anchors = set(), []
+
+        while True:
+            back = min(overlap, position) if anchors else 0
+            while True:
+                page = self.page(position - back, size + back).data
+                ids = [item.id.hex for item in page]
+                found = [ids.index(anchor) for anchor in anchors if anchor in ids]
+                # the anchors moved further than the overlap, look further back
+                if anchors and not found and back < position:
+                    back = min(back * 2, position)
+                    continue
+                break
+
+            # from the first item not produced, the overlap may hold items moved back
+            new = [item for item in page if item.id.hex not in seen]
+            for item in new:
+                seen.add(item.id.hex)
+                yield Item(item)
+
+            if not new or len(page) < size + back:
+                break
+            position += len(page) - back
+            anchors = ids[-overlap:]
+
+        changed = self._clone()
+        changed._params['min_date_last_saved'] = started
+        changed._params['start_index'] = 0
+        changed._params['limit'] = size
+        changed._page_size = size
+        for item in changed.all:
+            if item.id.hex not in seen:
+                seen.add(item.id.hex)
+                yield item
+
+    def page(self, start: int, limit: int) -> ItemCollection:
+        """
+        Fetch a single page at any position, without moving the pagination.
+
+        Args:
+            start (int): The index of the first item.
+            limit (int): The maximum number of items.
+
+        Returns:
+            ItemCollection: A collection of items of the page.
+        """
+        params = dict(self._params, start_index=start, limit=limit, enable_total_record_count=False)
+        return ItemCollection(Model(self.items_api.get_items(**params)))
+
     def paginate(self, size: int = 100) -> Self:
         """
         Enable pagination.
@@ -160,6 +598,26 @@ class ItemSearch():
             self if self._page_size > 0 else None
         )
     
+    @property
+    def raw(self) -> dict:
+        """
+        Execute the search returning the decoded JSON, without building the models.
+
+        Raises:
+            ApiException: If the server returns an error.
+
+        Returns:
+            dict: The query result as returned by the server.
+        """
+        response = self.items_api.get_items_without_preload_content(**self._params)
+        if not 200 <= response.status <= 299:
+            raise ApiException(
+                status=response.status,
+                reason=response.reason,
+                body=response.data.decode('utf-8', 'replace')
+            )
+        return json.loads(response.data)
+
     def recursive(self, flag: bool = True) -> Self:
         """ Shortcut to enable recursive search """
         self._params["recursive"] = flag
@@ -205,8 +663,196 @@ class Items():
             Item: The item with the specified ID.
         """
         if isinstance(item_id, UUID):
-            item_id = item.hex
+            item_id = item_id.hex
         return self.search.add('ids', [item_id]).all.first
+
+    def by_ids(
+            self,
+            ids: Iterable[str | UUID],
+            workers: int = 4,
+            max_url_length: int = 4096,
+            **filters: Any
+        ) -> ItemLookup:
+        """
+        Returns many items by their IDs.
+
+        The IDs are packed in as few requests as possible without the URL
+        going over `max_url_length`, and the requests run concurrently.
+
+        Args:
+            ids (Iterable[str | UUID]): The IDs of the items.
+            workers (int): Number of concurrent requests. Defaults to 4.
+            max_url_length (int): Maximum length of each request URL. Defaults to 4096.
+            **filters: Any other ItemSearch filter, e.g. fields or user_id.
+
+        Raises:
+            ValueError: If an ID is not valid or max_url_length is too small for a single ID.
+
+        Returns:
+            ItemLookup: The items found in the requested order, the IDs not found are in `missing`.
+        """
+        ids = list(dict.fromkeys(_item_id(item_id) for item_id in ids))
+        filters['enable_total_record_count'] = False
+
+        def fetch(chunk: List[str]) -> List[BaseModel]:
+            search = self.search
+            for key, value in filters.items():
+                search.add(key, value)
+            return search.add('ids', chunk).all.data
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pages = executor.map(fetch, self._chunk_ids(ids, filters, max_url_length))
+            found = {item.id.hex: item for page in pages for item in page}
+
+        return ItemLookup(
+            [found[item_id] for item_id in ids if item_id in found],
+            [item_id for item_id in ids if item_id not in found]
+        )
+
+    def tree(self, kind: BaseItemKind | str = BaseItemKind.SERIES, page_size: int = 1000, **filters: Any) -> ItemTree:
+        """
+        Returns the hierarchy of all items of a kind, fetched in a single paginated search.
+
+        Supported kinds: Series (seasons and episodes), MusicArtist (albums and audio),
+        MusicAlbum (audio) and PhotoAlbum (photos). Albums are not children of their
+        artists, so the album artists are listed apart and albums placed under them
+        by their AlbumArtists, the first one found for albums of many artists.
+
+        Args:
+            kind (BaseItemKind | str): The kind of the roots. Defaults to Series.
+            page_size (int): Number of items per request. Defaults to 1000.
+            **filters: Any other ItemSearch filter, e.g. parent_id of a library.
+
+        Raises:
+            ValueError: If the kind has no known hierarchy.
+
+        Returns:
+            ItemTree: The items indexed by ID with parent and children lookups.
+
+        Usage:
+            tree = api.items.tree(BaseItemKind.SERIES)
+            for series in tree.roots:
+                print(series.name, tree.count(series, BaseItemKind.EPISODE))
+        """
+        from jellyfin.tree import ItemTree, _HIERARCHIES
+
+        kind = BaseItemKind(kind)
+        if kind not in _HIERARCHIES:
+            kinds = [kind.value for kind in _HIERARCHIES]
+            raise ValueError(f"Unsupported kind: {kind.value}. Supported kinds are: {kinds}")
+
+        levels = _HIERARCHIES[kind][0]
+        search = self.search.recursive().paginate(page_size)
+        for key, value in filters.items():
+            search.add(key, value)
+        search.add('include_item_types', [level for level in levels if level != BaseItemKind.MUSICARTIST])
+        search._fields(ItemFields.PARENTID)
+
+        items: Iterable[Item] = search.all
+        if BaseItemKind.MUSICARTIST in levels:
+            items = chain(self._album_artists(page_size, filters), items)
+        return ItemTree(kind, items)
+
+    def _album_artists(self, page_size: int, filters: dict) -> Iterator[Item]:
+        """ Album artists, listed apart since they are not in the folders of the library. """
+        artists_api = self.api.generated.ArtistsApi(self.api.client)
+        accepted = signature(artists_api.get_album_artists).parameters
+        params = {key: value for key, value in filters.items() if key in accepted and key not in ('start_index', 'limit')}
+        start = 0
+        while True:
+            page = artists_api.get_album_artists(**params, start_index=start, limit=page_size)
+            for model in page.items or []:
+                yield Item(model)
+            start += len(page.items or [])
+            if not page.items or start >= (page.total_record_count or 0):
+                return
+
+    def download(
+            self,
+            item: Item | str | UUID,
+            dest: str | BinaryIO,
+            chunk_size: int = 1024 * 1024,
+            resume: bool = True,
+            retries: int = 5,
+            progress: Callable[[int, int], None] = None,
+            connections: int = 1
+        ) -> MediaDownload:
+        """
+        Downloads the media file of an item, streaming it to disk or to a buffer.
+
+        The file is never held in memory: the response is written chunk by
+        chunk, resumed with an HTTP Range after interruptions (and from a
+        previous `<dest>.part` file) and its size checked against the
+        MediaSourceInfo of the item.
+
+        Args:
+            item (Item | str | UUID): The item, fetched with its media sources if needed.
+            dest (str | BinaryIO): The path of the file or a writable binary buffer.
+            chunk_size (int): Size of the chunks read and written. Defaults to 1 MiB.
+            resume (bool): Resume a previous partial file of the path. Defaults to True.
+            retries (int): Number of times the download is resumed after errors. Defaults to 5.
+            progress (Callable, optional): Called with the bytes written and the total after each chunk.
+            connections (int): Download byte ranges on this many connections at once, see
+                jellyfin.download.fetch_segmented. Requires a path. Defaults to 1.
+
+        Raises:
+            ApiException: If the server rejects the download.
+            ValueError: If the downloaded size is not the one of the media source, or
+                connections is more than 1 with a buffer.
+
+        Returns:
+            MediaDownload: The path, the size and the throughput of the download.
+
+        Usage:
+            api.items.download(item, 'movie.mkv', progress=lambda done, total: print(done, total))
+        """
+        from jellyfin.download import fetch, fetch_segmented, _media_size
+
+        if connections > 1 and not isinstance(dest, str):
+            raise ValueError("A segmented download requires the path of the file as dest.")
+
+        model = item.model if isinstance(item, Item) else None
+        if model is None or not model.media_sources:
+            search = self.search.add('ids', [_item_id(item.id if isinstance(item, Item) else item)])
+            search._fields(ItemFields.MEDIASOURCES)
+            found = search.all.first
+            if found is None:
+                raise ValueError(f"Item not found: {item}")
+            model = found.model
+
+        library = self.api.generated.LibraryApi(self.api.client)
+        request = lambda headers: library.get_download_without_preload_content(model.id, _headers=headers)
+        if connections > 1:
+            return fetch_segmented(
+                request,
+                dest,
+                _media_size(model),
+                connections,
+                chunk_size=chunk_size,
+                retries=retries,
+                progress=progress
+            )
+        return fetch(request, dest, _media_size(model), chunk_size, resume, retries, progress)
+
+    def _chunk_ids(self, ids: List[str], filters: dict, max_url_length: int) -> Iterable[List[str]]:
+        """ Splits the IDs in chunks that fit in the URL along with the other filters. """
+        client = self.api.client
+        query = client.sanitize_for_serialization(filters)
+        formats = {key: 'multi' for key, value in query.items() if isinstance(value, list)}
+        used = len(self.api.url) + len('/Items?') + len(client.parameters_to_url_query(query, formats))
+
+        chunk, length = [], used
+        for item_id in ids:
+            cost = len('&ids=') + len(str(UUID(item_id)))
+            if used + cost > max_url_length:
+                raise ValueError(f"max_url_length of {max_url_length} is too small, at least {used + cost} is required.")
+            if length + cost > max_url_length:
+                yield chunk
+                chunk, length = [], used
+            chunk.append(item_id)
+            length += cost
+        if chunk:
+            yield chunk
     
     def edit(self, item: Item | str | UUID, user: str | UUID = None) -> Item:
         """
@@ -217,13 +863,13 @@ class Items():
             user (str | UUID): The user context for the edit, either as a username or UUID.
 
         Returns:
-            Item: The edited item.
+            Item: The edited item, tracked so in-place changes are saved too.
         """
         if isinstance(item, Item):
             item = item.id
 
         if isinstance(user, (str, UUID)):
-            user = self.api.users.of(user)
+            user = self.api.users.resolve(user)
             
         if user is None:
             user = self.api.user
@@ -231,7 +877,7 @@ class Items():
         if user is None:
             raise ValueError("User context is required to edit an item.")
 
-        return Item(UserLibraryApi(self.api.client).get_item(item, user.id))
+        return Item(UserLibraryApi(self.api.client).get_item(item, user.id)).track()
 
     @property
     def search(self) -> ItemSearch:
@@ -0,0 +1,327 @@
+"""
+Module `jsonpath` - Compiled JSONPath expressions over decoded JSON.
+"""
+from __future__ import annotations
+
+import re
+
+from functools import lru_cache
+from typing import Any, Callable, Iterable, Iterator, List
+
+Step = Callable[[Any], Iterator[Any]]
+
+_MISSING = object()
+
+_FILTER_TOKENS = re.compile(r"""
+    \s*(?:
+        (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+      | (?P<number>-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)
+      | (?P<operator>==|!=|<=|>=|<|>|&&|\|\||!|\(|\))
+      | (?P<current>@(?:\.\w+|\[\s*(?:'[^']*'|"[^"]*"|-?\d+)\s*\])*)
+      | (?P<keyword>true|false|null)
+    )""", re.VERBOSE)
+
+_CURRENT_PARTS = re.compile(r"""\.(\w+)|\[\s*(?:'([^']*)'|"([^"]*)"|(-?\d+))\s*\]""")
+
+def _children(node: Any) -> Iterator[Any]:
+    if isinstance(node, dict):
+        yield from node.values()
+    elif isinstance(node, list):
+        yield from node
+
+def _descendants(node: Any) -> Iterator[Any]:
+    """ The node and all nodes below it, depth first. """
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        if isinstance(node, dict):
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+
+def _member(names: List[str]) -> Step:
+    def step(node: Any) -> Iterator[Any]:
+        if isinstance(node, dict):
+            for name in names:
+                if name in node:
+                    yield node[name]
+    return step
+
+def _index(indexes: List[int]) -> Step:
+    def step(node: Any) -> Iterator[Any]:
+        if isinstance(node, list):
+            for index in indexes:
+                if -len(node) <= index < len(node):
+                    yield node[index]
+    return step
+
+def _slice(selector: slice) -> Step:
+    def step(node: Any) -> Iterator[Any]:
+        if isinstance(node, list):
+            yield from node[selector]
+    return step
+
+def _filter(predicate: Callable[[Any], bool]) -> Step:
+    def step(node: Any) -> Iterator[Any]:
+        for child in _children(node):
+            if predicate(child):
+                yield child
+    return step
+
+def _apply(step: Step, nodes: Iterator[Any]) -> Iterator[Any]:
+    for node in nodes:
+        yield from step(node)
+
+def _unquote(literal: str) -> str:
+    return re.sub(r"\\(.)", r"\1", literal[1:-1])
+
+class _FilterParser():
+    """ Recursive descent parser of filter expressions like `@.Type == "Subtitle" && !@.IsExternal` """
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        self.tokens = []
+        position = 0
+        while position < len(expression):
+            if expression[position:].strip() == '':
+                break
+            match = _FILTER_TOKENS.match(expression, position)
+            if match is None:
+                raise ValueError(f"Invalid filter expression at {position}: {expression!r}")
+            self.tokens.append((match.lastgroup, match.group(match.lastgroup)))
+            position = match.end()
+        self.position = 0
+
+    def parse(self) -> Callable[[Any], bool]:
+        predicate = self._or()
+        if self.position != len(self.tokens):
+            raise ValueError(f"Unexpected {self.tokens[self.position][1]!r} in filter: {self.expression!r}")
+        return lambda node: bool(predicate(node))
+
+    def _peek(self) -> str | None:
+        if self.position < len(self.tokens):
+            return self.tokens[self.position][1]
+        return None
+
+    def _next(self) -> tuple:
+        if self.position >= len(self.tokens):
+            raise ValueError(f"Unexpected end of filter: {self.expression!r}")
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def _or(self) -> Callable:
+        left = self._and()
+        while self._peek() == '||':
+            self._next()
+            left = (lambda a, b: lambda node: a(node) or b(node))(left, self._and())
+        return left
+
+    def _and(self) -> Callable:
+        left = self._not()
+        while self._peek() == '&&':
+            self._next()
+            left = (lambda a, b: lambda node: a(node) and b(node))(left, self._not())
+        return left
+
+    def _not(self) -> Callable:
+        if self._peek() == '!':
+            self._next()
+            operand = self._not()
+            return lambda node: not operand(node)
+        return self._comparison()
+
+    def _comparison(self) -> Callable:
+        left = self._operand()
+        if self._peek() not in ('==', '!=', '<', '<=', '>', '>='):
+            return lambda node: left(node) not in (_MISSING, None, False)
+
+        operator = self._next()[1]
+        right = self._operand()
+        compare = {
+            '==': lambda a, b: a == b,
+            '!=': lambda a, b: a != b,
+            '<': lambda a, b: a < b,
+            '<=': lambda a, b: a <= b,
+            '>': lambda a, b: a > b,
+            '>=': lambda a, b: a >= b,
+        }[operator]
+
+        def comparison(node: Any) -> bool:
+            a, b = left(node), right(node)
+            if a is _MISSING or b is _MISSING:
+                return operator == '!='
+            try:
+                return compare(a, b)
+            except TypeError:
+                return False
+        return comparison
+
+    def _operand(self) -> Callable:
+        kind, token = self._next()
+        if token == '(':
+            inner = self._or()
+            if self._next()[1] != ')':
+                raise ValueError(f"Missing ')' in filter: {self.expression!r}")
+            return inner
+        if kind == 'string':
+            value = _unquote(token)
+            return lambda node: value
+        if kind == 'number':
+            value = float(token) if any(c in token for c in '.eE') else int(token)
+            return lambda node: value
+        if kind == 'keyword':
+            value = {'true': True, 'false': False, 'null': None}[token]
+            return lambda node: value
+        if kind == 'current':
+            parts = []
+            for name, single, double, index in _CURRENT_PARTS.findall(token[1:]):
+                parts.append(int(index) if index else name or single or double)
+
+            def current(node: Any) -> Any:
+                for part in parts:
+                    if isinstance(part, int) and isinstance(node, list) and -len(node) <= part < len(node):
+                        node = node[part]
+                    elif isinstance(part, str) and isinstance(node, dict) and part in node:
+                        node = node[part]
+                    else:
+                        return _MISSING
+                return node
+            return current
+        raise ValueError(f"Unexpected {token!r} in filter: {self.expression!r}")
+
+class JSONPath():
+    """ JSONPath expression compiled once in a chain of steps, evaluated over
+    decoded JSON (dicts and lists) without building any model.
+
+    Supported: `$`, `.Name`, `['Name']`, `..` (recursive descent), `*`,
+    `[0]`, `[0,1]`, `[1:3]`, `[?(@.Field == "value" && @.Other > 1)]`.
+
+    Usage:
+        path = JSONPath('$..MediaStreams[?(@.Type=="Subtitle")].Language')
+        path.find(item)
+    """
+
+    def __init__(self, expression: str):
+        """
+        Compiles the expression.
+
+        Args:
+            expression (str): The JSONPath expression, starting with `$`.
+
+        Raises:
+            ValueError: If the expression is not valid.
+        """
+        self.expression = expression
+        self._steps = self._compile(expression.strip())
+
+    def __repr__(self) -> str:
+        return f"<JSONPath '{self.expression}'>"
+
+    def _compile(self, expression: str) -> List[Step]:
+        if not expression.startswith('$'):
+            raise ValueError(f"JSONPath must start with '$': {expression!r}")
+
+        steps, position = [], 1
+        while position < len(expression):
+            char = expression[position]
+            if expression.startswith('..', position):
+                steps.append(_descendants)
+                position += 2
+                if position < len(expression) and expression[position] != '[':
+                    position = self._dot(expression, position, steps)
+            elif char == '.':
+                position = self._dot(expression, position + 1, steps)
+            elif char == '[':
+                position = self._bracket(expression, position, steps)
+            else:
+                raise ValueError(f"Unexpected {char!r} at {position}: {expression!r}")
+        return steps
+
+    def _dot(self, expression: str, position: int, steps: List[Step]) -> int:
+        if expression.startswith('*', position):
+            steps.append(_children)
+            return position + 1
+        match = re.compile(r'[\w-]+').match(expression, position)
+        if match is None:
+            raise ValueError(f"Expected a name at {position}: {expression!r}")
+        steps.append(_member([match.group()]))
+        return match.end()
+
+    def _bracket(self, expression: str, position: int, steps: List[Step]) -> int:
+        end = self._closing(expression, position)
+        content = expression[position + 1:end].strip()
+
+        if content == '*':
+            steps.append(_children)
+        elif content.startswith('?'):
+            inner = content[1:].strip()
+            if inner.startswith('(') and inner.endswith(')'):
+                inner = inner[1:-1]
+            steps.append(_filter(_FilterParser(inner).parse()))
+        elif content[:1] in ('"', "'"):
+            names = re.findall(r"""'((?:[^'\\]|\\.)*)'|"((?:[^"\\]|\\.)*)\"""", content)
+            steps.append(_member([re.sub(r"\\(.)", r"\1", single or double) for single, double in names]))
+        elif ':' in content:
+            parts = [int(part) if part.strip() else None for part in content.split(':')]
+            if len(parts) > 3:
+                raise ValueError(f"Invalid slice [{content}]: {expression!r}")
+            steps.append(_slice(slice(*parts)))
+        else:
+            try:
+                steps.append(_index([int(part) for part in content.split(',')]))
+            except ValueError:
+                raise ValueError(f"Invalid selector [{content}]: {expression!r}")
+        return end + 1
+
+    def _closing(self, expression: str, position: int) -> int:
+        """ Position of the bracket closing the one at position, ignoring quoted ones. """
+        depth, quote = 0, None
+        for index in range(position, len(expression)):
+            char = expression[index]
+            if quote:
+                if char == quote and expression[index - 1] != '\\':
+                    quote = None
+            elif char in ('"', "'"):
+                quote = char
+            elif char == '[':
+                depth += 1
+            elif char == ']':
+                depth -= 1
+                if depth == 0:
+                    return index
+        raise ValueError(f"Missing ']' in: {expression!r}")
+
+    def find(self, document: Any) -> Iterator[Any]:
+        """
+        Evaluate the expression over a decoded JSON document.
+
+        Args:
+            document (Any): The dicts and lists decoded from JSON.
+
+        Returns:
+            Iterator[Any]: The matching values, lazily.
+        """
+        nodes = iter((document,))
+        for step in self._steps:
+            nodes = _apply(step, nodes)
+        return nodes
+
+    def findall(self, documents: Iterable[Any]) -> Iterator[Any]:
+        """ Evaluate the expression over each document, chaining the values. """
+        for document in documents:
+            yield from self.find(document)
+
+@lru_cache(maxsize=256)
+def compile_path(expression: str) -> JSONPath:
+    """
+    Returns the compiled expression, reused for the same expression.
+
+    Args:
+        expression (str): The JSONPath expression, starting with `$`.
+
+    Returns:
+        JSONPath: The compiled expression.
+    """
+    return JSONPath(expression)
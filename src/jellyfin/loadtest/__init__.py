@@ -0,0 +1,524 @@
+"""
+Module `loadtest` - Virtual clients to capacity-test a Jellyfin server, run with `python -m jellyfin.loadtest`.
+"""
+from __future__ import annotations
+
+import json, math, random, re, threading, time, urllib3, uuid
+
+from typing import Any, Callable, Dict, Iterable, List
+from urllib.parse import urlsplit
+from pydantic import BaseModel
+
+from jellyfin.api import Api
+from jellyfin.hls import Session
+from jellyfin.playstate import Playstate
+from jellyfin.generated import BaseItemKind, ItemFields, PlayMethod
+
+FLOWS = ('browse', 'paginate', 'images', 'hls', 'playstate')
+
+_IDS = re.compile(r'[0-9a-fA-F]{8}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{12}')
+_NUMBERS = re.compile(r'/\d+(?=[/.]|$)')
+
+def endpoint(method: str, url: str) -> str:
+    """ Name of the endpoint of a request, with IDs and numbers of the path replaced, e.g. `GET /Items/{id}/Images/Primary`. """
+    path = _NUMBERS.sub('/{n}', _IDS.sub('{id}', urlsplit(url).path))
+    return f"{method.upper()} {path}"
+
+def percentile(values: List[float], q: float) -> float:
+    """ Nearest-rank percentile of sorted values, 0 if empty. """
+    if not values:
+        return 0.0
+    return values[max(0, min(len(values) - 1, math.ceil(q / 100 * len(values)) - 1))]
+
+class Ramp():
+    """ Number of virtual clients running over time.
+
+    Usage:
+        Ramp.parse('constant')     # all clients at once
+        Ramp.parse('linear:30')    # from 1 to all clients in 30 seconds
+        Ramp.parse('step:10:15')   # 10 more clients every 15 seconds
+    """
+
+    KINDS = ('constant', 'linear', 'step')
+
+    def __init__(self, kind: str = 'constant', seconds: float = 0.0, step: int = 1):
+        """
+        Args:
+            kind (str): One of constant, linear or step. Defaults to constant.
+            seconds (float): Duration of the linear ramp, or between two steps.
+            step (int): Clients added at each step.
+
+        Raises:
+            ValueError: If the kind is unknown or the duration is not positive for linear and step.
+        """
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown ramp '{kind}', expected one of: {', '.join(self.KINDS)}")
+        if kind != 'constant' and seconds <= 0:
+            raise ValueError(f"The {kind} ramp requires a positive duration.")
+        self.kind = kind
+        self.seconds = seconds
+        self.step = step
+
+    def __repr__(self) -> str:
+        return f"<Ramp kind='{self.kind}', seconds={self.seconds}, step={self.step}>"
+
+    @classmethod
+    def parse(cls, text: str) -> Ramp:
+        """
+        Parses a ramp from `constant`, `linear:<seconds>` or `step:<clients>:<seconds>`.
+
+        Raises:
+            ValueError: If the text is not a ramp.
+        """
+        kind, *args = text.split(':')
+        try:
+            if kind == 'linear' and len(args) == 1:
+                return cls(kind, float(args[0]))
+            if kind == 'step' and len(args) == 2:
+                return cls(kind, float(args[1]), int(args[0]))
+        except ValueError:
+            pass
+        if kind == 'constant' and not args:
+            return cls(kind)
+        raise ValueError(f"Invalid ramp '{text}', expected constant, linear:<seconds> or step:<clients>:<seconds>")
+
+    def clients(self, elapsed: float, total: int) -> int:
+        """ Returns the number of clients that should run after `elapsed` seconds. """
+        if self.kind == 'linear':
+            return min(total, 1 + int((total - 1) * elapsed / self.seconds))
+        if self.kind == 'step':
+            return min(total, self.step * (1 + int(elapsed / self.seconds)))
+        return total
+
+class EndpointStats():
+    """ Latencies of an endpoint, in seconds. """
+
+    def __init__(self, name: str, latencies: List[float], errors: int, seconds: float):
+        latencies = sorted(latencies)
+        self.name = name
+        self.count = len(latencies)
+        self.errors = errors
+        self.rate = self.count / seconds if seconds else 0.0
+        self.mean = sum(latencies) / len(latencies) if latencies else 0.0
+        self.p50 = percentile(latencies, 50)
+        self.p90 = percentile(latencies, 90)
+        self.p95 = percentile(latencies, 95)
+        self.p99 = percentile(latencies, 99)
+        self.max = latencies[-1] if latencies else 0.0
+
+    def __repr__(self) -> str:
+        return (
+            f"<EndpointStats '{self.name}' count={self.count}, errors={self.errors}, "
+            f"p50={self.p50 * 1000:.1f} ms, p95={self.p95 * 1000:.1f} ms, p99={self.p99 * 1000:.1f} ms>"
+        )
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'endpoint': self.name, 'count': self.count, 'errors': self.errors, 'rate': self.rate,
+            'mean_ms': self.mean * 1000, 'p50_ms': self.p50 * 1000, 'p90_ms': self.p90 * 1000,
+            'p95_ms': self.p95 * 1000, 'p99_ms': self.p99 * 1000, 'max_ms': self.max * 1000,
+        }
+
+class Report():
+    """ Result of a load test, latency percentiles by endpoint and completed flows. """
+
+    def __init__(self, endpoints: List[EndpointStats], flows: Dict[str, int], failures: Dict[str, int], clients: int, seconds: float):
+        self.endpoints = endpoints
+        self.flows = flows
+        self.failures = failures
+        self.clients = clients
+        self.seconds = seconds
+
+    @property
+    def requests(self) -> int:
+        return sum(stats.count for stats in self.endpoints)
+
+    @property
+    def errors(self) -> int:
+        return sum(stats.errors for stats in self.endpoints)
+
+    @property
+    def error_rate(self) -> float:
+        """ Returns the share of requests that failed. """
+        return self.errors / self.requests if self.requests else 0.0
+
+    def __repr__(self) -> str:
+        return (
+            f"<Report clients={self.clients}, seconds={self.seconds:.1f}, requests={self.requests}, "
+            f"errors={self.errors}, endpoints={len(self.endpoints)}>"
+        )
+
+    def __getitem__(self, name: str) -> EndpointStats:
+        for stats in self.endpoints:
+            if stats.name == name:
+                return stats
+        raise KeyError(name)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'clients': self.clients,
+            'seconds': self.seconds,
+            'requests': self.requests,
+            'errors': self.errors,
+            'error_rate': self.error_rate,
+            'flows': self.flows,
+            'failures': self.failures,
+            'endpoints': [stats.as_dict() for stats in self.endpoints],
+        }
+
+    def json(self, path: str) -> None:
+        """ Writes the report as JSON, e.g. an artifact of CI. """
+        with open(path, 'w') as file:
+            json.dump(self.as_dict(), file, indent=2)
+
+    def print(self) -> None:
+        """ Prints the latency table using rich. """
+        from rich.console import Console
+        from rich.table import Table
+
+        table = Table(title=f"{self.clients} clients, {self.seconds:.0f} s, {self.requests} requests, {self.errors} errors")
+        table.add_column('Endpoint', no_wrap=True)
+        for column in ('Count', 'Errors', 'Req/s', 'p50 ms', 'p90 ms', 'p95 ms', 'p99 ms', 'Max ms'):
+            table.add_column(column, justify='right')
+        for stats in self.endpoints:
+            table.add_row(
+                stats.name, str(stats.count), str(stats.errors), f"{stats.rate:.1f}",
+                *(f"{value * 1000:.1f}" for value in (stats.p50, stats.p90, stats.p95, stats.p99, stats.max))
+            )
+        console = Console()
+        console.print(table)
+        console.print(f"Flows: {self.flows}" + (f", failures: {self.failures}" if self.failures else ''))
+
+class Stats():
+    """ Latencies recorded by all virtual clients, by endpoint. """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.clients = 0
+        self._latencies: Dict[str, List[float]] = {}
+        self._errors: Dict[str, int] = {}
+        self._flows: Dict[str, int] = {}
+        self._failures: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float, error: bool = False) -> None:
+        with self._lock:
+            self._latencies.setdefault(name, []).append(seconds)
+            if error:
+                self._errors[name] = self._errors.get(name, 0) + 1
+
+    def flow(self, name: str, failed: bool = False) -> None:
+        with self._lock:
+            counter = self._failures if failed else self._flows
+            counter[name] = counter.get(name, 0) + 1
+
+    def instrument(self, api: Api) -> None:
+        """ Records the latency of every request of an Api, to the full body or to the headers of streamed bodies. """
+        pool = api.client.rest_client.pool_manager
+        urlopen = pool.urlopen
+
+        def timed(method: str, url: str, *args: Any, **kwargs: Any) -> Any:
+            started = time.monotonic()
+            try:
+                response = urlopen(method, url, *args, **kwargs)
+            except Exception:
+                self.record(endpoint(method, url), time.monotonic() - started, True)
+                raise
+            self.record(endpoint(method, url), time.monotonic() - started, response.status >= 400)
+            return response
+
+        pool.urlopen = timed
+
+    def report(self) -> Report:
+        """ Returns the percentiles of the latencies recorded so far. """
+        seconds = time.monotonic() - self.started
+        with self._lock:
+            latencies = {name: list(values) for name, values in self._latencies.items()}
+            errors = dict(self._errors)
+            flows, failures = dict(self._flows), dict(self._failures)
+        endpoints = [EndpointStats(name, values, errors.get(name, 0), seconds) for name, values in latencies.items()]
+        endpoints.sort(key=lambda stats: stats.count, reverse=True)
+        return Report(endpoints, flows, failures, self.clients, seconds)
+
+class VirtualClient():
+    """ A device browsing the libraries, paginating items with their images and watching videos. """
+
+    def __init__(self, test: LoadTest, number: int):
+        self.test = test
+        self.number = number
+        self.device_id = f"loadtest-{number}-{uuid.uuid4().hex[:8]}"
+        self.random = random.Random(None if test.seed is None else test.seed + number)
+        self.api = Api(test.url, test.api_key).register_client(
+            'jellyfin-loadtest', f"loadtest-{number}", self.device_id, '1.0'
+        )
+        self._bound(test.timeout)
+        test.stats.instrument(self.api)
+        self.views_api = self.api.generated.UserViewsApi(self.api.client)
+
+    def __repr__(self) -> str:
+        return f"<VirtualClient {self.number} device='{self.device_id}'>"
+
+    def _bound(self, timeout: float) -> None:
+        """ Applies the timeout to every request without one, so a client can always be stopped. """
+        pool = self.api.client.rest_client.pool_manager
+        urlopen = pool.urlopen
+
+        def bounded(method: str, url: str, *args: Any, **kwargs: Any) -> Any:
+            if kwargs.get('timeout') is None:
+                kwargs['timeout'] = urllib3.Timeout(total=timeout)
+            return urlopen(method, url, *args, **kwargs)
+
+        pool.urlopen = bounded
+
+    def _think(self, stop: threading.Event) -> None:
+        if self.test.think > 0:
+            stop.wait(self.random.expovariate(1 / self.test.think))
+
+    def _flow(self, name: str, function: Callable, *args: Any) -> Any:
+        try:
+            result = function(*args)
+        except Exception:
+            self.test.stats.flow(name, failed=True)
+            return None
+        self.test.stats.flow(name)
+        return result
+
+    def browse(self) -> List[BaseModel]:
+        """ Requests the views of the user, like the home screen. """
+        return self.views_api.get_user_views(user_id=self.test.user_id).items or []
+
+    def paginate(self, parent: BaseModel | None, start: int) -> List[BaseModel]:
+        """ Requests a page of the items of a view, like scrolling a library. """
+        search = self.api.items.search.add('user_id', self.test.user_id).recursive()
+        search.add('fields', [ItemFields.PRIMARYIMAGEASPECTRATIO])
+        if parent is not None:
+            search.add('parent_id', parent.id)
+        return search.page(start, self.test.page_size).data
+
+    def images(self, items: List[BaseModel]) -> None:
+        """ Requests the posters of some items of a page, like a grid. """
+        pool = self.api.client.rest_client.pool_manager
+        for item in self.random.sample(items, min(self.test.images, len(items))):
+            url = self.api.urls.image(item, max_width=300, quality=90)
+            if url is not None:
+                response = pool.request('GET', url, preload_content=False)
+                try:
+                    if response.status >= 400:
+                        raise ValueError(f"Image of {item.id.hex} failed with status {response.status}")
+                    response.drain_conn()
+                finally:
+                    response.release_conn()
+
+    def watch(self, item: BaseModel, stop: threading.Event) -> None:
+        """ Plays the first segments of a video at the playback speed, reporting the progress. """
+        test = self.test
+        session = Session(self.api, item.id, test.profile, window=2, cache_size=4, device_id=self.device_id) if 'hls' in test.flows else None
+        report = None
+        if 'playstate' in test.flows:
+            report = test.playstate.session(
+                item, play_session_id=session.play_session_id if session else None, device_id=self.device_id,
+                can_seek=True, play_method=PlayMethod.TRANSCODE if session else PlayMethod.DIRECTPLAY
+            )
+        position = 0.0
+        try:
+            if session is not None:
+                session.open()
+            if report is not None:
+                report.start(position_ticks=0)
+            for index in range(test.segments):
+                if stop.is_set():
+                    break
+                duration = 6.0
+                if session is not None:
+                    if index >= len(session.segments):
+                        break
+                    session.segment(index)
+                    duration = session.segments[index].duration
+                if stop.wait(duration / test.speed):
+                    break
+                position += duration
+                if report is not None:
+                    report.update(position_ticks=int(position * 10_000_000))
+        finally:
+            if report is not None and report.started:
+                report.stop(position_ticks=int(position * 10_000_000))
+            if session is not None:
+                session.close()
+
+    def run(self, stop: threading.Event) -> None:
+        """ Repeats the flows until stopped. """
+        test = self.test
+        views: List[BaseModel] = []
+        while not stop.is_set():
+            if 'browse' in test.flows or ('paginate' in test.flows and not views):
+                views = self._flow('browse', self.browse) or views
+                self._think(stop)
+
+            if 'paginate' in test.flows:
+                parent = self.random.choice(views) if views else None
+                for page in range(self.random.randint(1, test.pages)):
+                    if stop.is_set():
+                        return
+                    items = self._flow('paginate', self.paginate, parent, page * test.page_size)
+                    if not items:
+                        break
+                    if 'images' in test.flows:
+                        self._flow('images', self.images, items)
+                    self._think(stop)
+
+            if test.videos and ('hls' in test.flows or 'playstate' in test.flows) and self.random.random() < test.watch:
+                self._flow('watch', self.watch, self.random.choice(test.videos), stop)
+                self._think(stop)
+
+            if stop.is_set():
+                return
+            if not {'browse', 'paginate'} & set(test.flows) and not test.videos:
+                stop.wait(1.0)
+
+class LoadTest():
+    """ Virtual clients started along a ramp, each with its own device and connections,
+    with the latency of every request recorded by endpoint.
+
+    Usage:
+        report = LoadTest(url, api_key, clients=50, duration=120, ramp=Ramp.parse('linear:60')).run()
+        report.print()
+        report['GET /Items'].p95
+    """
+
+    def __init__(
+            self,
+            url: str,
+            api_key: str,
+            clients: int = 10,
+            duration: float = 60.0,
+            ramp: Ramp = None,
+            flows: Iterable[str] = FLOWS,
+            user: str = None,
+            think: float = 1.0,
+            page_size: int = 50,
+            pages: int = 3,
+            images: int = 8,
+            watch: float = 0.3,
+            segments: int = 5,
+            speed: float = 1.0,
+            profile: Dict[str, Any] = None,
+            progress_interval: float = 10.0,
+            timeout: float = 30.0,
+            seed: int = None
+        ):
+        """
+        Args:
+            url (str): The base URL of the Jellyfin server.
+            api_key (str): The API key for authentication.
+            clients (int): Number of virtual clients at the end of the ramp. Defaults to 10.
+            duration (float): Seconds of the test, ramp included. Defaults to 60.
+            ramp (Ramp, optional): How clients are started. Defaults to all at once.
+            flows (Iterable[str]): Flows of the clients among browse, paginate, images, hls and playstate. Defaults to all.
+            user (str, optional): The name or ID of the user browsing. Defaults to the first user.
+            think (float): Mean seconds between two actions of a client, exponentially distributed. Defaults to 1.
+            page_size (int): Number of items per page. Defaults to 50.
+            pages (int): Maximum number of pages scrolled in a view. Defaults to 3.
+            images (int): Number of images requested per page. Defaults to 8.
+            watch (float): Probability to watch a video after browsing. Defaults to 0.3.
+            segments (int): Number of segments watched. Defaults to 5.
+            speed (float): Playback speed, higher plays the segments faster than real time. Defaults to 1.
+            profile (Dict[str, Any], optional): Arguments of the HLS master playlist. Defaults to h264 and aac.
+            progress_interval (float): Seconds between two progress reports of a playback. Defaults to 10.
+            timeout (float): Seconds before a request of a client fails, and to wait for the clients to stop. Defaults to 30.
+            seed (int, optional): Seed of the random choices of the clients.
+
+        Raises:
+            ValueError: If a flow is unknown.
+        """
+        unknown = set(flows) - set(FLOWS)
+        if unknown:
+            raise ValueError(f"Unknown flows {sorted(unknown)}, expected some of: {', '.join(FLOWS)}")
+
+        self.url = url
+        self.api_key = api_key
+        self.clients = clients
+        self.duration = duration
+        self.ramp = ramp or Ramp()
+        self.flows = tuple(flows)
+        self.user = user
+        self.think = think
+        self.page_size = page_size
+        self.pages = pages
+        self.images = images
+        self.watch = watch
+        self.segments = segments
+        self.speed = speed
+        self.profile = profile or {'video_codec': 'h264', 'audio_codec': 'aac'}
+        self.progress_interval = progress_interval
+        self.timeout = timeout
+        self.seed = seed
+
+        self.user_id: uuid.UUID | None = None
+        self.videos: List[BaseModel] = []
+        self.stats = Stats()
+        self.playstate: Playstate | None = None
+
+    def __repr__(self) -> str:
+        return f"<LoadTest url='{self.url}', clients={self.clients}, duration={self.duration}, ramp={self.ramp}, flows={self.flows}>"
+
+    def setup(self, api: Api) -> None:
+        """ Resolves the user and samples the videos watched by the clients, before any measure. """
+        # the generated module is lazy and its attributes can not be resolved by many threads at once
+        for name in ('UserViewsApi', 'ItemsApi', 'ImageApi', 'DynamicHlsApi', 'HlsSegmentApi', 'PlaystateApi'):
+            getattr(api.generated, name)
+
+        if self.user is not None:
+            self.user_id = api.users.resolve(self.user).id
+        else:
+            user = api.users.all.first
+            if user is None:
+                raise ValueError("The server has no user to browse with.")
+            self.user_id = user.id
+
+        if 'hls' in self.flows or 'playstate' in self.flows:
+            search = api.items.search.add('user_id', self.user_id).recursive()
+            search.add('include_item_types', [BaseItemKind.MOVIE, BaseItemKind.EPISODE])
+            self.videos = search.page(0, 200).data
+
+    def run(self, progress: Callable[[Report], None] = None, interval: float = 5.0) -> Report:
+        """
+        Runs the test, starting clients along the ramp until the duration is over.
+
+        Args:
+            progress (Callable, optional): Called with the partial report every `interval` seconds.
+            interval (float): Seconds between two calls of progress. Defaults to 5.
+
+        Returns:
+            Report: The latency percentiles by endpoint.
+        """
+        control = Api(self.url, self.api_key)
+        self.setup(control)
+
+        self.stats = Stats()
+        self.stats.instrument(control)
+        self.playstate = Playstate(control, interval=self.progress_interval, workers=max(4, self.clients // 4))
+        stop = threading.Event()
+        threads: List[threading.Thread] = []
+        started = time.monotonic()
+        reported = started
+
+        try:
+            while (elapsed := time.monotonic() - started) < self.duration:
+                while len(threads) < self.ramp.clients(elapsed, self.clients):
+                    client = VirtualClient(self, len(threads))
+                    thread = threading.Thread(target=client.run, args=(stop,), name=f"loadtest-{client.number}", daemon=True)
+                    thread.start()
+                    threads.append(thread)
+                    self.stats.clients = len(threads)
+                if progress is not None and time.monotonic() - reported >= interval:
+                    reported = time.monotonic()
+                    progress(self.stats.report())
+                stop.wait(0.1)
+        finally:
+            stop.set()
+            # a client ends after its current request, the daemon threads of stuck ones are left behind
+            deadline = time.monotonic() + 2 * self.timeout
+            for thread in threads:
+                thread.join(max(0.0, deadline - time.monotonic()))
+            self.playstate.close()
+        return self.stats.report()
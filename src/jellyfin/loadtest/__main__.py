@@ -0,0 +1,139 @@
+"""
+Module `loadtest.__main__` - Command line of the load test.
+
+Usage:
+    python -m jellyfin.loadtest --url https://jellyfin.example.com --api-key KEY --clients 50 --duration 300 --ramp linear:120
+    python -m jellyfin.loadtest --stand-in --clients 20 --duration 30 --speed 10 --json report.json --max-error-rate 0
+"""
+from __future__ import annotations
+
+import argparse, os, sys
+
+from typing import List
+
+from jellyfin.loadtest import FLOWS, LoadTest, Ramp, Report
+from jellyfin.loadtest.server import StandIn
+
+def _ramp(text: str) -> Ramp:
+    try:
+        return Ramp.parse(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='python -m jellyfin.loadtest',
+        description='Capacity-test a Jellyfin server with virtual clients browsing, paginating, fetching images and watching videos.'
+    )
+    target = parser.add_argument_group('server')
+    target.add_argument('--url', default=os.getenv('URL'), help='base URL of the server, defaults to $URL')
+    target.add_argument('--api-key', default=os.getenv('API_KEY'), help='API key, defaults to $API_KEY')
+    target.add_argument('--user', help='name or ID of the user browsing, defaults to the first user')
+    target.add_argument('--stand-in', action='store_true', help='run against a local stand-in server, e.g. in CI')
+    target.add_argument('--stand-in-items', type=int, default=500, help='movies and episodes of the stand-in (default: %(default)s)')
+    target.add_argument('--stand-in-latency', type=float, default=0.0, help='seconds added to each stand-in response (default: %(default)s)')
+
+    load = parser.add_argument_group('load')
+    load.add_argument('--clients', type=int, default=10, help='virtual clients at the end of the ramp (default: %(default)s)')
+    load.add_argument('--duration', type=float, default=60.0, help='seconds of the test, ramp included (default: %(default)s)')
+    load.add_argument('--ramp', type=_ramp, default=Ramp(), help='constant, linear:<seconds> or step:<clients>:<seconds> (default: constant)')
+    load.add_argument('--flows', default=','.join(FLOWS), help='comma separated flows among %(default)s')
+    load.add_argument('--think', type=float, default=1.0, help='mean seconds between two actions of a client (default: %(default)s)')
+    load.add_argument('--page-size', type=int, default=50, help='items per page (default: %(default)s)')
+    load.add_argument('--pages', type=int, default=3, help='maximum pages scrolled in a view (default: %(default)s)')
+    load.add_argument('--images', type=int, default=8, help='images requested per page (default: %(default)s)')
+    load.add_argument('--watch', type=float, default=0.3, help='probability to watch a video after browsing (default: %(default)s)')
+    load.add_argument('--segments', type=int, default=5, help='segments watched per video (default: %(default)s)')
+    load.add_argument('--speed', type=float, default=1.0, help='playback speed, higher than 1 watches faster than real time (default: %(default)s)')
+    load.add_argument('--progress-interval', type=float, default=10.0, help='seconds between two progress reports (default: %(default)s)')
+    load.add_argument('--timeout', type=float, default=30.0, help='seconds before a request of a client fails (default: %(default)s)')
+    load.add_argument('--seed', type=int, help='seed of the random choices')
+
+    output = parser.add_argument_group('report')
+    output.add_argument('--json', help='write the report as JSON to this path')
+    output.add_argument('--quiet', action='store_true', help='do not print the progress')
+    output.add_argument('--max-error-rate', type=float, help='exit with 1 if the share of failed requests is higher')
+    output.add_argument('--max-p95', type=float, help='exit with 1 if the p95 latency of an endpoint is higher, in ms')
+    return parser
+
+def _failures(report: Report, max_error_rate: float = None, max_p95: float = None) -> List[str]:
+    """ Thresholds not met by the report. """
+    failures = []
+    if max_error_rate is not None and report.error_rate > max_error_rate:
+        failures.append(f"error rate {report.error_rate:.2%} above {max_error_rate:.2%}")
+    if max_p95 is not None:
+        failures += [
+            f"{stats.name} p95 {stats.p95 * 1000:.1f} ms above {max_p95:.1f} ms"
+            for stats in report.endpoints if stats.p95 * 1000 > max_p95
+        ]
+    return failures
+
+def main(argv: List[str] = None) -> int:
+    """
+    Runs the load test from the command line.
+
+    Args:
+        argv (List[str], optional): The arguments. Defaults to the ones of the process.
+
+    Returns:
+        int: The exit status, 1 if a threshold is not met.
+    """
+    parser = _parser()
+    args = parser.parse_args(argv)
+    flows = [flow.strip() for flow in args.flows.split(',') if flow.strip()]
+
+    if not args.stand_in and (not args.url or not args.api_key):
+        parser.error('--url and --api-key (or $URL and $API_KEY) are required without --stand-in')
+
+    try:
+        test = LoadTest(
+            args.url,
+            args.api_key,
+            clients=args.clients,
+            duration=args.duration,
+            ramp=args.ramp,
+            flows=flows,
+            user=args.user,
+            think=args.think,
+            page_size=args.page_size,
+            pages=args.pages,
+            images=args.images,
+            watch=args.watch,
+            segments=args.segments,
+            speed=args.speed,
+            progress_interval=args.progress_interval,
+            timeout=args.timeout,
+            seed=args.seed
+        )
+    except ValueError as e:
+        parser.error(str(e))
+
+    server = None
+    if args.stand_in:
+        server = StandIn(items=args.stand_in_items, latency=args.stand_in_latency).start()
+        test.url, test.api_key = server.url, server.api_key
+
+    progress = None
+    if not args.quiet:
+        progress = lambda report: print(
+            f"{report.seconds:6.1f}s clients={report.clients} requests={report.requests} errors={report.errors}",
+            file=sys.stderr
+        )
+
+    try:
+        report = test.run(progress)
+    finally:
+        if server is not None:
+            server.stop()
+
+    report.print()
+    if args.json:
+        report.json(args.json)
+
+    failures = _failures(report, args.max_error_rate, args.max_p95)
+    for failure in failures:
+        print(f"FAILED: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
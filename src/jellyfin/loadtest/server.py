@@ -0,0 +1,226 @@
+"""
+Module `loadtest.server` - Local stand-in of a Jellyfin server for the load test in CI.
+"""
+from __future__ import annotations
+
+import json, random, re, threading, time, uuid
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+from urllib.parse import parse_qs, urlsplit
+
+# smallest JPEG header, enough for clients sniffing the type
+_JPEG = b'\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00'
+
+class _Server(ThreadingHTTPServer):
+    # many virtual clients connect at once
+    request_queue_size = 1024
+    daemon_threads = True
+
+class StandIn():
+    """ Answers the endpoints used by the virtual clients with generated items,
+    playlists and segments, with a configurable latency, no transcoding involved.
+
+    Usage:
+        with StandIn(items=1000, latency=0.005) as server:
+            LoadTest(server.url, server.api_key, clients=20, duration=30).run()
+    """
+
+    api_key = 'loadtest'
+
+    def __init__(
+            self,
+            items: int = 500,
+            latency: float = 0.0,
+            segment_latency: float = 0.0,
+            segments: int = 20,
+            segment_size: int = 256 * 1024,
+            image_size: int = 16 * 1024,
+            seed: int = 0
+        ):
+        """
+        Args:
+            items (int): Number of movies, and as many episodes. Defaults to 500.
+            latency (float): Seconds added to every response. Defaults to 0.
+            segment_latency (float): Seconds added to every segment, as a transcoder would. Defaults to 0.
+            segments (int): Number of segments of every video. Defaults to 20.
+            segment_size (int): Size of a segment in bytes. Defaults to 256 KiB.
+            image_size (int): Size of an image in bytes. Defaults to 16 KiB.
+            seed (int): Seed of the generated library. Defaults to 0.
+        """
+        self.latency = latency
+        self.segment_latency = segment_latency
+        self.segments = segments
+        self.segment = b'\x47' * segment_size
+        self.image = _JPEG + b'\x00' * max(0, image_size - len(_JPEG))
+        self.requests = 0
+        self._lock = threading.Lock()
+
+        generator = random.Random(seed)
+        identifier = lambda: uuid.UUID(int=generator.getrandbits(128), version=4)
+        self.user = {'Id': identifier().hex, 'Name': 'loadtest', 'Policy': {
+            'IsAdministrator': True,
+            'AuthenticationProviderId': 'Jellyfin.Server.Implementations.Users.DefaultAuthenticationProvider',
+            'PasswordResetProviderId': 'Jellyfin.Server.Implementations.Users.DefaultPasswordResetProvider',
+        }}
+        self.views: List[Dict[str, Any]] = []
+        self.items: List[Dict[str, Any]] = []
+        for name, collection_type, kind in (('Movies', 'movies', 'Movie'), ('Shows', 'tvshows', 'Episode')):
+            view = {'Id': identifier().hex, 'Name': name, 'Type': 'CollectionFolder', 'CollectionType': collection_type, 'IsFolder': True}
+            self.views.append(view)
+            for number in range(items):
+                self.items.append({
+                    'Id': identifier().hex, 'Name': f"{kind} {number}", 'Type': kind, 'MediaType': 'Video',
+                    'ParentId': view['Id'], 'RunTimeTicks': segments * 6 * 10_000_000, 'IsFolder': False,
+                    'ImageTags': {'Primary': f"{generator.getrandbits(64):016x}"}, 'PrimaryImageAspectRatio': 0.6667,
+                })
+        self._server: ThreadingHTTPServer | None = None
+        self._thread: threading.Thread | None = None
+
+    def __repr__(self) -> str:
+        return f"<StandIn url='{self.url if self._server else None}', items={len(self.items)}, requests={self.requests}>"
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _items(self, query: Dict[str, List[str]]) -> Dict[str, Any]:
+        value = lambda key: (query.get(key) or [None])[0]
+        items = self.items
+        if value('ids'):
+            ids = {uuid.UUID(item_id).hex for item_id in ','.join(query['ids']).split(',') if item_id}
+            items = [item for item in self.items + self.views if item['Id'] in ids]
+        if value('parentId'):
+            parent = uuid.UUID(value('parentId')).hex
+            items = [item for item in items if item.get('ParentId') == parent]
+        if value('includeItemTypes'):
+            kinds = set(','.join(query['includeItemTypes']).split(','))
+            items = [item for item in items if item['Type'] in kinds]
+        start = int(value('startIndex') or 0)
+        limit = int(value('limit')) if value('limit') else len(items)
+        return {'Items': items[start:start + limit], 'TotalRecordCount': len(items), 'StartIndex': start}
+
+    def _master(self, query: str) -> str:
+        return (
+            '#EXTM3U\n'
+            '#EXT-X-STREAM-INF:BANDWIDTH=4000000,AVERAGE-BANDWIDTH=3500000,CODECS="avc1.640028,mp4a.40.2",RESOLUTION=1920x1080\n'
+            f"main.m3u8?{query}\n"
+        )
+
+    def _playlist(self, query: str) -> str:
+        lines = ['#EXTM3U', '#EXT-X-PLAYLIST-TYPE:VOD', '#EXT-X-VERSION:3', '#EXT-X-TARGETDURATION:6', '#EXT-X-MEDIA-SEQUENCE:0']
+        for index in range(self.segments):
+            lines += ['#EXTINF:6.000000, nodesc', f"hls1/main/{index}.ts?runtimeTicks={index * 60_000_000}&{query}"]
+        lines.append('#EXT-X-ENDLIST')
+        return '\n'.join(lines) + '\n'
+
+    def _handler(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+            def _send(self, code: int, body: bytes = b'', content_type: str = 'application/json') -> None:
+                self.send_response(code)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _json(self, value: Any) -> None:
+                self._send(200, json.dumps(value).encode())
+
+            def _authorized(self) -> bool:
+                with server._lock:
+                    server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                header = self.headers.get('Authorization', '')
+                query = parse_qs(urlsplit(self.path).query)
+                if f'Token="{server.api_key}"' in header or query.get('api_key') == [server.api_key]:
+                    return True
+                if '/Images/' in self.path or self.path.startswith('/System/Info/Public'):
+                    return True
+                self._send(401)
+                return False
+
+            def do_GET(self) -> None:
+                if not self._authorized():
+                    return
+                parts = urlsplit(self.path)
+                path, query = parts.path, parse_qs(parts.query)
+
+                if path == '/System/Info/Public':
+                    return self._json({'ServerName': 'stand-in', 'Version': '10.10.7', 'Id': server.user['Id']})
+                if path == '/Users':
+                    return self._json([server.user])
+                if path == '/UserViews':
+                    return self._json({'Items': server.views, 'TotalRecordCount': len(server.views), 'StartIndex': 0})
+                if path == '/Items':
+                    return self._json(server._items(query))
+                if re.fullmatch(r'/Items/[^/]+/Images/\w+(/\d+)?', path):
+                    return self._send(200, server.image, 'image/jpeg')
+
+                match = re.fullmatch(r'/Videos/[^/]+/(master|main)\.m3u8', path, re.IGNORECASE)
+                if match:
+                    if match.group(1).lower() == 'master':
+                        body = server._master(parts.query)
+                    else:
+                        body = server._playlist(parts.query)
+                    return self._send(200, body.encode(), 'application/vnd.apple.mpegurl')
+                if re.fullmatch(r'/Videos/[^/]+/hls1/main/\d+\.ts', path, re.IGNORECASE):
+                    if server.segment_latency:
+                        time.sleep(server.segment_latency)
+                    return self._send(200, server.segment, 'video/mp2t')
+                self._send(404)
+
+            def do_POST(self) -> None:
+                self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                if not self._authorized():
+                    return
+                if urlsplit(self.path).path in ('/Sessions/Playing', '/Sessions/Playing/Progress', '/Sessions/Playing/Stopped'):
+                    return self._send(204)
+                self._send(404)
+
+            def do_DELETE(self) -> None:
+                if not self._authorized():
+                    return
+                if urlsplit(self.path).path == '/Videos/ActiveEncodings':
+                    return self._send(204)
+                self._send(404)
+
+        return Handler
+
+    def start(self, host: str = '127.0.0.1', port: int = 0) -> StandIn:
+        """
+        Starts serving in a background thread.
+
+        Args:
+            host (str): The interface to listen on. Defaults to localhost.
+            port (int): The port to listen on. Defaults to any free one.
+
+        Returns:
+            StandIn: The current instance, with its url.
+        """
+        self._server = _Server((host, port), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, name='jellyfin-standin', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """ Stops serving. """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
@@ -0,0 +1,325 @@
+"""
+Module `mirror` - Local incremental copy of the library backed by SQLite.
+"""
+from __future__ import annotations
+
+import json, sqlite3
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from typing import Any, Dict, Iterator, List
+from uuid import UUID
+
+from jellyfin.items import Item, ItemCollection, ItemSearch
+from jellyfin.generated import ItemFields, ItemSortBy
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id TEXT PRIMARY KEY,
+    type TEXT,
+    name TEXT,
+    sort_name TEXT,
+    parent_id TEXT,
+    series_id TEXT,
+    season_id TEXT,
+    album_id TEXT,
+    production_year INTEGER,
+    premiere_date TEXT,
+    date_created TEXT,
+    is_folder INTEGER,
+    path TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_type ON items (type);
+CREATE INDEX IF NOT EXISTS items_sort_name ON items (sort_name);
+CREATE INDEX IF NOT EXISTS items_parent_id ON items (parent_id);
+CREATE INDEX IF NOT EXISTS items_series_id ON items (series_id);
+CREATE INDEX IF NOT EXISTS items_season_id ON items (season_id);
+CREATE INDEX IF NOT EXISTS items_album_id ON items (album_id);
+CREATE INDEX IF NOT EXISTS items_production_year ON items (production_year);
+CREATE INDEX IF NOT EXISTS items_date_created ON items (date_created);
+CREATE INDEX IF NOT EXISTS items_path ON items (path);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# indexed column -> key in the server JSON
+_COLUMNS = {
+    'id': 'Id',
+    'type': 'Type',
+    'name': 'Name',
+    'sort_name': 'SortName',
+    'parent_id': 'ParentId',
+    'series_id': 'SeriesId',
+    'season_id': 'SeasonId',
+    'album_id': 'AlbumId',
+    'production_year': 'ProductionYear',
+    'premiere_date': 'PremiereDate',
+    'date_created': 'DateCreated',
+    'is_folder': 'IsFolder',
+    'path': 'Path',
+}
+_IDS = ('id', 'parent_id', 'series_id', 'season_id', 'album_id')
+
+def _column(column: str, value: Any) -> Any:
+    """ Normalizes a value to the form stored in the column. """
+    if isinstance(value, Enum):
+        value = value.value
+    if column in _IDS and value is not None:
+        value = UUID(str(value)).hex
+    return value
+
+class LibraryMirror():
+    """ Keep a local copy of all items, synchronizing only what changed.
+
+    The first sync fetches all items concurrently, the next ones only the
+    items saved since the last sync. Deleted items are found comparing the
+    set of IDs of the server with the local one from time to time.
+
+    Usage:
+        mirror = LibraryMirror(api, 'library.db')
+        mirror.sync()
+        mirror.find(type=BaseItemKind.MOVIE, production_year=1999)
+    """
+
+    def __init__(
+            self,
+            api: Api,
+            path: str,
+            fields: List[ItemFields] = None,
+            page_size: int = 1000,
+            workers: int = 4,
+            reconcile_every: timedelta = timedelta(days=1),
+            overlap: timedelta = timedelta(minutes=5)
+        ):
+        """
+        Initializes the library mirror.
+
+        Args:
+            api (Api): An instance of the Api class.
+            path (str): Path of the SQLite database, created if not exists.
+            fields (List[ItemFields], optional): Extra fields stored for each item.
+            page_size (int): Number of items per request. Defaults to 1000.
+            workers (int): Number of concurrent requests of a full fetch. Defaults to 4.
+            reconcile_every (timedelta): Interval between ID-set comparisons. Defaults to one day.
+            overlap (timedelta): Margin applied to the last sync date to absorb clock skew. Defaults to 5 minutes.
+        """
+        self.api = api
+        self.path = path
+        self.page_size = page_size
+        self.workers = workers
+        self.reconcile_every = reconcile_every
+        self.overlap = overlap
+        self.fields = [
+            ItemFields.PARENTID,
+            ItemFields.SORTNAME,
+            ItemFields.DATECREATED,
+            ItemFields.PATH,
+            ItemFields.PROVIDERIDS,
+        ]
+        self.fields += [field for field in fields or [] if field not in self.fields]
+
+        self.db = sqlite3.connect(path)
+        self.db.executescript(_SCHEMA)
+
+    def __repr__(self) -> str:
+        return f"<LibraryMirror path='{self.path}', items={len(self)}, last_sync={self._meta('last_sync')}>"
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def close(self):
+        """ Close the database connection. """
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _meta(self, key: str) -> datetime | None:
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return datetime.fromisoformat(row[0]) if row else None
+
+    def _set_meta(self, key: str, value: datetime):
+        self.db.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            (key, value.isoformat())
+        )
+
+    def _search(self) -> ItemSearch:
+        search = self.api.items.search.recursive().add('fields', self.fields)
+        search.add('enable_total_record_count', True)
+        if self.api.user is not None:
+            search.add('user_id', self.api.user.id)
+        return search
+
+    def _pages(self, search: ItemSearch) -> Iterator[List[dict]]:
+        """ Fetch all pages of a search, the pages after the first one concurrently. """
+        search.add('sort_by', [ItemSortBy.DATECREATED, ItemSortBy.SORTNAME])
+        first = search.add('start_index', 0).add('limit', self.page_size).raw
+        yield first.get('Items') or []
+
+        def fetch(start: int) -> List[dict]:
+            shard = self.api.items.search
+            shard._params = dict(search._params, start_index=start)
+            return shard.raw.get('Items') or []
+
+        total = first.get('TotalRecordCount') or 0
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            yield from executor.map(fetch, range(self.page_size, total, self.page_size))
+
+    def _changed(self, search: ItemSearch) -> Iterator[List[dict]]:
+        """ Fetch pages one after another until a partial one, for small incremental results. """
+        search.add('start_index', 0).add('limit', self.page_size).add('enable_total_record_count', False)
+        while True:
+            items = search.raw.get('Items') or []
+            if items:
+                yield items
+            if len(items) < self.page_size:
+                break
+            search.add('start_index', search.start_index + self.page_size)
+
+    def _store(self, items: List[dict]) -> int:
+        rows = [
+            tuple(_column(column, item.get(key)) for column, key in _COLUMNS.items()) + (json.dumps(item),)
+            for item in items
+        ]
+        with self.db:
+            self.db.executemany(
+                f"INSERT OR REPLACE INTO items ({', '.join(_COLUMNS)}, data) "
+                f"VALUES ({', '.join('?' * (len(_COLUMNS) + 1))})",
+                rows
+            )
+        return len(rows)
+
+    def sync(self, reconcile: bool = None) -> Dict[str, int]:
+        """
+        Synchronize the local copy with the server.
+
+        The first call fetches all items, the next ones only the items saved
+        since the previous sync.
+
+        Args:
+            reconcile (bool, optional): Force (True) or skip (False) the ID-set comparison. By default runs every `reconcile_every`.
+
+        Returns:
+            Dict[str, int]: Number of items `updated`, `added` and `deleted`.
+        """
+        started = datetime.now(timezone.utc)
+        last_sync = self._meta('last_sync')
+        stats = {'updated': 0, 'added': 0, 'deleted': 0}
+
+        if last_sync is None:
+            for items in self._pages(self._search()):
+                stats['updated'] += self._store(items)
+            self._set_meta('last_reconcile', started)
+        else:
+            since = last_sync - self.overlap
+            for items in self._changed(self._search().add('min_date_last_saved', since)):
+                stats['updated'] += self._store(items)
+
+            if self.api.user is not None:
+                search = self._search().add('min_date_last_saved_for_user', since)
+                for items in self._changed(search.add('enable_user_data', True)):
+                    stats['updated'] += self._store(items)
+
+            last_reconcile = self._meta('last_reconcile') or last_sync
+            if reconcile or (reconcile is None and started - last_reconcile >= self.reconcile_every):
+                stats.update(self.reconcile())
+
+        with self.db:
+            self._set_meta('last_sync', started)
+        return stats
+
+    def reconcile(self) -> Dict[str, int]:
+        """
+        Compare the IDs of the server with the local ones, removing deleted
+        items and fetching items missing locally.
+
+        Returns:
+            Dict[str, int]: Number of items `added` and `deleted`.
+        """
+        started = datetime.now(timezone.utc)
+        # same scope as the synced items, only the IDs are needed
+        search = self._search().remove('fields')
+        search.add('enable_images', False).add('enable_user_data', False)
+
+        remote = set()
+        for items in self._pages(search):
+            remote.update(item['Id'] for item in items)
+
+        local = {row[0] for row in self.db.execute("SELECT id FROM items")}
+        deleted = local - remote
+        with self.db:
+            self.db.executemany("DELETE FROM items WHERE id = ?", ((item_id,) for item_id in deleted))
+
+        added = 0
+        missing = remote - local
+        if missing:
+            filters = {'user_id': self.api.user.id} if self.api.user is not None else {}
+            found = self.api.items.by_ids(missing, workers=self.workers, fields=self.fields, **filters)
+            added = self._store([
+                item.model.model_dump(mode='json', by_alias=True, exclude_none=True)
+                for item in found
+            ])
+
+        with self.db:
+            self._set_meta('last_reconcile', started)
+        return {'added': added, 'deleted': len(deleted)}
+
+    def get(self, item_id: str | UUID) -> Item | None:
+        """
+        Returns a local item by its ID.
+
+        Args:
+            item_id (str | UUID): The ID of the item.
+
+        Returns:
+            Item | None: The item if found, otherwise None.
+        """
+        found = self.find(id=item_id)
+        return found.first
+
+    def find(self, limit: int = None, name_starts_with: str = None, **filters: Any) -> ItemCollection:
+        """
+        Search the local items using the indexed columns.
+
+        Args:
+            limit (int, optional): Maximum number of items to return.
+            name_starts_with (str, optional): Filter by the start of the sort name.
+            **filters: Equality filters by column: id, type, name, sort_name, parent_id, series_id,
+                season_id, album_id, production_year, premiere_date, date_created, is_folder or path.
+
+        Raises:
+            ValueError: If a filter is not an indexed column.
+
+        Returns:
+            ItemCollection: The items found ordered by sort name.
+        """
+        where, params = [], []
+        for column, value in filters.items():
+            if column not in _COLUMNS:
+                raise ValueError(f"Not an indexed column: {column}. Available: {list(_COLUMNS)}")
+            where.append(f"{column} = ?")
+            params.append(_column(column, value))
+
+        if name_starts_with is not None:
+            where.append("sort_name LIKE ? ESCAPE '\\'")
+            escaped = name_starts_with.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            params.append(f"{escaped}%")
+
+        query = "SELECT data FROM items"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY sort_name"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        model = self.api.generated.BaseItemDto
+        return ItemCollection([model.from_json(row[0]) for row in self.db.execute(query, params)])
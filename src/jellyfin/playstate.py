@@ -0,0 +1,355 @@
+"""
+Module `playstate` - Throttled and coalesced playback reporting of many sessions.
+"""
+from __future__ import annotations
+
+import heapq, itertools, re, threading, time, uuid
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+from pydantic import BaseModel
+
+from jellyfin.items import Item, _item_id
+from jellyfin.generated import ApiException
+
+# serializer of the endpoint, its body argument and the model of the body, by event
+_EVENTS = {
+    'start': ('_report_playback_start_serialize', 'playback_start_info', 'PlaybackStartInfo'),
+    'progress': ('_report_playback_progress_serialize', 'playback_progress_info', 'PlaybackProgressInfo'),
+    'stop': ('_report_playback_stopped_serialize', 'playback_stop_info', 'PlaybackStopInfo'),
+}
+
+class PlaybackSession():
+    """ Playback of an item reported by Playstate: start and stop are sent at once,
+    progress updates are kept in memory and only the latest one is sent at the cadence.
+
+    Usage:
+        session = api.playstate.session(item).start(play_method=PlayMethod.DIRECTPLAY)
+        session.update(position_ticks=120 * 10_000_000)
+        session.update(is_paused=True, immediate=True)
+        session.stop(position_ticks=300 * 10_000_000)
+    """
+
+    def __init__(self, playstate: Playstate, state: Dict[str, Any], auth: Dict[str, str] | None):
+        self.playstate = playstate
+        self.state = state
+        self.started = False
+        self.stopped = False
+        self.sent = 0
+        self.coalesced = 0
+        self.error: Exception | None = None
+        self._auth = auth
+        self._queue: deque = deque()
+        self._running = False
+        self._dirty = False
+        self._scheduled = False
+        self._last = 0.0
+
+    @property
+    def play_session_id(self) -> str:
+        return self.state['play_session_id']
+
+    def __repr__(self) -> str:
+        status = 'stopped' if self.stopped else 'started' if self.started else 'new'
+        return (
+            f"<PlaybackSession {self.play_session_id} {status}, position={self.state.get('position_ticks')}, "
+            f"sent={self.sent}, coalesced={self.coalesced}>"
+        )
+
+    def start(self, **fields: Any) -> PlaybackSession:
+        """
+        Reports the start of the playback at once.
+
+        Args:
+            **fields: Any field of PlaybackStartInfo, e.g. play_method or position_ticks.
+
+        Raises:
+            ValueError: If the session already started or a field is unknown.
+
+        Returns:
+            PlaybackSession: The current instance (for chaining).
+        """
+        with self.playstate._condition:
+            if self.started:
+                raise ValueError(f"Playback session {self.play_session_id} already started.")
+            self._set(fields)
+            self.started = True
+            self._last = time.monotonic()
+            self.playstate._enqueue(self, 'start')
+        return self
+
+    def update(self, immediate: bool = False, **fields: Any) -> None:
+        """
+        Updates the progress, sent with the next report of the session.
+
+        Args:
+            immediate (bool): Send the report now, e.g. on pause or seek. Defaults to False.
+            **fields: Any field of PlaybackProgressInfo, e.g. position_ticks or is_paused.
+
+        Raises:
+            ValueError: If the session is not playing or a field is unknown.
+        """
+        with self.playstate._condition:
+            if not self.started or self.stopped:
+                raise ValueError(f"Playback session {self.play_session_id} is not playing.")
+            self._set(fields)
+            if self._dirty:
+                self.coalesced += 1
+                self.playstate.coalesced += 1
+            self._dirty = True
+            if immediate:
+                if 'progress' not in self._queue:
+                    self.playstate._enqueue(self, 'progress')
+            elif not self._scheduled:
+                self.playstate._schedule(self, self._last + self.playstate.interval)
+
+    def stop(self, **fields: Any) -> None:
+        """
+        Reports the end of the playback at once, pending progress is dropped.
+
+        Args:
+            **fields: Any field of PlaybackStopInfo, e.g. position_ticks or failed.
+
+        Raises:
+            ValueError: If the session is not playing or a field is unknown.
+        """
+        with self.playstate._condition:
+            if not self.started or self.stopped:
+                raise ValueError(f"Playback session {self.play_session_id} is not playing.")
+            self._set(fields)
+            self.stopped = True
+            self._dirty = False
+            if 'progress' in self._queue:
+                self._queue.remove('progress')
+            self.playstate._enqueue(self, 'stop')
+
+    def _set(self, fields: Dict[str, Any]) -> None:
+        unknown = set(fields) - self.playstate._names
+        if unknown:
+            raise ValueError(f"Unknown playback fields: {sorted(unknown)}")
+        self.state.update(fields)
+
+class Playstate():
+    """ Playback reports of many sessions sent by a shared pool of threads.
+
+    Requests are built from plain dicts with the serializers of PlaystateApi,
+    without validating a model per report, and a single scheduler thread
+    wakes up when the next session is due.
+
+    Usage:
+        playstate = Playstate(api, interval=10, workers=32)
+        sessions = [playstate.session(item, device_id=f"kiosk-{n}").start() for n, item in enumerate(items)]
+        sessions[0].update(position_ticks=ticks)
+        playstate.close()
+    """
+
+    def __init__(self, api: Api, interval: float = 10.0, workers: int = 16):
+        """
+        Initializes the reporter, its threads start with the first session.
+
+        Args:
+            api (Api): An instance of the Api class.
+            interval (float): Minimum seconds between two progress reports of a session. Defaults to 10.
+            workers (int): Number of concurrent requests shared by all sessions. Defaults to 16.
+        """
+        self.api = api
+        self.interval = interval
+        self.workers = workers
+        self.playstate_api = api.generated.PlaystateApi(api.client)
+        self._client = self.playstate_api.api_client
+        self.sessions: Dict[str, PlaybackSession] = {}
+        self.sent = 0
+        self.coalesced = 0
+        self.errors: Dict[str, Exception] = {}
+
+        self._fields: Dict[str, Dict[str, str]] = {
+            event: {name: field.alias for name, field in getattr(api.generated, model).model_fields.items()}
+            for event, (_, _, model) in _EVENTS.items()
+        }
+        self._names = set().union(*self._fields.values())
+        self._heap: List[Tuple[float, int, PlaybackSession]] = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._active = 0
+        self._closed = False
+        self._executor = None
+        self._thread = None
+
+    def __repr__(self) -> str:
+        return (
+            f"<Playstate sessions={len(self.sessions)}, interval={self.interval}s, "
+            f"sent={self.sent}, coalesced={self.coalesced}, errors={len(self.errors)}>"
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _authorization(self, device_id: str, device_name: str = None) -> Dict[str, str]:
+        """ Auth setting of the API with its own device, the server tells sessions apart by device. """
+        setting = dict(self._client.configuration.auth_settings()['CustomAuthentication'])
+        fields = dict(re.findall(r'(\w+)="([^"]*)"', setting['value']))
+        fields.setdefault('Client', 'jellyfin-sdk')
+        fields['Device'] = device_name or fields.get('Device', device_id)
+        fields['DeviceId'] = device_id
+        fields.setdefault('Version', '1.0')
+        setting['value'] = 'MediaBrowser ' + ', '.join(f'{key}="{value}"' for key, value in fields.items())
+        return setting
+
+    def session(
+            self,
+            item: Item | BaseModel | str | uuid.UUID,
+            play_session_id: str = None,
+            media_source_id: str = None,
+            device_id: str = None,
+            device_name: str = None,
+            **fields: Any
+        ) -> PlaybackSession:
+        """
+        Creates the playback session of an item, nothing is sent until it starts.
+
+        Args:
+            item (Item | BaseItemDto | str | uuid.UUID): The item played.
+            play_session_id (str, optional): The play session, e.g. from PlaybackInfo. Defaults to a random one.
+            media_source_id (str, optional): The media source. Defaults to the one of the item.
+            device_id (str, optional): Report as another device, one per simulated client. Defaults to the one of the API.
+            device_name (str, optional): The name of that device. Defaults to the one of the API, or the device ID.
+            **fields: Any other field of the reports, e.g. can_seek or play_method.
+
+        Raises:
+            ValueError: If a field is unknown.
+
+        Returns:
+            PlaybackSession: The session, to start, update and stop.
+        """
+        item_id = _item_id(item.id if isinstance(item, (Item, BaseModel)) else item)
+        state = {
+            'item_id': str(uuid.UUID(item_id)),
+            'media_source_id': media_source_id or item_id,
+            'play_session_id': play_session_id or uuid.uuid4().hex,
+        }
+        auth = self._authorization(device_id, device_name) if device_id is not None else None
+        session = PlaybackSession(self, state, auth)
+        session._set(fields)
+
+        with self._condition:
+            if self._closed:
+                raise ValueError("Playstate is closed.")
+            self.sessions[session.play_session_id] = session
+            if self._thread is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='jellyfin-playstate')
+                self._thread = threading.Thread(target=self._run, name='jellyfin-playstate', daemon=True)
+                self._thread.start()
+        return session
+
+    def _schedule(self, session: PlaybackSession, due: float) -> None:
+        """ Queues the next progress report of a session, the lock is held. """
+        session._scheduled = True
+        heapq.heappush(self._heap, (due, next(self._counter), session))
+        if self._heap[0][2] is session:
+            self._condition.notify_all()
+
+    def _enqueue(self, session: PlaybackSession, event: str) -> None:
+        """ Queues a report, sent in order by one worker at a time per session, the lock is held. """
+        session._queue.append(event)
+        if not session._running:
+            session._running = True
+            self._active += 1
+            self._executor.submit(self._drain, session)
+
+    def _run(self) -> None:
+        """ Hands the progress of the sessions due to the workers. """
+        with self._condition:
+            while not self._closed:
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                due, _, session = self._heap[0]
+                delay = due - time.monotonic()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                heapq.heappop(self._heap)
+                session._scheduled = False
+                if not session._dirty or session.stopped or 'progress' in session._queue:
+                    continue
+                if session._last + self.interval > time.monotonic():
+                    # a report was sent since, e.g. an immediate one
+                    self._schedule(session, session._last + self.interval)
+                    continue
+                self._enqueue(session, 'progress')
+
+    def _drain(self, session: PlaybackSession) -> None:
+        while True:
+            with self._condition:
+                if not session._queue:
+                    session._running = False
+                    self._active -= 1
+                    if session.stopped:
+                        self.sessions.pop(session.play_session_id, None)
+                    self._condition.notify_all()
+                    return
+                event = session._queue.popleft()
+                if event == 'progress':
+                    session._dirty = False
+                    session._last = time.monotonic()
+                fields = self._fields[event]
+                body = {fields[name]: value for name, value in session.state.items() if name in fields and value is not None}
+            try:
+                self._post(event, body, session._auth)
+                with self._condition:
+                    session.sent += 1
+                    self.sent += 1
+            except Exception as e:
+                with self._condition:
+                    session.error = e
+                    self.errors[session.play_session_id] = e
+
+    def _post(self, event: str, body: Dict[str, Any], auth: Dict[str, str] | None) -> None:
+        serializer, argument, _ = _EVENTS[event]
+        client = self._client
+        params = getattr(self.playstate_api, serializer)(**{
+            argument: client.sanitize_for_serialization(body),
+            '_request_auth': auth,
+            '_content_type': None,
+            '_headers': None,
+            '_host_index': 0
+        })
+        response = client.call_api(*params)
+        response.read()
+        if not 200 <= response.status <= 299:
+            raise ApiException(status=response.status, reason=response.reason)
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Sends the pending progress of every session now and waits for all reports.
+
+        Args:
+            timeout (float, optional): Seconds to wait at most. Defaults to no limit.
+
+        Returns:
+            bool: False if reports were still pending after the timeout.
+        """
+        with self._condition:
+            for session in list(self.sessions.values()):
+                if session._dirty and not session.stopped and 'progress' not in session._queue:
+                    self._enqueue(session, 'progress')
+            return self._condition.wait_for(lambda: self._active == 0, timeout)
+
+    def close(self, timeout: float = None) -> None:
+        """
+        Flushes the reports and stops the threads, sessions still playing are not stopped.
+
+        Args:
+            timeout (float, optional): Seconds to wait for the pending reports. Defaults to no limit.
+        """
+        self.flush(timeout)
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._executor.shutdown(wait=False)
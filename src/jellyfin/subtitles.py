@@ -0,0 +1,324 @@
+"""
+Module `subtitles` - Bulk subtitle and lyrics downloads cached by item etag.
+"""
+from __future__ import annotations
+
+import json, os, string, threading, time, uuid
+
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Tuple
+from pydantic import BaseModel
+
+from jellyfin.items import Item, _item_id
+from jellyfin.generated import ApiException, ItemFields
+
+def _model(item: Item | BaseModel) -> BaseModel:
+    return item.model if isinstance(item, Item) else item
+
+def _stale(directory: str, etag: str) -> None:
+    """ Removes the files of the previous versions of an item, named `<etag>.*` with another etag. """
+    for name in os.listdir(directory):
+        if name.endswith('.part') or '.' not in name:
+            continue
+        previous = name.split('.', 1)[0]
+        if previous != etag and (previous == 'none' or previous and all(c in string.hexdigits for c in previous)):
+            os.remove(os.path.join(directory, name))
+
+def _write(response, path: str, chunk_size: int) -> int:
+    """ Writes a response to a partial file renamed when complete, returns the size. """
+    read = False
+    try:
+        if not 200 <= response.status <= 299:
+            body = response.read().decode('utf-8', 'replace')
+            read = True
+            raise ApiException(status=response.status, reason=response.reason, body=body)
+        size = 0
+        with open(f"{path}.part", 'wb') as file:
+            for chunk in response.stream(chunk_size):
+                file.write(chunk)
+                size += len(chunk)
+        read = True
+        os.replace(f"{path}.part", path)
+        return size
+    finally:
+        # a connection with unread data can not be reused
+        if read:
+            response.release_conn()
+        else:
+            response.close()
+
+class TextDownloads():
+    """ Result of Subtitles.fetch_many and Lyrics.fetch_many, with the throughput of the downloads. """
+
+    def __init__(self):
+        self.paths: Dict[str, List[str]] = {}
+        self.downloaded = 0
+        self.skipped = 0
+        self.missing: List[str] = []
+        self.errors: Dict[str, Exception] = {}
+        self.bytes = 0
+        self.seconds = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """ Returns the bytes downloaded per second. """
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+    @property
+    def rate(self) -> float:
+        """ Returns the files downloaded per second. """
+        return self.downloaded / self.seconds if self.seconds else 0.0
+
+    def __repr__(self) -> str:
+        return (
+            f"<TextDownloads downloaded={self.downloaded}, skipped={self.skipped}, "
+            f"missing={len(self.missing)}, errors={len(self.errors)}, "
+            f"{self.throughput / 1024:.1f} KiB/s, {self.rate:.1f} files/s>"
+        )
+
+class _TextCache(ABC):
+    """ Files of many items downloaded concurrently to `<dest>/<item id>/<etag>.<name>`.
+
+    The etag changes when the item changes, so files of unchanged items are
+    found on disk without any request, and those of previous etags removed.
+    """
+
+    fields: Tuple[ItemFields, ...] = (ItemFields.ETAG,)
+
+    def __init__(self, api: Api):
+        self.api = api
+
+    def _complete(self, model: BaseModel) -> bool:
+        """ Whether the item carries what is needed to list its files. """
+        return model.etag is not None
+
+    @abstractmethod
+    def _files(self, model: BaseModel, formats: List[str]) -> List[Tuple[str, Callable]]:
+        """ Names of the files of an item, after its etag, with the request of each. """
+
+    def _fetch_many(
+            self,
+            items: Iterable[Item | BaseModel | str | uuid.UUID],
+            formats: List[str],
+            dest: str,
+            workers: int,
+            chunk_size: int,
+            progress: Callable[[TextDownloads], None] | None
+        ) -> TextDownloads:
+        models: Dict[str, BaseModel | None] = {}
+        for item in items:
+            if isinstance(item, (Item, BaseModel)):
+                model = _model(item)
+                models[model.id.hex] = model if self._complete(model) else None
+            else:
+                models[_item_id(item)] = None
+
+        incomplete = [item_id for item_id, model in models.items() if model is None]
+        if incomplete:
+            found = self.api.items.by_ids(incomplete, workers=workers, fields=list(self.fields))
+            for item_id in incomplete:
+                models[item_id] = _model(found[item_id]) if item_id in found else None
+
+        result = TextDownloads()
+        result.missing = [item_id for item_id, model in models.items() if model is None]
+        lock = threading.Lock()
+        started = time.monotonic()
+
+        def fetch(model: BaseModel) -> None:
+            item_id = model.id.hex
+            try:
+                files = self._files(model, formats)
+                if not files:
+                    with lock:
+                        result.missing.append(item_id)
+                    return
+
+                directory = os.path.join(dest, item_id)
+                os.makedirs(directory, exist_ok=True)
+                etag = model.etag or 'none'
+                _stale(directory, etag)
+
+                paths = []
+                for name, request in files:
+                    path = os.path.join(directory, f"{etag}.{name}")
+                    if os.path.exists(path):
+                        with lock:
+                            result.skipped += 1
+                        paths.append(path)
+                        continue
+                    try:
+                        size = _write(request(), path, chunk_size)
+                    except ApiException as e:
+                        if e.status != 404:
+                            raise
+                        continue
+                    with lock:
+                        result.downloaded += 1
+                        result.bytes += size
+                    paths.append(path)
+                with lock:
+                    if paths:
+                        result.paths[item_id] = paths
+                    else:
+                        result.missing.append(item_id)
+            except Exception as e:
+                with lock:
+                    result.errors[item_id] = e
+            finally:
+                result.seconds = time.monotonic() - started
+                if progress is not None:
+                    progress(result)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(fetch, [model for model in models.values() if model is not None]))
+
+        result.seconds = time.monotonic() - started
+        return result
+
+class Subtitles(_TextCache):
+    """ Text subtitle streams of many items, downloaded concurrently and cached by item etag.
+
+    Usage:
+        search = api.items.search.recursive().paginate(500).add('fields', [ItemFields.MEDIASOURCES, ItemFields.ETAG])
+        api.subtitles.fetch_many(search.all, formats=['vtt', 'srt'], dest='subtitles', workers=16)
+    """
+
+    fields = (ItemFields.ETAG, ItemFields.MEDIASOURCES)
+
+    def __init__(self, api: Api):
+        """
+        Initializes the Subtitle API wrapper.
+
+        Args:
+            api (Api): An instance of the Api class.
+        """
+        super().__init__(api)
+        self.subtitle_api = api.generated.SubtitleApi(api.client)
+
+    def _complete(self, model: BaseModel) -> bool:
+        return model.etag is not None and (model.media_sources is not None or model.media_streams is not None)
+
+    def streams(self, item: Item | BaseModel) -> List[Tuple[str, BaseModel]]:
+        """
+        Returns the text subtitle streams of an item.
+
+        Args:
+            item (Item | BaseItemDto): The item, with its MediaSources or MediaStreams.
+
+        Returns:
+            List[Tuple[str, MediaStream]]: The media source ID and the stream, for each stream.
+        """
+        model = _model(item)
+        if model.media_sources:
+            sources = [(source.id or model.id.hex, source.media_streams or []) for source in model.media_sources]
+        else:
+            sources = [(model.id.hex, model.media_streams or [])]
+        return [
+            (source_id, stream)
+            for source_id, streams in sources for stream in streams
+            if stream.is_text_subtitle_stream and stream.index is not None
+        ]
+
+    def _files(self, model: BaseModel, formats: List[str]) -> List[Tuple[str, Callable]]:
+        files = []
+        for source_id, stream in self.streams(model):
+            for format in formats:
+                request = lambda source_id=source_id, index=stream.index, format=format: (
+                    self.subtitle_api.get_subtitle_without_preload_content(model.id, source_id, index, format)
+                )
+                files.append((f"{source_id}.{stream.index}.{format}", request))
+        return files
+
+    def fetch_many(
+            self,
+            items: Iterable[Item | BaseModel | str | uuid.UUID],
+            formats: List[str] = ('vtt',),
+            dest: str = 'subtitles',
+            workers: int = 8,
+            chunk_size: int = 64 * 1024,
+            progress: Callable[[TextDownloads], None] = None
+        ) -> TextDownloads:
+        """
+        Downloads every text subtitle stream of many items concurrently, in each format.
+
+        Files are named `<dest>/<item id>/<etag>.<media source>.<stream index>.<format>`,
+        the etag changes when the item changes, so subtitles already downloaded are
+        skipped without any request. Items without their MediaSources or Etag field
+        are fetched again in a few requests.
+
+        Args:
+            items (Iterable[Item | BaseItemDto | str | uuid.UUID]): The items, best with their MediaSources and Etag fields.
+            formats (List[str]): The formats converted by the server, e.g. vtt, srt or ass. Defaults to vtt.
+            dest (str): The directory of the cache. Defaults to `subtitles`.
+            workers (int): Number of concurrent requests. Defaults to 8.
+            chunk_size (int): Size of the chunks written to disk. Defaults to 64 KiB.
+            progress (Callable, optional): Called with the partial result after each item.
+
+        Returns:
+            TextDownloads: The paths by item ID (hex), items without text subtitles in `missing`, errors and throughput.
+        """
+        return self._fetch_many(items, list(formats), dest, workers, chunk_size, progress)
+
+class Lyrics(_TextCache):
+    """ Lyrics of many items, downloaded concurrently and cached by item etag.
+
+    Usage:
+        search = api.items.search.recursive().paginate(500).add('include_item_types', [BaseItemKind.AUDIO])
+        result = api.lyrics.fetch_many(search.add('fields', [ItemFields.ETAG]).all, dest='lyrics')
+        api.lyrics.load(result.paths[item.id.hex][0])
+    """
+
+    def __init__(self, api: Api):
+        """
+        Initializes the Lyrics API wrapper.
+
+        Args:
+            api (Api): An instance of the Api class.
+        """
+        super().__init__(api)
+        self.lyrics_api = api.generated.LyricsApi(api.client)
+
+    def _files(self, model: BaseModel, formats: List[str]) -> List[Tuple[str, Callable]]:
+        if model.has_lyrics is False:
+            return []
+        return [('lyrics.json', lambda: self.lyrics_api.get_lyrics_without_preload_content(model.id))]
+
+    def fetch_many(
+            self,
+            items: Iterable[Item | BaseModel | str | uuid.UUID],
+            dest: str = 'lyrics',
+            workers: int = 8,
+            chunk_size: int = 64 * 1024,
+            progress: Callable[[TextDownloads], None] = None
+        ) -> TextDownloads:
+        """
+        Downloads the lyrics of many items concurrently, as returned by the server in JSON.
+
+        Files are named `<dest>/<item id>/<etag>.lyrics.json`, see Subtitles.fetch_many.
+        Items known to have no lyrics, or not found by the server, are in `missing`.
+
+        Args:
+            items (Iterable[Item | BaseItemDto | str | uuid.UUID]): The items, best with their Etag field.
+            dest (str): The directory of the cache. Defaults to `lyrics`.
+            workers (int): Number of concurrent requests. Defaults to 8.
+            chunk_size (int): Size of the chunks written to disk. Defaults to 64 KiB.
+            progress (Callable, optional): Called with the partial result after each item.
+
+        Returns:
+            TextDownloads: The path by item ID (hex), items without lyrics in `missing`, errors and throughput.
+        """
+        return self._fetch_many(items, [], dest, workers, chunk_size, progress)
+
+    def load(self, path: str) -> BaseModel:
+        """
+        Reads lyrics from the cache.
+
+        Args:
+            path (str): A path returned by fetch_many.
+
+        Returns:
+            LyricDto: The metadata and the lines of the lyrics.
+        """
+        with open(path, 'rb') as file:
+            return self.api.generated.LyricDto.from_dict(json.load(file))
@@ -0,0 +1,212 @@
+"""
+Module `tree` - In-memory hierarchies of items built from a single search.
+"""
+from __future__ import annotations
+
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Tuple
+from uuid import UUID
+
+from jellyfin.items import Item, _item_id
+from jellyfin.generated import BaseItemKind
+
+# root kind -> kind of each level, attributes pointing to the parent by kind,
+# an attribute may hold a list of NameGuidPair like the album artists
+_HIERARCHIES: Dict[BaseItemKind, Tuple[List[BaseItemKind], Dict[BaseItemKind, Tuple[str, ...]]]] = {
+    BaseItemKind.SERIES: (
+        [BaseItemKind.SERIES, BaseItemKind.SEASON, BaseItemKind.EPISODE],
+        {
+            BaseItemKind.SEASON: ('series_id', 'parent_id'),
+            BaseItemKind.EPISODE: ('season_id', 'series_id', 'parent_id'),
+        }
+    ),
+    BaseItemKind.MUSICARTIST: (
+        [BaseItemKind.MUSICARTIST, BaseItemKind.MUSICALBUM, BaseItemKind.AUDIO],
+        {
+            BaseItemKind.MUSICALBUM: ('album_artists',),
+            BaseItemKind.AUDIO: ('album_id', 'parent_id'),
+        }
+    ),
+    BaseItemKind.MUSICALBUM: (
+        [BaseItemKind.MUSICALBUM, BaseItemKind.AUDIO],
+        {
+            BaseItemKind.AUDIO: ('album_id', 'parent_id'),
+        }
+    ),
+    BaseItemKind.PHOTOALBUM: (
+        [BaseItemKind.PHOTOALBUM, BaseItemKind.PHOTO],
+        {
+            BaseItemKind.PHOTOALBUM: ('parent_id',),
+            BaseItemKind.PHOTO: ('album_id', 'parent_id'),
+        }
+    ),
+}
+
+def _ids(value: UUID | List | None) -> Iterator[str]:
+    """ IDs held by a parent attribute, a single ID or a list of NameGuidPair. """
+    if isinstance(value, list):
+        for pair in value:
+            if pair.id is not None:
+                yield pair.id.hex
+    elif value is not None:
+        yield value.hex
+
+def _order(item: Item) -> tuple:
+    """ Seasons and episodes by number, the others by sort name. """
+    return (
+        item.parent_index_number is None, item.parent_index_number or 0,
+        item.index_number is None, item.index_number or 0,
+        (item.sort_name or item.name or '').casefold(),
+    )
+
+class ItemTree():
+    """ Hierarchy of items indexed by ID, with parent and children lookups and
+    counts of descendants by kind.
+
+    Usage:
+        tree = api.items.tree(BaseItemKind.SERIES)
+        for series in tree.roots:
+            for season in tree.children(series):
+                print(series.name, season.name, tree.count(season, BaseItemKind.EPISODE))
+    """
+
+    def __init__(self, kind: BaseItemKind, items: Iterable[Item]):
+        """
+        Builds the tree in a single pass over the items.
+
+        Args:
+            kind (BaseItemKind): The kind of the roots.
+            items (Iterable[Item]): The items of all levels, in any order.
+
+        Raises:
+            ValueError: If the kind has no known hierarchy.
+        """
+        self.kind = BaseItemKind(kind)
+        if self.kind not in _HIERARCHIES:
+            kinds = [kind.value for kind in _HIERARCHIES]
+            raise ValueError(f"Unsupported kind: {self.kind.value}. Supported kinds are: {kinds}")
+        _, parents = _HIERARCHIES[self.kind]
+
+        self._items: Dict[str, Item] = {}
+        for item in items:
+            self._items.setdefault(item.id.hex, item)
+
+        self._parent: Dict[str, str] = {}
+        self._children: Dict[str, List[Item]] = {}
+        self.roots: List[Item] = []
+        self.orphans: List[Item] = []
+
+        for item_id, item in self._items.items():
+            kind = BaseItemKind(item.type) if item.type is not None else None
+            parent_id = None
+            for attribute in parents.get(kind, ()):
+                # an album of many artists is under the first one in the tree
+                parent_id = next(
+                    (value for value in _ids(getattr(item, attribute)) if value in self._items and value != item_id),
+                    None
+                )
+                if parent_id is not None:
+                    break
+
+            if parent_id is not None:
+                self._parent[item_id] = parent_id
+                self._children.setdefault(parent_id, []).append(item)
+            elif kind == self.kind:
+                self.roots.append(item)
+            else:
+                self.orphans.append(item)
+
+        self.roots.sort(key=_order)
+        for children in self._children.values():
+            children.sort(key=_order)
+        self._counts: Dict[str, Counter] | None = None
+
+    def __repr__(self) -> str:
+        return f"<ItemTree kind='{self.kind.value}', roots={len(self.roots)}, items={len(self)}, orphans={len(self.orphans)}>"
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[Item]:
+        """ All items in the tree, depth first from the roots. """
+        return self.walk()
+
+    def __contains__(self, item_id: str | UUID | Item) -> bool:
+        try:
+            return self._id(item_id) in self._items
+        except ValueError:
+            return False
+
+    def __getitem__(self, item_id: str | UUID) -> Item:
+        return self._items[self._id(item_id)]
+
+    def _id(self, item: str | UUID | Item) -> str:
+        return item.id.hex if isinstance(item, Item) else _item_id(item)
+
+    def get(self, item_id: str | UUID, default: Item = None) -> Item | None:
+        """ Returns the item with the given ID or default if not in the tree. """
+        return self._items.get(self._id(item_id), default)
+
+    def parent(self, item: str | UUID | Item) -> Item | None:
+        """ Returns the parent of the item, None for roots and orphans. """
+        parent_id = self._parent.get(self._id(item))
+        return self._items[parent_id] if parent_id is not None else None
+
+    def children(self, item: str | UUID | Item) -> List[Item]:
+        """ Returns the children of the item, ordered by index number and sort name. """
+        return list(self._children.get(self._id(item), []))
+
+    def ancestors(self, item: str | UUID | Item) -> List[Item]:
+        """ Returns the parents of the item up to its root, nearest first. """
+        ancestors = []
+        parent = self.parent(item)
+        while parent is not None:
+            ancestors.append(parent)
+            parent = self.parent(parent)
+        return ancestors
+
+    def walk(self, item: str | UUID | Item = None) -> Iterator[Item]:
+        """
+        Iterate depth first over an item and its descendants.
+
+        Args:
+            item (str | UUID | Item, optional): The item to start from. Defaults to all roots.
+
+        Returns:
+            Iterator[Item]: The items, each parent before its children.
+        """
+        stack = list(reversed(self.roots if item is None else [self[self._id(item)]]))
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(self._children.get(node.id.hex, [])))
+
+    def count(self, item: str | UUID | Item, kind: BaseItemKind = None) -> int:
+        """
+        Returns the number of descendants of an item, computed once for all items.
+
+        Args:
+            item (str | UUID | Item): The item.
+            kind (BaseItemKind, optional): Count only descendants of this kind.
+
+        Returns:
+            int: The number of descendants.
+        """
+        if self._counts is None:
+            self._counts = self._aggregate()
+        counts = self._counts.get(self._id(item), Counter())
+        if kind is None:
+            return sum(counts.values())
+        return counts[BaseItemKind(kind).value]
+
+    def _aggregate(self) -> Dict[str, Counter]:
+        """ Counts by kind of the descendants of every item, children before parents. """
+        counts = {}
+        order = [node for root in self.roots for node in self.walk(root)]
+        for node in reversed(order):
+            total = Counter()
+            for child in self._children.get(node.id.hex, []):
+                total[BaseItemKind(child.type).value] += 1
+                total.update(counts.get(child.id.hex, {}))
+            counts[node.id.hex] = total
+        return counts
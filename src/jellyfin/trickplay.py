@@ -0,0 +1,287 @@
+"""
+Module `trickplay` - Trickplay tile sheets cached on disk with a position index.
+"""
+from __future__ import annotations
+
+import math, os, threading, uuid
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Tuple
+from pydantic import BaseModel
+
+from jellyfin.items import Item, _item_id
+from jellyfin.generated import ApiException, ItemFields
+
+class Thumbnail():
+    """ A thumbnail inside a tile sheet. """
+
+    def __init__(self, path: str, sheet: int, x: int, y: int, width: int, height: int):
+        self.path = path
+        self.sheet = sheet
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+
+    @property
+    def box(self) -> Tuple[int, int, int, int]:
+        """ Returns the (left, upper, right, lower) box of the thumbnail in the sheet, as PIL crop expects. """
+        return self.x, self.y, self.x + self.width, self.y + self.height
+
+    def __repr__(self) -> str:
+        return f"<Thumbnail sheet={self.sheet}, x={self.x}, y={self.y}, path='{self.path}'>"
+
+class TrickplayTiles():
+    """ Tile sheets of an item at one width, with the thumbnail of any position
+    computed from the manifest, no request once the sheets are on disk.
+
+    Usage:
+        tiles = api.trickplay.fetch(item)
+        tiles.at(754.2)
+    """
+
+    def __init__(self, item_id: str, media_source_id: str, info: BaseModel, dest: str):
+        """
+        Args:
+            item_id (str): The ID of the item (hex).
+            media_source_id (str): The media source of the manifest.
+            info (TrickplayInfo): The manifest of the width.
+            dest (str): The directory of the cache.
+        """
+        self.item_id = item_id
+        self.media_source_id = media_source_id
+        self.info = info
+        self.width = info.width
+        self.height = info.height
+        self.columns = info.tile_width
+        self.per_sheet = info.tile_width * info.tile_height
+        self.count = info.thumbnail_count or 0
+        self.interval = info.interval
+        self.sheets = math.ceil(self.count / self.per_sheet) if self.per_sheet else 0
+        self.directory = os.path.join(dest, media_source_id, str(info.width))
+        self.paths = [os.path.join(self.directory, f"{index}.jpg") for index in range(self.sheets)]
+
+    def __repr__(self) -> str:
+        return (
+            f"<TrickplayTiles item='{self.item_id}', width={self.width}, thumbnails={self.count}, "
+            f"sheets={self.sheets}, missing={len(self.missing)}>"
+        )
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def missing(self) -> List[int]:
+        """ Returns the index of the sheets not yet on disk. """
+        return [index for index, path in enumerate(self.paths) if not os.path.exists(path)]
+
+    def thumbnail(self, number: int) -> Thumbnail:
+        """
+        Returns a thumbnail by its number.
+
+        Args:
+            number (int): The number of the thumbnail, clamped to the existing ones.
+
+        Raises:
+            ValueError: If the manifest has no thumbnail.
+
+        Returns:
+            Thumbnail: The sheet and the position of the thumbnail in it.
+        """
+        if self.count <= 0 or not self.per_sheet:
+            raise ValueError(f"No thumbnail in the trickplay of item {self.item_id} at width {self.width}.")
+        number = min(max(number, 0), self.count - 1)
+        sheet, offset = divmod(number, self.per_sheet)
+        row, column = divmod(offset, self.columns)
+        return Thumbnail(self.paths[sheet], sheet, column * self.width, row * self.height, self.width, self.height)
+
+    def _interval(self) -> int:
+        if not self.interval:
+            raise ValueError(f"No interval in the trickplay of item {self.item_id} at width {self.width}.")
+        return self.interval
+
+    def at(self, seconds: float) -> Thumbnail:
+        """ Returns the thumbnail shown at a position, in seconds, ValueError without thumbnails or interval. """
+        return self.thumbnail(int(seconds * 1000 // self._interval()))
+
+    def at_ticks(self, ticks: int) -> Thumbnail:
+        """ Returns the thumbnail shown at a position, in ticks like PositionTicks, see at. """
+        return self.thumbnail(ticks // 10_000 // self._interval())
+
+    @property
+    def index(self) -> List[Tuple[float, int, int, int]]:
+        """ Returns the start (seconds), sheet, x and y of every thumbnail. """
+        return [
+            (number * self._interval() / 1000, thumbnail.sheet, thumbnail.x, thumbnail.y)
+            for number, thumbnail in ((number, self.thumbnail(number)) for number in range(self.count))
+        ]
+
+class Trickplay():
+    """ Reads the trickplay manifests of the items and caches their tile sheets on disk,
+    so scrubbing previews are served without requests.
+
+    Usage:
+        tiles = api.trickplay.fetch(item, width=320)
+        tiles.at_ticks(user_data.playback_position_ticks)
+        api.trickplay.prefetch(search.all)
+    """
+
+    def __init__(self, api: Api):
+        """
+        Initializes the Trickplay API wrapper.
+
+        Args:
+            api (Api): An instance of the Api class.
+        """
+        self.api = api
+        self.trickplay_api = api.generated.TrickplayApi(api.client)
+
+    def tiles(
+            self,
+            item: Item | BaseModel | str | uuid.UUID,
+            width: int = None,
+            media_source_id: str = None,
+            dest: str = 'trickplay'
+        ) -> TrickplayTiles:
+        """
+        Returns the tile sheets of an item from its manifest, without downloading them.
+
+        Args:
+            item (Item | BaseItemDto | str | uuid.UUID): The item, fetched with its Trickplay field if needed.
+            width (int, optional): The width of the thumbnails. Defaults to the largest.
+            media_source_id (str, optional): The media source. Defaults to the one of the item.
+            dest (str): The directory of the cache. Defaults to `trickplay`.
+
+        Raises:
+            ValueError: If the item has no trickplay for the media source or the width.
+
+        Returns:
+            TrickplayTiles: The sheets and the index of the thumbnails.
+        """
+        model = item.model if isinstance(item, Item) else item if isinstance(item, BaseModel) else None
+        if model is None or model.trickplay is None:
+            search = self.api.items.search.add('ids', [_item_id(model.id if model is not None else item)])
+            search._fields(ItemFields.TRICKPLAY)
+            found = search.all.first
+            if found is None:
+                raise ValueError(f"Item not found: {item}")
+            model = found.model
+
+        manifests = model.trickplay or {}
+        media_source_id = _item_id(media_source_id) if media_source_id else model.id.hex
+        if media_source_id not in manifests:
+            if len(manifests) != 1 or media_source_id != model.id.hex:
+                raise ValueError(f"No trickplay for media source {media_source_id} of item {model.id.hex}.")
+            media_source_id = next(iter(manifests))
+
+        widths = manifests[media_source_id]
+        if width is None:
+            width = max(int(key) for key in widths)
+        if str(width) not in widths:
+            raise ValueError(f"No trickplay of width {width}, available widths are: {sorted(int(key) for key in widths)}")
+        return TrickplayTiles(model.id.hex, media_source_id, widths[str(width)], dest)
+
+    def _sheet(self, tiles: TrickplayTiles, index: int) -> None:
+        """ Writes a sheet to a partial file renamed when complete. """
+        response = self.trickplay_api.get_trickplay_tile_image_without_preload_content(
+            uuid.UUID(tiles.item_id), tiles.width, index, media_source_id=uuid.UUID(tiles.media_source_id)
+        )
+        try:
+            if not 200 <= response.status <= 299:
+                raise ApiException(status=response.status, reason=response.reason)
+            path = tiles.paths[index]
+            with open(f"{path}.part", 'wb') as file:
+                for chunk in response.stream(64 * 1024):
+                    file.write(chunk)
+            os.replace(f"{path}.part", path)
+        finally:
+            response.release_conn()
+
+    def fetch(
+            self,
+            item: Item | BaseModel | str | uuid.UUID,
+            width: int = None,
+            media_source_id: str = None,
+            dest: str = 'trickplay',
+            workers: int = 8
+        ) -> TrickplayTiles:
+        """
+        Downloads concurrently the tile sheets of an item not yet on disk.
+
+        Args:
+            item (Item | BaseItemDto | str | uuid.UUID): The item, fetched with its Trickplay field if needed.
+            width (int, optional): The width of the thumbnails. Defaults to the largest.
+            media_source_id (str, optional): The media source. Defaults to the one of the item.
+            dest (str): The directory of the cache. Defaults to `trickplay`.
+            workers (int): Number of concurrent requests. Defaults to 8.
+
+        Raises:
+            ValueError: If the item has no trickplay for the media source or the width.
+            ApiException: If the server rejects a request.
+
+        Returns:
+            TrickplayTiles: The sheets, all on disk, and the index of the thumbnails.
+
+        Usage:
+            tiles = api.trickplay.fetch(item)
+            thumbnail = tiles.at(754.2)
+            PIL.Image.open(thumbnail.path).crop(thumbnail.box)
+        """
+        tiles = self.tiles(item, width, media_source_id, dest)
+        os.makedirs(tiles.directory, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(lambda index: self._sheet(tiles, index), tiles.missing))
+        return tiles
+
+    def prefetch(
+            self,
+            items: Iterable[Item | BaseModel],
+            width: int = None,
+            dest: str = 'trickplay',
+            workers: int = 8
+        ) -> Dict[str, Exception]:
+        """
+        Downloads the missing tile sheets of many items, all sheets sharing the same workers.
+
+        Items without trickplay are skipped, search them with the Trickplay field
+        so no request is needed to read their manifest.
+
+        Args:
+            items (Iterable[Item | BaseItemDto]): The items, with their Trickplay field.
+            width (int, optional): The width of the thumbnails. Defaults to the largest of each item.
+            dest (str): The directory of the cache. Defaults to `trickplay`.
+            workers (int): Number of concurrent requests. Defaults to 8.
+
+        Returns:
+            Dict[str, Exception]: The errors by item ID (hex), empty if all sheets are on disk.
+
+        Usage:
+            search = api.items.search.recursive().paginate(500).add('fields', [ItemFields.TRICKPLAY])
+            api.trickplay.prefetch(search.all)
+        """
+        errors: Dict[str, Exception] = {}
+        lock = threading.Lock()
+        sheets = []
+        for item in items:
+            model = item.model if isinstance(item, Item) else item
+            if not model.trickplay:
+                continue
+            try:
+                tiles = self.tiles(model, width, dest=dest)
+            except ValueError as e:
+                errors[model.id.hex] = e
+                continue
+            os.makedirs(tiles.directory, exist_ok=True)
+            sheets += [(tiles, index) for index in tiles.missing]
+
+        def download(sheet: Tuple[TrickplayTiles, int]) -> None:
+            tiles, index = sheet
+            try:
+                self._sheet(tiles, index)
+            except Exception as e:
+                with lock:
+                    errors.setdefault(tiles.item_id, e)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(download, sheets))
+        return errors
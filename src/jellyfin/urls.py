@@ -0,0 +1,317 @@
+"""
+Module `urls` - Precompiled URL templates of the stream, image and HLS endpoints.
+"""
+from __future__ import annotations
+
+import datetime, decimal, inspect, json, threading, uuid
+
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Tuple
+from urllib.parse import parse_qsl, quote, urlsplit
+from pydantic import BaseModel
+
+from jellyfin.items import Item, _image_tag, _item_id
+from jellyfin.generated import ImageType
+
+class _Marker(str):
+    """ Probe value, passes where the bindings expect a string or an enum. """
+
+    @property
+    def value(self) -> str:
+        return str(self)
+
+def _serialize(value: Any) -> Any:
+    """ Same conversions as ApiClient.sanitize_for_serialization for URL values. """
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, (list, tuple)):
+        return [_serialize(item) for item in value]
+    return value
+
+def _text(value: Any) -> str:
+    """ Same conversions as ApiClient.parameters_to_url_query for a single value. """
+    if isinstance(value, bool):
+        return str(value).lower()
+    if isinstance(value, dict):
+        return json.dumps(value)
+    return str(value)
+
+class Template():
+    """ URL of an endpoint compiled once from its generated binding, then
+    filled with plain string operations, without validation nor a request.
+
+    Usage:
+        template = Template(api.generated.ImageApi, 'get_item_image', api.client)
+        template.url({'item_id': item_id, 'image_type': ImageType.PRIMARY, 'max_width': 300})
+    """
+
+    def __init__(self, api_class: type, method: str, client: Any):
+        """
+        Compiles the template probing the serializer of the method once per parameter.
+
+        Args:
+            api_class (type): The generated API class, e.g. ImageApi.
+            method (str): The name of the method, e.g. get_item_image.
+            client (ApiClient): The client, for the host and path quoting.
+
+        Raises:
+            ValueError: If the method does not exist.
+        """
+        serialize = getattr(api_class(client), f"_{method}_serialize", None)
+        if serialize is None:
+            raise ValueError(f"Unknown endpoint: {api_class.__name__}.{method}")
+
+        self.name = f"{api_class.__name__}.{method}"
+        self._safe = client.configuration.safe_chars_for_path_param
+        names = list(inspect.signature(serialize).parameters)
+        empty = {name: None for name in names}
+        if '_host_index' in empty:
+            empty['_host_index'] = 0
+
+        def probe(**values: Any) -> Tuple[str, List[Tuple[str, str]]]:
+            _, url, _, _, _ = serialize(**dict(empty, **values))
+            parts = urlsplit(url)
+            return url.split('?', 1)[0], parse_qsl(parts.query, keep_blank_values=True)
+
+        self._path, _ = probe()
+        self._path_params: Dict[str, str] = {}
+        self._query_params: Dict[str, Tuple[str, str | None]] = {}
+        for name in names:
+            if name.startswith('_'):
+                continue
+            path, query = probe(**{name: _Marker('__a__')})
+            if path != self._path:
+                start = path.index('__a__')
+                placeholder = self._path[start:self._path.index('}', start) + 1]
+                self._path_params[name] = placeholder
+            elif query:
+                key, value = query[0]
+                try:
+                    _, query = probe(**{name: [_Marker('__a__'), _Marker('__b__')]})
+                except (AttributeError, TypeError):
+                    # an enum or a scalar the binding converts itself
+                    query = []
+                if len(query) == 2:
+                    self._query_params[name] = (key, None)
+                elif len(query) == 1 and query[0][1].startswith('__a__') and query[0][1].endswith('__b__'):
+                    self._query_params[name] = (key, query[0][1][len('__a__'):-len('__b__')])
+                else:
+                    self._query_params[name] = (key, '')
+
+        # same order of the query as the binding
+        _, query = probe(**{name: _Marker(f"__{index}__") for index, name in enumerate(self._query_params)})
+        rank = {key: index for index, (key, _) in enumerate(query)}
+        self._query_params = dict(sorted(self._query_params.items(), key=lambda entry: rank.get(entry[1][0], len(rank))))
+        self._names = set(self._path_params) | set(self._query_params)
+
+    def __repr__(self) -> str:
+        return f"<Template {self.name} '{self._path}'>"
+
+    def url(self, params: Dict[str, Any], api_key: str = None) -> str:
+        """
+        Fills the template.
+
+        Args:
+            params (Dict[str, Any]): Arguments of the generated method, None values are left out.
+            api_key (str, optional): Authenticates the URL in the query with `api_key`.
+
+        Raises:
+            ValueError: If a path parameter is missing or a parameter is unknown.
+
+        Returns:
+            str: The URL.
+        """
+        path = self._path
+        for name, placeholder in self._path_params.items():
+            value = params.get(name)
+            if value is None:
+                raise ValueError(f"Missing path parameter '{name}' of {self.name}")
+            path = path.replace(placeholder, quote(_text(_serialize(value)), safe=self._safe))
+
+        if not self._names.issuperset(params):
+            unknown = sorted(set(params) - self._names)
+            raise ValueError(f"Unknown parameters {unknown} of {self.name}")
+
+        query = []
+        for name, (key, delimiter) in self._query_params.items():
+            value = params.get(name)
+            if value is None:
+                continue
+            value = _serialize(value)
+            if isinstance(value, list) and delimiter != '':
+                if delimiter is None:
+                    query.extend(f"{key}={quote(_text(item))}" for item in value)
+                else:
+                    query.append(f"{key}={delimiter.join(quote(_text(item)) for item in value)}")
+            else:
+                query.append(f"{key}={quote(_text(value))}")
+        if api_key is not None:
+            query.append(f"api_key={quote(api_key)}")
+        return f"{path}?{'&'.join(query)}" if query else path
+
+class Urls():
+    """ URLs of images, streams and HLS playlists built locally, for players and
+    web pages, with the image tag for caching and the API key where needed.
+
+    Usage:
+        api.urls.image(item, ImageType.PRIMARY, max_width=300)
+        api.urls.images(api.items.search.paginate(500).all, ImageType.PRIMARY, max_width=300)
+        api.urls.stream(item, static=True)
+        api.urls.hls(item, video_codec='h264')
+    """
+
+    def __init__(self, api: Api):
+        """
+        Initializes the URL builder, each template is compiled on first use.
+
+        Args:
+            api (Api): An instance of the Api class.
+        """
+        self.api = api
+        self._templates: Dict[Tuple[str, str], Template] = {}
+        self._lock = threading.Lock()
+
+    def template(self, api_name: str, method: str) -> Template:
+        """
+        Returns the compiled template of any endpoint of the generated bindings.
+
+        Args:
+            api_name (str): The name of the generated API class, e.g. VideosApi.
+            method (str): The name of the method, e.g. get_video_stream.
+
+        Returns:
+            Template: The template, compiled once for this Api.
+        """
+        key = (api_name, method)
+        with self._lock:
+            if key not in self._templates:
+                self._templates[key] = Template(getattr(self.api.generated, api_name), method, self.api.client)
+            return self._templates[key]
+
+    def url(self, api_name: str, method: str, auth: bool = True, **params: Any) -> str:
+        """
+        Returns the URL of any endpoint of the generated bindings.
+
+        Args:
+            api_name (str): The name of the generated API class, e.g. UniversalAudioApi.
+            method (str): The name of the method, e.g. get_universal_audio_stream.
+            auth (bool): Add the API key to the query. Defaults to True.
+            **params: The arguments of the method.
+
+        Returns:
+            str: The URL.
+        """
+        return self.template(api_name, method).url(params, self.api.api_key if auth else None)
+
+    def _model(self, item: Item | BaseModel | str | uuid.UUID) -> Tuple[uuid.UUID, BaseModel | None]:
+        if isinstance(item, Item):
+            return item.id, item.model
+        if isinstance(item, BaseModel):
+            return item.id, item
+        return uuid.UUID(_item_id(item)), None
+
+    def image(
+            self,
+            item: Item | BaseModel | str | uuid.UUID,
+            image_type: ImageType = ImageType.PRIMARY,
+            image_index: int = None,
+            auth: bool = False,
+            **options: Any
+        ) -> str | None:
+        """
+        Returns the URL of an image of an item, with its tag so it can be cached for good.
+
+        Args:
+            item (Item | BaseItemDto | str | uuid.UUID): The item, the tag is only known from an item.
+            image_type (ImageType): The type of the image. Defaults to Primary.
+            image_index (int, optional): The index of backdrops and screenshots.
+            auth (bool): Add the API key to the query, images are public by default. Defaults to False.
+            **options: Any other argument of ImageApi.get_item_image, e.g. max_width, quality or format.
+
+        Returns:
+            str | None: The URL, None if the item has no such image.
+        """
+        item_id, model = self._model(item)
+        image_type = ImageType(image_type)
+        if model is not None and 'tag' not in options:
+            options['tag'] = _image_tag(model, image_type)
+            if options['tag'] is None:
+                return None
+
+        if image_index is None:
+            return self.url('ImageApi', 'get_item_image', auth, item_id=item_id, image_type=image_type, **options)
+        return self.url('ImageApi', 'get_item_image_by_index', auth, item_id=item_id, image_type=image_type,
+                        image_index=image_index, **options)
+
+    def images(
+            self,
+            items: Iterable[Item | BaseModel],
+            image_type: ImageType = ImageType.PRIMARY,
+            auth: bool = False,
+            **options: Any
+        ) -> Dict[str, str]:
+        """
+        Returns the URL of an image of every item.
+
+        Args:
+            items (Iterable[Item | BaseItemDto]): The items, with their ImageTags.
+            image_type (ImageType): The type of the image. Defaults to Primary.
+            auth (bool): Add the API key to the query. Defaults to False.
+            **options: Any other argument of ImageApi.get_item_image.
+
+        Returns:
+            Dict[str, str]: The URL by item ID (hex), items without such image are left out.
+        """
+        urls = {}
+        for item in items:
+            url = self.image(item, image_type, None, auth, **dict(options))
+            if url is not None:
+                urls[self._model(item)[0].hex] = url
+        return urls
+
+    def stream(self, item: Item | BaseModel | str | uuid.UUID, audio: bool = None, auth: bool = True, **options: Any) -> str:
+        """
+        Returns the URL of the progressive stream of an item.
+
+        Args:
+            item (Item | BaseItemDto | str | uuid.UUID): The item.
+            audio (bool, optional): Use the audio endpoint, guessed from the media type of an item. Defaults to video.
+            auth (bool): Add the API key to the query. Defaults to True.
+            **options: Any other argument of VideosApi.get_video_stream or AudioApi.get_audio_stream, e.g. static.
+
+        Returns:
+            str: The URL.
+        """
+        item_id, model = self._model(item)
+        if audio is None:
+            audio = model is not None and getattr(model.media_type, 'value', model.media_type) == 'Audio'
+        if audio:
+            return self.url('AudioApi', 'get_audio_stream', auth, item_id=item_id, **options)
+        return self.url('VideosApi', 'get_video_stream', auth, item_id=item_id, **options)
+
+    def streams(self, items: Iterable[Item | BaseModel], auth: bool = True, **options: Any) -> Dict[str, str]:
+        """ Returns the URL of the stream of every item by ID (hex), see stream. """
+        return {self._model(item)[0].hex: self.stream(item, None, auth, **options) for item in items}
+
+    def hls(self, item: Item | BaseModel | str | uuid.UUID, media_source_id: str = None, auth: bool = True, **options: Any) -> str:
+        """
+        Returns the URL of the HLS master playlist of a video.
+
+        Args:
+            item (Item | BaseItemDto | str | uuid.UUID): The item.
+            media_source_id (str, optional): The media source, the one of the item by default.
+            auth (bool): Add the API key to the query. Defaults to True.
+            **options: Any other argument of DynamicHlsApi.get_master_hls_video_playlist.
+
+        Returns:
+            str: The URL.
+        """
+        item_id, _ = self._model(item)
+        return self.url('DynamicHlsApi', 'get_master_hls_video_playlist', auth, item_id=item_id,
+                        media_source_id=media_source_id or item_id.hex, **options)
@@ -3,15 +3,17 @@ Module `user` - High-level interface for UserApi and UserViewsApi.
 """
 from __future__ import annotations
 
-from typing import Callable
+from typing import Callable, Dict
 from typing_extensions import Self
 
-import uuid, rich
+import threading, time, uuid, rich
 
 from jellyfin.base import Model, Collection
 from jellyfin.items import ItemCollection, Item
+from pydantic import BaseModel
 from jellyfin.generated import (
     BaseItemKind,
+    SessionMessageType,
     UserApi, 
     UserViewsApi
 )
@@ -25,14 +27,128 @@ class UserCollection(Collection):
 class Users():
     _user = None
 
-    def __init__(self, api: Api):
+    def __init__(self, api: Api, ttl: float = 300.0):
         """Initializes the User API wrapper.
 
         Args:
             api (Api): An instance of the Api class.
+            ttl (float): Seconds before the user directory is fetched again. Defaults to 300.
         """
+        self._api = api
         self._user_api = api.generated.UserApi(api.client)
         self._user_views_api = api.generated.UserViewsApi(api.client)
+        self.ttl = ttl
+        self._by_id: Dict[str, BaseModel] = {}
+        self._by_name: Dict[str, BaseModel] = {}
+        self._loaded_at = None
+        # keys not found since the directory was fetched
+        self._misses = set()
+        self._lock = threading.Lock()
+        self._watching = False
+
+    def _load(self) -> None:
+        """ Fetch all users and swap the indexes at once. """
+        users = self._user_api.get_users()
+        with self._lock:
+            self._by_id = {user.id.hex: user for user in users if user.id is not None}
+            self._by_name = {user.name: user for user in users if user.name is not None}
+            self._misses = set()
+            self._loaded_at = time.monotonic()
+
+    def _index(self, force: bool = False) -> bool:
+        """ Fetch the user directory if expired, returns True if fetched. """
+        if force or self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl:
+            self._load()
+            return True
+        return False
+
+    def _lookup(self, index: str, key: str) -> User | None:
+        fetched = self._index()
+        user = getattr(self, index).get(key)
+        if user is None and not fetched and (index, key) not in self._misses:
+            # maybe created after the directory was fetched
+            self._index(force=True)
+            user = getattr(self, index).get(key)
+        if user is None:
+            # not fetched again for this key until the directory expires
+            with self._lock:
+                self._misses.add((index, key))
+            return None
+        return User(user)
+
+    def invalidate(self) -> Self:
+        """Forget the user directory, the next lookup fetches it again.
+
+        Returns:
+            Users: The current Users instance (for chaining).
+        """
+        with self._lock:
+            self._loaded_at = None
+        return self
+
+    def watch(self) -> Self:
+        """Keep the user directory updated from the UserUpdated and UserDeleted
+        messages of the websocket, starting `api.events` if needed.
+
+        Returns:
+            Users: The current Users instance (for chaining).
+        """
+        if not self._watching:
+            self._watching = True
+            self._api.events.on(SessionMessageType.USERUPDATED, self.on_user_updated)
+            self._api.events.on(SessionMessageType.USERDELETED, self.on_user_deleted)
+            self._api.events.start()
+        return self
+
+    def on_user_updated(self, message: BaseModel) -> None:
+        """ Replace the user in the directory, dropping its previous name. """
+        user = message.data
+        if user is None or user.id is None:
+            return
+        with self._lock:
+            previous = self._by_id.get(user.id.hex)
+            if previous is not None and self._by_name.get(previous.name) is previous:
+                del self._by_name[previous.name]
+            self._by_id[user.id.hex] = user
+            if user.name is not None:
+                self._by_name[user.name] = user
+            self._misses.discard(('_by_id', user.id.hex))
+            self._misses.discard(('_by_name', user.name))
+
+    def on_user_deleted(self, message: BaseModel) -> None:
+        """ Remove the user from the directory. """
+        if message.data is None:
+            return
+        with self._lock:
+            user = self._by_id.pop(uuid.UUID(str(message.data)).hex, None)
+            if user is not None and self._by_name.get(user.name) is user:
+                del self._by_name[user.name]
+
+    def resolve(self, user_name_or_uuid: str | uuid.UUID) -> User:
+        """Find a user by name or ID without changing the user context.
+
+        Args:
+            user_name_or_uuid (str | uuid.UUID): The UUID or name of the user.
+
+        Raises:
+            ValueError: If no user has this name or ID.
+
+        Returns:
+            User: The user found.
+        """
+        if isinstance(user_name_or_uuid, uuid.UUID):
+            user = self.by_id(user_name_or_uuid)
+        else:
+            user = self.by_name(user_name_or_uuid)
+            if user is None:
+                try:
+                    user = self.by_id(uuid.UUID(user_name_or_uuid))
+                except ValueError:
+                    user = None
+
+        if user is None:
+            raise ValueError(f"Not found user: {user_name_or_uuid}")
+        return user
 
     def of(self, user_name_or_uuid: str | uuid.UUID) -> Self:
         """Set user context
@@ -46,36 +162,28 @@ class Users():
         Returns:
             User: The current User instance with the user context set.
         """
-        try:
-            if isinstance(user_name_or_uuid, uuid.UUID):
-                self._user = self.by_id(user_name_or_uuid)
-                return self
-        except ValueError:
-            raise ValueError(f"Not found UUID: {user_name_or_uuid}")
-        try:
-            self._user = self.by_name(user_name_or_uuid)
-            return self
-
-            self._user = self.by_id(uuid.UUID(user_name_or_uuid))
-            warnings.warn("User UUID need to be a UUID object.")
-        except Exception:
-            raise ValueError(f"Not found user: {user_name_or_uuid}")
-
+        self._user = self.resolve(user_name_or_uuid)
         return self
     
-    def by_id(self, user_id: uuid.UUID) -> User:
-        """Get user by ID
+    def by_id(self, user_id: uuid.UUID) -> User | None:
+        """Get user by ID from the user directory.
+
+        Unlike a request by ID, a user missing from the directory is None
+        instead of an ApiException, see by_name.
         
         Args:
             user_id (uuid.UUID): The UUID of the user.
         
         Returns:
-            User: The user object if found.
+            User | None: The user object if found, otherwise None.
         """
-        return User(self._user_api.get_user_by_id(user_id=user_id))
+        return self._lookup('_by_id', uuid.UUID(str(user_id)).hex)
 
     def by_name(self, user_name: str) -> User | None:
-        """Get user by name
+        """Get user by name from the user directory.
+
+        A missing user fetches the directory again once, then stays missing
+        until the directory expires, is invalidated or the user is updated.
         
         Args:
             user_name (str): The name of the user.
@@ -83,10 +191,7 @@ class Users():
         Returns:
             User | None: The user object if found, otherwise None.
         """
-        for user in self.all:
-            if user.model.name == user_name:
-                return user
-        return None
+        return self._lookup('_by_name', user_name)
     
     @property
     def all(self) -> UserCollection:
@@ -95,7 +200,8 @@ class Users():
         Returns:
             UserCollection: A list of all users.
         """
-        return UserCollection(self._user_api.get_users())
+        self._index(force=True)
+        return UserCollection(list(self._by_id.values()))
 
     @property
     def libraries(self) -> ItemCollection:
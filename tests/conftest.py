@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import json, pytest
+
+from typing import Any, Dict, Iterator, List
+from urllib.parse import parse_qs, urlsplit
+
+from jellyfin.api import Api
+from jellyfin.loadtest.server import StandIn
+
+@pytest.fixture
+def stand_in() -> Iterator[StandIn]:
+    """ A local stand-in server, stopped before the interpreter exits. """
+    with StandIn(items=10, segments=6, segment_size=1024, seed=1) as server:
+        yield server
+
+@pytest.fixture
+def api(stand_in: StandIn) -> Api:
+    return Api(stand_in.url, stand_in.api_key)
+
+@pytest.fixture
+def sent(api: Api) -> List[Dict[str, Any]]:
+    """ The method, path, query and decoded JSON body of every request of the api, in order. """
+    requests: List[Dict[str, Any]] = []
+    pool = api.client.rest_client.pool_manager
+    urlopen = pool.urlopen
+
+    def record(method: str, url: str, *args: Any, **kwargs: Any) -> Any:
+        body = kwargs.get('body')
+        parts = urlsplit(url)
+        requests.append({
+            'method': method,
+            'path': parts.path,
+            'query': parse_qs(parts.query),
+            'body': json.loads(body) if body else None,
+        })
+        return urlopen(method, url, *args, **kwargs)
+
+    pool.urlopen = record
+    return requests
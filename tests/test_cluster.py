@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+import pytest
+
+from jellyfin.api import Api
+from jellyfin.cluster import Cluster
+from jellyfin.generated import ApiException
+
+def test_errors_by_api(api, stand_in):
+    rejected = Api(stand_in.url, 'wrong')
+    result = Cluster([api, rejected, Api(stand_in.url, stand_in.api_key)]).search.recursive().paginate(4).all
+
+    assert len(list(result)) == 2 * len(stand_in.items)
+    assert list(result.errors) == [rejected]
+    assert isinstance(result.errors[rejected], ApiException)
+
+def test_raw_is_not_available(api):
+    with pytest.raises(ValueError):
+        Cluster([api]).search.raw
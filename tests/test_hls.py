@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import pytest, time
+
+from concurrent.futures import Future
+from jellyfin.hls import Session, parse_media
+from jellyfin.generated import ApiException
+
+def _wait(session: Session, index: int, timeout: float = 5.0) -> None:
+    """ Waits for the download of a segment to end, successful or not. """
+    deadline = time.monotonic() + timeout
+    while index in session._pending:
+        assert time.monotonic() < deadline, f"segment {index} still downloading"
+        time.sleep(0.01)
+
+class _Inline():
+    """ Runs the downloads at once, so they end before the segment is read. """
+
+    def submit(self, fn, *args) -> Future:
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, wait: bool = True) -> None:
+        pass
+
+def test_parse_media():
+    playlist = parse_media(
+        '#EXTM3U\n#EXT-X-TARGETDURATION:6\n#EXTINF:6.0,\n0.ts\n#EXTINF:4.5,\n1.ts\n#EXT-X-ENDLIST\n',
+        'http://server/Videos/1/main.m3u8'
+    )
+    assert [segment.uri for segment in playlist.segments] == ['http://server/Videos/1/0.ts', 'http://server/Videos/1/1.ts']
+    assert [segment.start for segment in playlist.segments] == [0.0, 6.0]
+    assert playlist.duration == 10.5
+    assert playlist.ended
+
+def test_segments(api, stand_in):
+    with Session(api, stand_in.items[0]['Id'], window=2, cache_size=2) as session:
+        assert list(session) == [stand_in.segment] * stand_in.segments
+        assert len(session.latencies) == stand_in.segments
+
+def test_failed_segment_raises_api_exception(api, stand_in):
+    with Session(api, stand_in.items[0]['Id'], window=4, cache_size=4) as session:
+        session.segments[2].uri = session.segments[2].uri.replace('/2.ts', '/missing.ts')
+        assert session.segment(0) == stand_in.segment
+        # the prefetch of segment 2 fails before it is read
+        _wait(session, 2)
+
+        with pytest.raises(ApiException) as error:
+            session.segment(2)
+        assert error.value.status == 404
+        assert session.segment(3) == stand_in.segment
+
+def test_download_ending_before_read(api, stand_in):
+    with Session(api, stand_in.items[0]['Id'], window=2, cache_size=2) as session:
+        session._executor.shutdown()
+        session._executor = _Inline()
+        session.segments[1].uri = session.segments[1].uri.replace('/1.ts', '/missing.ts')
+        assert session.segment(0) == stand_in.segment
+
+        with pytest.raises(ApiException) as error:
+            session.segment(1)
+        assert error.value.status == 404
+
+def test_evicted_segment_is_downloaded_again(api, stand_in):
+    with Session(api, stand_in.items[0]['Id'], window=2, cache_size=2) as session:
+        for index in range(stand_in.segments):
+            session.segment(index)
+        _wait(session, stand_in.segments - 1)
+        assert 0 not in session._cache
+
+        assert session.segment(0) == stand_in.segment
+
+def test_segment_out_of_range(api, stand_in):
+    with Session(api, stand_in.items[0]['Id']) as session:
+        with pytest.raises(IndexError):
+            session.segment(stand_in.segments)
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import uuid
+
+from jellyfin.image import Image
+from jellyfin.generated import ApiException, ImageType
+
+JPEG = b'\xff\xd8\xff\xe0' + b'\x00' * 64
+
+def test_upload_many_errors_by_item(api, stand_in):
+    item_id = stand_in.items[0]['Id']
+    errors = Image(api).upload_many([
+        ('not-an-id', ImageType.PRIMARY, JPEG),
+        (uuid.UUID(item_id), ImageType.PRIMARY, JPEG),
+    ])
+    assert set(errors) == {'not-an-id', item_id}
+    assert isinstance(errors['not-an-id'], ValueError)
+    # the stand-in does not accept uploads
+    assert isinstance(errors[item_id], ApiException)
+
+def test_upload_from_file_returns_false_on_error(api, stand_in, tmp_path):
+    path = tmp_path / 'poster.jpg'
+    path.write_bytes(JPEG)
+    assert Image(api).upload_from_file(stand_in.items[0]['Id'], ImageType.PRIMARY, str(path)) is False
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import pytest
+
+from jellyfin.jsonpath import JSONPath, compile_path
+
+ITEM = {
+    'Name': 'Movie',
+    'Type': 'Movie',
+    'Genres': ['Drama', 'Comedy', 'Horror'],
+    'MediaStreams': [
+        {'Type': 'Video', 'Codec': 'h264', 'Index': 0},
+        {'Type': 'Subtitle', 'Language': 'eng', 'IsExternal': False, 'Index': 1},
+        {'Type': 'Subtitle', 'Language': 'fre', 'IsExternal': True, 'Index': 2},
+        {'Type': 'Audio', 'Language': 'eng', 'Index': 3},
+    ],
+    'UserData': {'Played': True, 'PlayCount': 2},
+}
+
+@pytest.mark.parametrize('expression, expected', [
+    ('$.Name', ['Movie']),
+    ("$['Name','Type']", ['Movie', 'Movie']),
+    ('$.UserData.PlayCount', [2]),
+    ('$.Genres[0]', ['Drama']),
+    ('$.Genres[-1]', ['Horror']),
+    ('$.Genres[0,2]', ['Drama', 'Horror']),
+    ('$.Genres[1:]', ['Comedy', 'Horror']),
+    ('$.Genres[*]', ['Drama', 'Comedy', 'Horror']),
+    ('$.UserData.*', [True, 2]),
+    ('$..Language', ['eng', 'fre', 'eng']),
+    ('$.MediaStreams[?(@.Type == "Subtitle")].Language', ['eng', 'fre']),
+    ('$.MediaStreams[?(@.Type == "Subtitle" && !@.IsExternal)].Index', [1]),
+    ('$.MediaStreams[?(@.Index >= 2 || @.Codec == "h264")].Index', [0, 2, 3]),
+    ('$.MediaStreams[?(@.Language)].Index', [1, 2, 3]),
+    ('$.MediaStreams[?(@.Language != "eng")].Index', [0, 2]),
+    ('$.Missing', []),
+])
+def test_find(expression, expected):
+    assert list(JSONPath(expression).find(ITEM)) == expected
+
+@pytest.mark.parametrize('expression', ['Name', '$.', '$[0', '$.Genres[a]', '$.MediaStreams[?(@.Type ==)]'])
+def test_invalid(expression):
+    with pytest.raises(ValueError):
+        JSONPath(expression)
+
+def test_compile_path_is_cached():
+    assert compile_path('$..Language') is compile_path('$..Language')
+
+def test_findall():
+    assert list(JSONPath('$.Name').findall([ITEM, {'Name': 'Other'}, {}])) == ['Movie', 'Other']
+
+def test_collection(api, stand_in):
+    names = [item['Name'] for item in stand_in.items]
+    assert list(api.items.search.recursive().paginate(4).all.jsonpath('$.Name')) == names
+    assert list(api.items.search.recursive().all.jsonpath('$.Name')) == names
+    assert list(api.items.search.recursive().all.jsonpath('$.Id')) == [item['Id'] for item in stand_in.items]
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from jellyfin.mirror import LibraryMirror
+
+def test_sync(api, stand_in, tmp_path):
+    with LibraryMirror(api, str(tmp_path / 'library.db'), page_size=4) as mirror:
+        stats = mirror.sync()
+        assert stats['updated'] == len(stand_in.items) == len(mirror)
+        assert mirror.get(stand_in.items[0]['Id']).name == stand_in.items[0]['Name']
+
+def test_reconcile_keeps_the_user_scope(api, stand_in, sent, tmp_path):
+    api.user = stand_in.user['Name']
+    with LibraryMirror(api, str(tmp_path / 'library.db'), page_size=4) as mirror:
+        mirror.sync()
+        mirror.db.execute("DELETE FROM items WHERE id = ?", (stand_in.items[0]['Id'],))
+        mirror.db.commit()
+        del sent[:]
+
+        assert mirror.reconcile() == {'added': 1, 'deleted': 0}
+        items = [request for request in sent if request['path'] == '/Items']
+        assert items
+        assert all(request['query'].get('userId') for request in items)
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import uuid
+
+from jellyfin.generated import BaseItemDto, BaseItemPerson
+from jellyfin.items import Item
+
+def _item() -> Item:
+    return Item(BaseItemDto(id=uuid.uuid4(), name='Movie', tags=['a'], people=[BaseItemPerson(name='Ann', role='Lead')]))
+
+def test_assigned_fields_are_dirty():
+    item = _item()
+    assert item.dirty == set()
+    item.name = 'Other'
+    assert item.dirty == {'name'}
+    assert item.clean().dirty == set()
+
+def test_reading_does_not_copy():
+    item = _item()
+    item.tags
+    item.people
+    assert item._watched is None
+
+def test_in_place_changes_of_tracked_items():
+    item = _item()
+    item.tags.append('b')
+    assert item.dirty == set()
+
+    item = _item().track()
+    item.tags.append('b')
+    item.people[0].role = 'Narrator'
+    assert item.dirty == {'tags', 'people'}
+
+    item.clean()
+    assert item.dirty == set()
+    item.tags.append('c')
+    assert item.dirty == {'tags'}
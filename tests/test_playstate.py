@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import pytest, time
+
+from jellyfin.playstate import Playstate
+
+PROGRESS = '/Sessions/Playing/Progress'
+
+def _paths(sent):
+    return [request['path'] for request in sent if request['path'].startswith('/Sessions/Playing')]
+
+def test_progress_is_coalesced(api, stand_in, sent):
+    with Playstate(api, interval=0.5, workers=2) as playstate:
+        session = playstate.session(stand_in.items[0]['Id']).start(position_ticks=0)
+        for second in range(1, 11):
+            session.update(position_ticks=second * 10_000_000)
+
+        deadline = time.monotonic() + 5
+        while PROGRESS not in _paths(sent):
+            assert time.monotonic() < deadline, "progress never sent"
+            time.sleep(0.05)
+        session.stop(position_ticks=10 * 10_000_000)
+
+    assert _paths(sent) == ['/Sessions/Playing', PROGRESS, '/Sessions/Playing/Stopped']
+    progress = next(request['body'] for request in sent if request['path'] == PROGRESS)
+    assert progress['PositionTicks'] == 10 * 10_000_000
+    assert session.coalesced == 9
+    assert session.sent == 3
+    assert playstate.errors == {}
+
+def test_immediate_update_is_sent_at_once(api, stand_in, sent):
+    with Playstate(api, interval=60, workers=2) as playstate:
+        session = playstate.session(stand_in.items[0]['Id']).start()
+        session.update(position_ticks=5 * 10_000_000, is_paused=True, immediate=True)
+        assert playstate.flush(timeout=5)
+
+        assert _paths(sent) == ['/Sessions/Playing', PROGRESS]
+        assert sent[-1]['body']['IsPaused'] is True
+        session.stop()
+
+def test_stop_drops_pending_progress(api, stand_in, sent):
+    with Playstate(api, interval=60, workers=2) as playstate:
+        session = playstate.session(stand_in.items[0]['Id']).start()
+        session.update(position_ticks=20 * 10_000_000)
+        session.stop(position_ticks=30 * 10_000_000)
+
+    assert _paths(sent) == ['/Sessions/Playing', '/Sessions/Playing/Stopped']
+    assert sent[-1]['body']['PositionTicks'] == 30 * 10_000_000
+    assert playstate.sessions == {}
+
+def test_unknown_field(api, stand_in):
+    with Playstate(api) as playstate:
+        with pytest.raises(ValueError):
+            playstate.session(stand_in.items[0]['Id'], speed=2)
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import uuid
+
+from jellyfin.generated import BaseItemKind
+
+def test_pushdown(api, stand_in):
+    search = api.items.search.recursive().where(type=BaseItemKind.MOVIE)
+    names = [item.name for item in search]
+    assert names == [item['Name'] for item in stand_in.items if item['Type'] == 'Movie']
+
+def test_pushdown_narrows_the_parameters_set(api, stand_in, sent):
+    search = api.items.search.recursive().add('include_item_types', [BaseItemKind.EPISODE])
+    assert list(search.where(type=[BaseItemKind.MOVIE, BaseItemKind.EPISODE]).map(lambda item: item.type)) == [
+        BaseItemKind.EPISODE
+    ] * len([item for item in stand_in.items if item['Type'] == 'Episode'])
+    assert sent[-1]['query']['includeItemTypes'] == ['Episode']
+
+    # no common value, nothing matches instead of the movies
+    assert list(search.where(type=BaseItemKind.MOVIE)) == []
+    assert sent[-1]['query']['includeItemTypes'] == ['Episode']
+
+def test_pushdown_keeps_a_conflicting_value_local(api, stand_in, sent):
+    parent = stand_in.views[0]['Id']
+    search = api.items.search.recursive().add('parent_id', parent)
+    assert list(search.where(parent_id=stand_in.views[1]['Id'])) == []
+    assert sent[-1]['query']['parentId'] == [str(uuid.UUID(parent))]